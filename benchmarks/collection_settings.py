@@ -0,0 +1,136 @@
+"""
+Recall@k versus memory for Qdrant collection settings.
+
+Against a Qdrant server (--url) every setting gets its own collection and is
+measured end to end, including HNSW. Without a server, quantization and
+rescoring are simulated with numpy over exact search, since local mode
+ignores index and quantization settings.
+
+    python -m benchmarks.collection_settings --points 20000 --dim 1536 --k 10
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.models.collection_config import CollectionSettings
+
+SETTINGS = {
+    "float32-ram": CollectionSettings(),
+    "float32-disk": CollectionSettings(on_disk=True),
+    "int8-rescore": CollectionSettings(quantization="int8", on_disk=True),
+    "int8-no-rescore": CollectionSettings(quantization="int8", on_disk=True, rescore=False),
+    "binary-rescore-x2": CollectionSettings(quantization="binary", on_disk=True, oversampling=2.0),
+    "binary-rescore-x4": CollectionSettings(quantization="binary", on_disk=True, oversampling=4.0),
+    "hnsw-m32-ef256": CollectionSettings(hnsw_m=32, hnsw_ef_construct=256, hnsw_ef=256),
+}
+
+
+def make_dataset(points: int, dim: int, queries: int, seed: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clustered unit vectors, closer to real embeddings than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, points // 500), dim))
+    data = centers[rng.integers(0, len(centers), points)] + 0.6 * rng.normal(size=(points, dim))
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    probes = data[rng.integers(0, points, queries)] + 0.3 * rng.normal(size=(queries, dim))
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    return data.astype(np.float32), probes.astype(np.float32)
+
+
+def exact_top_k(data: np.ndarray, probes: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(probes @ data.T), axis=1)[:, :k]
+
+
+def recall(found: List[List[int]], truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth.tolist())]))
+
+
+def simulate(settings: CollectionSettings, data: np.ndarray, probes: np.ndarray, k: int) -> List[List[int]]:
+    """
+    Approximates quantized search: score with the quantized vectors, then
+    optionally rescore an oversampled candidate set with the originals.
+    """
+    if settings.quantization == "int8":
+        lo, hi = np.quantile(data, [0.005, 0.995])
+        codes = np.clip(np.round((data - lo) / (hi - lo) * 255), 0, 255)
+        approx = probes @ (codes * (hi - lo) / 255 + lo).T
+    elif settings.quantization == "binary":
+        approx = np.sign(probes) @ np.sign(data).T
+    else:
+        return exact_top_k(data, probes, k).tolist()
+
+    limit = int(k * settings.oversampling) if settings.rescore else k
+    candidates = np.argsort(-approx, axis=1)[:, :limit]
+    if not settings.rescore:
+        return candidates.tolist()
+    results = []
+    for probe, ids in zip(probes, candidates):
+        scores = data[ids] @ probe
+        results.append(ids[np.argsort(-scores)[:k]].tolist())
+    return results
+
+
+def run_server(url: str, name: str, settings: CollectionSettings, data: np.ndarray, probes: np.ndarray, k: int) -> List[List[int]]:
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(url=url)
+    collection = f"bench_{name}"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    client.create_collection(collection_name=collection, **settings.create_kwargs(data.shape[1]))
+    client.upload_collection(collection_name=collection, vectors=data, ids=list(range(len(data))), batch_size=256)
+    while client.get_collection(collection).status.value != "green":
+        time.sleep(0.5)
+
+    results = []
+    for probe in probes:
+        points = client.query_points(collection_name=collection, query=probe.tolist(), limit=k, search_params=settings.search_params()).points
+        results.append([point.id for point in points])
+    client.delete_collection(collection)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--url", help="Qdrant server URL; simulates quantization when omitted.")
+    parser.add_argument("--output", default="benchmarks/results/collection_settings.json")
+    args = parser.parse_args(argv)
+
+    data, probes = make_dataset(args.points, args.dim, args.queries)
+    truth = exact_top_k(data, probes, args.k)
+
+    report = []
+    for name, settings in SETTINGS.items():
+        start = time.perf_counter()
+        if args.url:
+            found = run_server(args.url, name, settings, data, probes, args.k)
+        else:
+            found = simulate(settings, data, probes, args.k)
+        elapsed = time.perf_counter() - start
+        row = {
+            "setting": name,
+            **settings.describe(),
+            f"recall@{args.k}": round(recall(found, truth), 4),
+            "estimated_ram_mb": round(settings.estimated_ram_bytes(args.points, args.dim) / 2**20, 1),
+            "seconds": round(elapsed, 2),
+            "mode": "server" if args.url else "simulated",
+        }
+        report.append(row)
+        print(f"{name:<20} recall@{args.k}={row[f'recall@{args.k}']:.3f}  ram~{row['estimated_ram_mb']:>8.1f} MB")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"points": args.points, "dim": args.dim, "k": args.k, "results": report}, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Deterministic stand-ins for the OpenAI chat and embedding models.
+Both sleep for a configurable time per call so benchmarks exercise the same
+concurrency behaviour as the real network-bound clients.
+"""
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from src.services.llm_service import QueryAnalysis
+
+WEATHER_WORDS = re.compile(r"\b(weather|forecast|rain|snow|temperature|hot|cold|sunny|umbrella|wind)\w*", re.IGNORECASE)
+CITY_PATTERN = re.compile(r"\b(?:in|at|for)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)")
+MORE_CITIES_PATTERN = re.compile(r"(?:,|\s+and|\s+vs\.?|\s+versus)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)")
+
+
+def _fake_cities(text: str) -> List[str]:
+    match = CITY_PATTERN.search(text)
+    if not match:
+        return []
+    cities = [match.group(1)]
+    position = match.end()
+    while True:
+        more = MORE_CITIES_PATTERN.match(text, position)
+        if not more:
+            return cities
+        cities.append(more.group(1))
+        position = more.end()
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers the app's prompts without a network call.
+    The reply is chosen from the system prompt: classification and city
+    extraction get the expected short answers, summaries get `answer_words`
+    words. `latency` is spent before the first token and `token_latency`
+    between streamed tokens.
+    """
+    latency: float = 0.0
+    token_latency: float = 0.0
+    answer_words: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        system = next((m.content for m in messages if m.type == "system"), "")
+        query = messages[-1].content if messages else ""
+        if "entity extractor" in system:
+            return " | ".join(_fake_cities(query))
+        subject = "weather" if "weather assistant" in system else "document"
+        words = [f"{subject}{i % 7}" for i in range(self.answer_words)]
+        return " ".join(words) + "."
+
+    def _tokens(self, text: str) -> List[str]:
+        parts = text.split(" ")
+        return [part if i == 0 else " " + part for i, part in enumerate(parts)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(self.latency + self.token_latency * len(self._tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        await asyncio.sleep(self.latency + self.token_latency * len(self._tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(self._reply(messages)):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(self._reply(messages)):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema: Any, **kwargs: Any):
+        """
+        Returns a runnable producing a `QueryAnalysis` from the prompt, after
+        the same first-token latency as a plain call.
+        """
+        def analyze(prompt_value) -> QueryAnalysis:
+            time.sleep(self.latency)
+            return self._analysis(prompt_value)
+
+        async def aanalyze(prompt_value) -> QueryAnalysis:
+            await asyncio.sleep(self.latency)
+            return self._analysis(prompt_value)
+
+        return RunnableLambda(analyze, afunc=aanalyze, name="FakeStructuredOutput")
+
+    @staticmethod
+    def _analysis(prompt_value) -> QueryAnalysis:
+        query = prompt_value.to_messages()[-1].content
+        if WEATHER_WORDS.search(query):
+            return QueryAnalysis(intent="weather", cities=_fake_cities(query))
+        return QueryAnalysis(intent="document", topics=[word for word in query.split() if len(word) > 4][:3])
+
+
+class FakeEmbeddings(DeterministicFakeEmbedding):
+    """
+    Deterministic embeddings with a per-request delay; equal texts always map
+    to equal vectors.
+    """
+    latency: float = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def write_pdf(path: str, pages: List[str]) -> None:
+    """
+    Writes a minimal PDF with one line of Helvetica text per page.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream.decode('latin-1')}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
@@ -0,0 +1,297 @@
+"""
+End-to-end latency and throughput of the query pipeline, fully offline.
+
+Chat and embedding models are replaced by deterministic fakes with
+configurable latency, Qdrant runs in memory and the weather API is served by
+a local HTTP stub, so runs are repeatable and need no API keys. The harness
+ingests a generated PDF, replays a query corpus through the graph and
+reports:
+
+- p50/p95/p99 latency per graph node and end to end, plus the LLM calls and
+  external requests recorded inside each node,
+- throughput of `MainController.ahandle_batch` at several concurrency levels,
+  each starting from empty answer, weather and query-embedding caches,
+- ingestion pages and chunks per second.
+
+Results are written as JSON named after the current commit; pass an earlier
+file to --compare to print the change.
+
+    python -m benchmarks.pipeline --rounds 3 --concurrency 1,4,16
+    python -m benchmarks.pipeline --cold --compare benchmarks/results/pipeline-abc1234.json
+    python -m benchmarks.pipeline --speculative --compare benchmarks/results/pipeline-abc1234.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, write_pdf
+from benchmarks.weather_stub import WeatherStub
+from src.controllers.main_controller import MainController
+from src.controllers.workflow_controller import WorkflowController
+from src.models.rag_model import RAGModel
+from src.models.weather_model import WeatherModel
+from src.services.context_packer import ContextPacker
+from src.services.llm_service import LLMService
+from src.utils.config import Config
+
+DEFAULT_QUERIES = [
+    "What's the weather in London?",
+    "Will it rain in Paris tomorrow?",
+    "How hot is it in Dubai right now?",
+    "Is it snowing in Chicago?",
+    "Current temperature in Tokyo",
+    "Weather in London vs Paris vs Berlin this afternoon",
+    "What's the weather like in Nowhere?",
+    "Summarize the uploaded document.",
+    "What does the manual say about maintenance step 12?",
+    "Which filter fits the standard housing?",
+    "Explain the installation steps from the manual.",
+    "What is error code E42?",
+    "Tell me about this file.",
+    "Should I bring a jacket to Berlin?",
+    "List the safety requirements mentioned in the handbook.",
+]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    Count, mean and p50/p95/p99 of durations in seconds, reported in milliseconds.
+    """
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": sha, "dirty": dirty}
+
+
+def build_controller(args: argparse.Namespace, weather_url: str, workdir: str) -> MainController:
+    """
+    Wires the real controllers, models and services to the offline stand-ins.
+    """
+    weather_model = WeatherModel(
+        api_key="benchmark",
+        base_url=weather_url,
+        cache_ttl=Config.WEATHER_CACHE_TTL,
+        cache_stale_ttl=Config.WEATHER_CACHE_STALE_TTL,
+        cache_max_size=0 if args.cold else Config.WEATHER_CACHE_MAX_SIZE,
+        timeout=Config.WEATHER_HTTP_TIMEOUT,
+        pool_size=Config.WEATHER_HTTP_POOL_SIZE,
+    )
+    rag_model = RAGModel(
+        qdrant_path=":memory:",
+        collection_name="benchmark",
+        embeddings=FakeEmbeddings(size=args.dim, latency=args.embed_latency),
+        ingest_batch_size=Config.INGEST_BATCH_SIZE,
+        embed_concurrency=Config.INGEST_EMBED_CONCURRENCY,
+        query_cache_size=0 if args.cold else Config.QUERY_EMBEDDING_CACHE_SIZE,
+        sparse_index_path=os.path.join(workdir, "bm25.sqlite") if args.hybrid else None,
+        dense_weight=Config.HYBRID_DENSE_WEIGHT,
+        sparse_weight=Config.HYBRID_SPARSE_WEIGHT,
+        rrf_k=Config.HYBRID_RRF_K,
+        dense_budget=Config.HYBRID_DENSE_BUDGET_MS / 1000,
+        sparse_budget=Config.HYBRID_SPARSE_BUDGET_MS / 1000,
+    )
+    llm_service = LLMService(
+        llm=FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency),
+        context_packer=ContextPacker(
+            token_budget=Config.RAG_CONTEXT_TOKEN_BUDGET,
+            mmr_lambda=Config.RAG_CONTEXT_MMR_LAMBDA,
+            duplicate_threshold=Config.RAG_CONTEXT_DUPLICATE_THRESHOLD,
+        ),
+    )
+    workflow_controller = WorkflowController(weather_model=weather_model, rag_model=rag_model, llm_service=llm_service)
+    return MainController(workflow_controller=workflow_controller)
+
+
+def bench_ingestion(controller: MainController, pages: int, workdir: str) -> Dict[str, Any]:
+    path = os.path.join(workdir, "benchmark.pdf")
+    write_pdf(path, [
+        f"Page {i} covers maintenance step {i}. Filter model FX-{i} fits the standard housing. "
+        f"Error code E{i} means the pump needs service. " * 4
+        for i in range(pages)
+    ])
+    progress: Dict[str, Any] = {}
+    start = time.perf_counter()
+    controller.upload_pdf(path, on_progress=progress.update)
+    elapsed = time.perf_counter() - start
+    return {
+        "pages": pages,
+        "chunks": progress.get("chunks", 0),
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 2),
+        "chunks_per_sec": round(progress.get("chunks", 0) / elapsed, 2),
+    }
+
+
+def bench_latency(controller: MainController, queries: List[str]) -> Dict[str, Any]:
+    """
+    Runs queries one at a time. Nodes run sequentially, so the gap between
+    consecutive node updates is that node's latency.
+    """
+    nodes: Dict[str, List[float]] = {}
+    steps: Dict[str, List[float]] = {}
+    totals: List[float] = []
+    for query in queries:
+        start = last = time.perf_counter()
+        for update in controller.graph.stream({"query": query}, stream_mode="updates"):
+            now = time.perf_counter()
+            for node, values in update.items():
+                nodes.setdefault(node, []).append(now - last)
+                # LLM calls and external requests recorded by the node instrumentation.
+                for timing in (values or {}).get("timings", []):
+                    if timing["kind"] in ("llm", "external"):
+                        steps.setdefault(f"{timing['kind']}:{timing['name']}", []).append(timing["ms"] / 1000)
+            last = now
+        totals.append(time.perf_counter() - start)
+    return {
+        "end_to_end": percentiles(totals),
+        "nodes": {node: percentiles(samples) for node, samples in sorted(nodes.items())},
+        "steps": {step: percentiles(samples) for step, samples in sorted(steps.items())},
+    }
+
+
+def clear_caches(controller: MainController) -> None:
+    """
+    Empties the answer, weather and query-embedding caches.
+    """
+    workflow = controller.workflow_controller
+    workflow.answer_cache.clear()
+    workflow.weather_model.cache.clear()
+    workflow.rag_model.query_embedding_cache.clear()
+
+
+def bench_throughput(controller: MainController, queries: List[str], levels: List[int]) -> List[Dict[str, Any]]:
+    """
+    Each level starts from empty caches, so it does not replay answers cached
+    by the latency pass or by a previous level.
+    """
+    results = []
+    for level in levels:
+        clear_caches(controller)
+        start = time.perf_counter()
+        responses = controller.handle_batch(queries, max_concurrency=level)
+        elapsed = time.perf_counter() - start
+        errors = sum(1 for _, state in responses if state.get("error"))
+        results.append({
+            "concurrency": level,
+            "queries": len(queries),
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "queries_per_sec": round(len(queries) / elapsed, 2),
+        })
+    return results
+
+
+def compare(current: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def change(new: Optional[float], old: Optional[float]) -> str:
+        if not new or not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\nCompared with {baseline.get('commit', baseline_path)}:")
+    old_nodes = baseline["latency"]["nodes"]
+    for node, stats in {"end_to_end": current["latency"]["end_to_end"], **current["latency"]["nodes"]}.items():
+        old = baseline["latency"]["end_to_end"] if node == "end_to_end" else old_nodes.get(node, {})
+        print(f"  {node:<16} p50 {change(stats.get('p50_ms'), old.get('p50_ms')):>8}  p95 {change(stats.get('p95_ms'), old.get('p95_ms')):>8}")
+    old_levels = {row["concurrency"]: row for row in baseline["throughput"]}
+    for row in current["throughput"]:
+        old = old_levels.get(row["concurrency"], {})
+        print(f"  qps @{row['concurrency']:<10} {change(row['queries_per_sec'], old.get('queries_per_sec')):>8}")
+    print(f"  ingest pages/s   {change(current['ingestion']['pages_per_sec'], baseline['ingestion'].get('pages_per_sec')):>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="File with one query per line; defaults to a built-in mixed corpus.")
+    parser.add_argument("--rounds", type=int, default=3, help="How many times the corpus is replayed.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated batch concurrency levels.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds before the first token of each chat call.")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds between streamed tokens.")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Seconds per embedding request.")
+    parser.add_argument("--weather-latency", type=float, default=0.08, help="Seconds per weather API request.")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--ingest-pages", type=int, default=100)
+    parser.add_argument("--hybrid", action="store_true", help="Enable the BM25 leg of hybrid retrieval.")
+    parser.add_argument("--cold", action="store_true", help="Disable answer, weather and query-embedding caches.")
+    parser.add_argument("--speculative", action="store_true", help="Run retrieval and city extraction in parallel with classification.")
+    parser.add_argument("--output", help="Defaults to benchmarks/results/pipeline-<commit>.json.")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    args = parser.parse_args(argv)
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    else:
+        corpus = DEFAULT_QUERIES
+    queries = corpus * args.rounds
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    rag_cache_enabled, speculation_enabled = Config.RAG_CACHE_ENABLED, Config.SPECULATION_ENABLED
+    if args.cold:
+        Config.RAG_CACHE_ENABLED = False
+    Config.SPECULATION_ENABLED = args.speculative
+    try:
+        with tempfile.TemporaryDirectory() as workdir, WeatherStub(latency=args.weather_latency) as stub:
+            controller = build_controller(args, stub.url, workdir)
+            ingestion = bench_ingestion(controller, args.ingest_pages, workdir)
+            latency = bench_latency(controller, queries)
+            throughput = bench_throughput(controller, queries, levels)
+            weather_requests = stub.requests
+            controller.workflow_controller.rag_model.client.close()
+    finally:
+        Config.RAG_CACHE_ENABLED, Config.SPECULATION_ENABLED = rag_cache_enabled, speculation_enabled
+
+    report = {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "ingestion": ingestion,
+        "latency": latency,
+        "throughput": throughput,
+        "weather_requests": weather_requests,
+        "intent_tiers": controller.workflow_controller.intent_router.stats(),
+        "speculation": controller.workflow_controller.speculator.stats(),
+    }
+
+    print(f"Ingestion: {ingestion['pages_per_sec']} pages/s, {ingestion['chunks_per_sec']} chunks/s")
+    for name, stats in {"end_to_end": latency["end_to_end"], **latency["nodes"]}.items():
+        print(f"{name:<16} n={stats['count']:<4} p50={stats['p50_ms']:>8.1f} ms  p95={stats['p95_ms']:>8.1f} ms  p99={stats['p99_ms']:>8.1f} ms")
+    for name, stats in latency["steps"].items():
+        print(f"  {name:<22} n={stats['count']:<4} p50={stats['p50_ms']:>8.1f} ms  p95={stats['p95_ms']:>8.1f} ms")
+    for row in throughput:
+        print(f"concurrency {row['concurrency']:<4} {row['queries_per_sec']:>8.2f} queries/s ({row['errors']} errors)")
+
+    output = args.output or f"benchmarks/results/pipeline-{report['commit']}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    main()
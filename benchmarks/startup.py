@@ -0,0 +1,85 @@
+"""
+Cold-start cost of the application, lazy versus eager initialization.
+
+Each run is a fresh interpreter, so module imports are measured too. Runs
+are offline: API keys are dummies and nothing is called over the network.
+
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+from benchmarks.pipeline import git_revision
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+from src.controllers.main_controller import MainController
+imported = time.perf_counter()
+controller = MainController()
+constructed = time.perf_counter()
+controller.graph
+compiled = time.perf_counter()
+controller.workflow_controller.rag_model.open()
+opened = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "construct_s": constructed - imported,
+    "ready_s": constructed - start,
+    "first_query_overhead_s": compiled - constructed,
+    "rag_open_s": opened - compiled,
+}))
+"""
+
+
+def measure(lazy: bool, workdir: str) -> Dict[str, float]:
+    env = dict(
+        os.environ,
+        LAZY_INIT="true" if lazy else "false",
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "sk-startup-benchmark",
+        QDRANT_PATH=os.path.join(workdir, "qdrant"),
+        EMBEDDING_CACHE_PATH=os.path.join(workdir, "embedding_cache.sqlite"),
+        BM25_INDEX_PATH=os.path.join(workdir, "bm25_index.sqlite"),
+        LANGCHAIN_TRACING_V2="false",
+    )
+    result = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Defaults to benchmarks/results/startup-<commit>.json.")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {**git_revision(), "repeat": args.repeat, "modes": {}}
+    for mode, lazy in (("eager", False), ("lazy", True)):
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as workdir:
+                runs.append(measure(lazy, workdir))
+        summary = {key: round(median([run[key] for run in runs]), 3) for key in runs[0]}
+        report["modes"][mode] = summary
+        print(f"{mode:<6} ready {summary['ready_s']:.3f}s (import {summary['import_s']:.3f}s, construct {summary['construct_s']:.3f}s), "
+              f"then graph {summary['first_query_overhead_s']:.3f}s, RAG open {summary['rag_open_s']:.3f}s")
+
+    output = args.output or f"benchmarks/results/startup-{report['commit']}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
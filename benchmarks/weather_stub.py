@@ -0,0 +1,98 @@
+"""
+Local HTTP server imitating the OpenWeatherMap current-weather endpoint.
+"""
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+UNKNOWN_CITIES = {"nowhere", "atlantis"}
+
+
+def fake_weather(city: str, units: str = "metric") -> Dict[str, Any]:
+    """
+    OpenWeatherMap-shaped payload, deterministic per city.
+    """
+    seed = zlib.crc32(city.casefold().encode())
+    temp = round(-5 + seed % 350 / 10, 1)
+    if units == "imperial":
+        temp = round(temp * 9 / 5 + 32, 1)
+    return {
+        "coord": {"lon": round(seed % 360 - 180, 2), "lat": round(seed % 180 - 90, 2)},
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+        "base": "stations",
+        "main": {"temp": temp, "feels_like": temp - 1, "temp_min": temp - 2, "temp_max": temp + 2, "pressure": 1013, "humidity": 40 + seed % 50},
+        "visibility": 10000,
+        "wind": {"speed": round(seed % 120 / 10, 1), "deg": seed % 360},
+        "clouds": {"all": seed % 100},
+        "dt": 1700000000,
+        "sys": {"country": "XX", "sunrise": 1699970000, "sunset": 1700010000},
+        "timezone": 0,
+        "id": seed,
+        "name": city,
+        "cod": 200,
+    }
+
+
+class WeatherStub:
+    """
+    Serves `fake_weather` on 127.0.0.1 from a background thread.
+    Each response is delayed by `latency` seconds; unknown cities get a 404.
+
+        with WeatherStub(latency=0.05) as stub:
+            WeatherModel(api_key="bench", base_url=stub.url)
+    """
+    def __init__(self, latency: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                params = parse_qs(urlparse(self.path).query)
+                city = params.get("q", [""])[0]
+                units = params.get("units", ["metric"])[0]
+                time.sleep(stub.latency)
+                if not city or city.casefold() in UNKNOWN_CITIES:
+                    self._send(404, {"cod": "404", "message": "city not found"})
+                else:
+                    self._send(200, fake_weather(city, units))
+
+            def _send(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/data/2.5/weather"
+
+    def start(self) -> "WeatherStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "WeatherStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
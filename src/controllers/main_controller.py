@@ -1,14 +1,52 @@
-from src.graph.workflow import create_workflow
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from src.controllers.workflow_controller import WorkflowController
+from src.services.llm_service import FINAL_ANSWER_TAG
+from src.utils.config import Config
+
+
+def __getattr__(name: str) -> Any:
+    # LangGraph is the largest import on the query path, so the workflow
+    # module is loaded when the graph is first compiled.
+    if name != "create_workflow":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from src.graph.workflow import create_workflow
+    globals()[name] = create_workflow
+    return create_workflow
+
 
 class MainController:
     """
     Main entry point for the application.
     Orchestrates the workflow and handles user interaction from the View.
     """
-    def __init__(self):
-        self.workflow_controller = WorkflowController()
-        self.graph = create_workflow(self.workflow_controller)
+    def __init__(self, workflow_controller: Optional[WorkflowController] = None):
+        self.workflow_controller = workflow_controller or WorkflowController()
+        self._graph = None
+        self._graph_lock = threading.Lock()
+        if not Config.LAZY_INIT:
+            self.warm_up(rag=False)
+
+    @property
+    def graph(self):
+        """
+        The compiled workflow, built on first use and reused afterwards.
+        """
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    create_workflow = globals().get("create_workflow") or __getattr__("create_workflow")
+                    self._graph = create_workflow(self.workflow_controller)
+        return self._graph
+
+    def warm_up(self, rag: bool = True) -> None:
+        """
+        Compiles the graph and does the controller's deferred startup work,
+        so the first query does not pay for it. Safe to run in a background thread.
+        """
+        self.graph
+        self.workflow_controller.warm_up(rag=rag)
 
     def handle_query(self, query: str):
         """
@@ -20,8 +58,108 @@ class MainController:
         result = self.graph.invoke(inputs)
         return result.get("response", "No response generated."), result
 
-    def upload_pdf(self, file_path: str):
+    async def ahandle_query(self, query: str):
+        """
+        Async variant of `handle_query` running the async node implementations.
+        """
+        inputs = {"query": query}
+        result = await self.graph.ainvoke(inputs)
+        return result.get("response", "No response generated."), result
+
+    def stream_query(self, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Runs the workflow and yields answer tokens as they are generated.
+        Yields {"token": str} events followed by one final
+        {"response": str, "state": dict} event. Answers produced without an
+        LLM call (e.g. cache hits) arrive as a single token.
+        """
+        inputs = {"query": query}
+        state: Dict[str, Any] = dict(inputs)
+        streamed = False
+        for mode, chunk in self.graph.stream(inputs, stream_mode=["messages", "values"]):
+            if mode == "values":
+                state = chunk
+                continue
+            token = self._answer_token(chunk)
+            if token:
+                streamed = True
+                yield {"token": token}
+
+        response = state.get("response", "No response generated.")
+        if not streamed:
+            yield {"token": response}
+        yield {"response": response, "state": state}
+
+    async def astream_query(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of `stream_query`.
+        """
+        inputs = {"query": query}
+        state: Dict[str, Any] = dict(inputs)
+        streamed = False
+        async for mode, chunk in self.graph.astream(inputs, stream_mode=["messages", "values"]):
+            if mode == "values":
+                state = chunk
+                continue
+            token = self._answer_token(chunk)
+            if token:
+                streamed = True
+                yield {"token": token}
+
+        response = state.get("response", "No response generated.")
+        if not streamed:
+            yield {"token": response}
+        yield {"response": response, "state": state}
+
+    @staticmethod
+    def _answer_token(chunk) -> Optional[str]:
+        """
+        Extracts text from a streamed message chunk of a final-answer chain.
+        """
+        message, metadata = chunk
+        if FINAL_ANSWER_TAG not in metadata.get("tags", []):
+            return None
+        return message.content if isinstance(message.content, str) else None
+
+    async def ahandle_batch(self, queries: List[str], max_concurrency: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Runs many queries concurrently, keeping at most `max_concurrency` in flight.
+        Results are returned in input order; a failing query yields an error
+        response instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or Config.BATCH_MAX_CONCURRENCY)
+
+        async def run(query: str):
+            async with semaphore:
+                try:
+                    return await self.ahandle_query(query)
+                except Exception as e:
+                    return f"An error occurred: {e}", {"query": query, "error": str(e)}
+
+        return await asyncio.gather(*(run(query) for query in queries))
+
+    def handle_batch(self, queries: List[str], max_concurrency: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Blocking wrapper around `ahandle_batch` for callers without an event loop.
+        """
+        async def run():
+            try:
+                return await self.ahandle_batch(queries, max_concurrency=max_concurrency)
+            finally:
+                # asyncio.run makes a new loop each time; close the HTTP pools bound to this one.
+                await self.workflow_controller.aclose()
+
+        return asyncio.run(run())
+
+    def upload_pdf(self, file_path: str, on_progress=None):
         """
         Uploads and processes a PDF file via the RAG model.
+        `on_progress` receives a dict of page and chunk counts after each batch.
+        """
+        return self.workflow_controller.rag_model.load_and_process_pdf(file_path, on_progress=on_progress)
+
+    def upload_pdfs(self, file_paths: List[str], on_progress=None):
+        """
+        Uploads several PDF files, parsing them in parallel.
         """
-        return self.workflow_controller.rag_model.load_and_process_pdf(file_path)
+        return self.workflow_controller.rag_model.load_and_process_pdfs(file_paths, on_progress=on_progress)
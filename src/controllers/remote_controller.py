@@ -0,0 +1,92 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import httpx
+from langchain_core.documents import Document
+
+
+class RemoteController:
+    """
+    Client for the HTTP API in `views/api.py` with the interface the
+    Streamlit view uses from MainController, so the UI can run as a thin
+    client while queries and ingestion run in the API service.
+    """
+    def __init__(self, base_url: str, timeout: float = 120.0, client: Optional[httpx.Client] = None, ingest_timeout: Optional[float] = None):
+        # `client` lets callers pass a preconfigured client (e.g. a test client).
+        # Uploads get their own timeout: the server allows ingestion far longer than a query.
+        self.client = client or httpx.Client(base_url=base_url.rstrip("/"), timeout=timeout)
+        self.ingest_timeout = ingest_timeout
+
+    def handle_query(self, query: str) -> Tuple[str, Dict[str, Any]]:
+        payload = self._post_json("/query", {"query": query})
+        return payload["response"], self._restore_state(payload["state"])
+
+    def handle_batch(self, queries: List[str], max_concurrency: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        payload = self._post_json("/batch", {"queries": queries, "max_concurrency": max_concurrency})
+        return [(item["response"], self._restore_state(item["state"])) for item in payload["results"]]
+
+    def stream_query(self, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the same {"token"} and final {"response", "state"} events as
+        `MainController.stream_query`. Server-side errors raise RuntimeError.
+        """
+        with self.client.stream("POST", "/query/stream", json={"query": query}) as response:
+            if response.status_code != 200:
+                response.read()
+                raise RuntimeError(self._error_message(response))
+            for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    raise RuntimeError(event["error"])
+                if "state" in event:
+                    event["state"] = self._restore_state(event["state"])
+                yield event
+
+    def upload_pdf(self, file_path: str, on_progress=None) -> str:
+        return self.upload_pdfs([file_path], on_progress=on_progress)
+
+    def upload_pdfs(self, file_paths: List[str], on_progress=None) -> str:
+        """
+        Uploads PDFs to the API for ingestion. Progress is not streamed back;
+        `on_progress` is called once when the server has finished.
+        """
+        files = []
+        try:
+            for path in file_paths:
+                files.append(("files", (os.path.basename(path), open(path, "rb"), "application/pdf")))
+            if self.ingest_timeout is None:
+                response = self.client.post("/ingest", files=files)
+            else:
+                response = self.client.post("/ingest", files=files, timeout=self.ingest_timeout)
+        finally:
+            for _, (_, handle, _) in files:
+                handle.close()
+        if response.status_code != 200:
+            raise RuntimeError(self._error_message(response))
+        if on_progress:
+            on_progress({"files": len(file_paths), "pages": 1, "total_pages": 1, "chunks": 0, "done": True})
+        return response.json()["message"]
+
+    def _post_json(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.client.post(path, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(self._error_message(response))
+        return response.json()
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        try:
+            return response.json().get("error") or response.text
+        except ValueError:
+            return f"HTTP {response.status_code}: {response.text}"
+
+    @staticmethod
+    def _restore_state(state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turns serialized retrieved chunks back into Documents.
+        """
+        if state.get("rag_context"):
+            state["rag_context"] = [Document(page_content=doc["page_content"], metadata=doc.get("metadata") or {}) for doc in state["rag_context"]]
+        return state
@@ -1,57 +1,502 @@
-from typing import Dict, Any
+import importlib
+import threading
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from src.utils.config import Config
 from src.models.weather_model import WeatherModel
-from src.models.rag_model import RAGModel
-from src.services.llm_service import LLMService
+from src.services.llm_service import LLMService, ModelTier
+from src.services.intent_router import IntentRouter
+from src.services.context_packer import ContextPacker
+from src.services.weather_formatter import is_plain_current_query, render_weather
 from src.graph.state import AgentState
+from src.utils.semantic_cache import SemanticCache
+from src.utils.instrumentation import record_cache
+from src.utils.rate_limiter import ProviderLimiter, limiter_stats
+from src.utils.single_flight import SingleFlight
+from src.utils.speculation import Speculator
+
+if TYPE_CHECKING:
+    from src.models.rag_model import RAGModel
+
+# The RAG stack pulls in qdrant-client, langchain-qdrant and the OpenAI SDK,
+# so it is imported on first use. Names stay patchable as module attributes.
+_LAZY_IMPORTS = {
+    "RAGModel": "src.models.rag_model",
+    "CollectionSettings": "src.models.collection_config",
+    "build_embeddings": "src.models.embeddings",
+    "collection_name_for": "src.models.embeddings",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def _lazy(name: str) -> Any:
+    return globals()[name] if name in globals() else __getattr__(name)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
 
 class WorkflowController:
     """
     Controller that implements the logic for each step in the graph workflow.
     Orchestrates calls to Models and Services.
     """
-    def __init__(self):
-        self.weather_model = WeatherModel(api_key=Config.OPENWEATHER_API_KEY)
-        self.rag_model = RAGModel(qdrant_path=Config.QDRANT_PATH)
-        self.llm_service = LLMService()
+    def __init__(self, weather_model: Optional[WeatherModel] = None, rag_model: Optional["RAGModel"] = None, llm_service: Optional[LLMService] = None):
+        # Dependencies can be injected (benchmarks, tests); otherwise they are built from Config.
+        # Built ones share one rate-limit scheduler per provider.
+        self.limiters = self._build_limiters()
+        self.weather_model = weather_model or self._build_weather_model(self.limiters.get("openweather"))
+        self.llm_service = llm_service or self._build_llm_service(self.limiters.get("openai_chat"))
+        # The RAG model is opened on the first document query or upload unless LAZY_INIT is off.
+        self._rag_model = rag_model
+        self._rag_lock = threading.Lock()
+        if not Config.LAZY_INIT:
+            self.rag_model.open()
+        self.intent_router = IntentRouter(
+            keyword_threshold=Config.INTENT_KEYWORD_THRESHOLD,
+            embedding_threshold=Config.INTENT_EMBEDDING_THRESHOLD,
+            embedding_margin=Config.INTENT_EMBEDDING_MARGIN,
+            embed_query=lambda query: self.rag_model.embed_query(query),
+            aembed_query=lambda query: self.rag_model.aembed_query(query),
+            embed_documents=self._embed_exemplars if Config.INTENT_EMBEDDING_ENABLED else None,
+            aembed_documents=self._aembed_exemplars if Config.INTENT_EMBEDDING_ENABLED else None,
+        )
+        self.answer_cache = SemanticCache(
+            threshold=Config.RAG_CACHE_THRESHOLD,
+            max_size=Config.RAG_CACHE_MAX_SIZE,
+            ttl=Config.RAG_CACHE_TTL,
+        )
+        # Identical queries (or cities) already in flight share one computation.
+        self.single_flight = SingleFlight()
+        self.speculator = Speculator(max_workers=Config.SPECULATION_WORKERS)
+
+    @property
+    def rag_model(self) -> "RAGModel":
+        if self._rag_model is None:
+            with self._rag_lock:
+                if self._rag_model is None:
+                    self._rag_model = self._build_rag_model(self.limiters.get("openai_embeddings"))
+        return self._rag_model
+
+    @rag_model.setter
+    def rag_model(self, rag_model: "RAGModel") -> None:
+        self._rag_model = rag_model
+
+    @property
+    def rag_model_loaded(self) -> bool:
+        return self._rag_model is not None
+
+    def _embed_exemplars(self, texts: List[str]) -> List[List[float]]:
+        return self.rag_model.embed_texts(texts)
+
+    async def _aembed_exemplars(self, texts: List[str]) -> List[List[float]]:
+        return await self.rag_model.aembed_texts(texts)
+
+    def warm_up(self, rag: bool = True) -> None:
+        """
+        Does the deferred startup work ahead of the first query: builds the
+        chat models and, with `rag`, opens the vector store and embeds the
+        intent exemplars.
+        """
+        self.llm_service.warm_up()
+        if rag:
+            self.rag_model.open()
+            self.intent_router.warm_up()
+
+    async def aclose(self) -> None:
+        """
+        Closes async HTTP clients bound to the running event loop.
+        """
+        await self.weather_model.aclose()
+
+    @staticmethod
+    def _build_limiters() -> Dict[str, ProviderLimiter]:
+        """
+        One scheduler per outbound provider, or none with SCHEDULER_ENABLED off.
+        """
+        if not Config.SCHEDULER_ENABLED:
+            return {}
+        common = dict(
+            max_retries=Config.SCHEDULER_MAX_RETRIES,
+            base_delay=Config.SCHEDULER_BACKOFF_BASE_MS / 1000,
+            max_delay=Config.SCHEDULER_BACKOFF_MAX_MS / 1000,
+            bulk_reserve=Config.SCHEDULER_BULK_RESERVE,
+        )
+        return {
+            "openai_chat": ProviderLimiter("openai_chat", Config.OPENAI_CHAT_RPM, Config.OPENAI_CHAT_TPM, Config.OPENAI_CHAT_CONCURRENCY, **common),
+            "openai_embeddings": ProviderLimiter("openai_embeddings", Config.OPENAI_EMBEDDING_RPM, Config.OPENAI_EMBEDDING_TPM, Config.OPENAI_EMBEDDING_CONCURRENCY, **common),
+            "openweather": ProviderLimiter("openweather", Config.OPENWEATHER_RPM, 0, Config.OPENWEATHER_CONCURRENCY, **common),
+        }
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        return limiter_stats(self.limiters)
+
+    @staticmethod
+    def _build_weather_model(limiter: Optional[ProviderLimiter] = None) -> WeatherModel:
+        return WeatherModel(
+            api_key=Config.OPENWEATHER_API_KEY,
+            base_url=Config.OPENWEATHER_BASE_URL,
+            cache_ttl=Config.WEATHER_CACHE_TTL,
+            cache_stale_ttl=Config.WEATHER_CACHE_STALE_TTL,
+            cache_max_size=Config.WEATHER_CACHE_MAX_SIZE,
+            timeout=Config.WEATHER_HTTP_TIMEOUT,
+            pool_size=Config.WEATHER_HTTP_POOL_SIZE,
+            limiter=limiter,
+        )
+
+    @staticmethod
+    def _build_embeddings(max_retries: Optional[int] = None) -> Any:
+        """
+        Embeddings for EMBEDDING_BACKEND; None keeps RAGModel's default OpenAI embeddings.
+        """
+        if Config.EMBEDDING_BACKEND == "openai" and not Config.EMBEDDING_MODEL:
+            return None
+        return _lazy("build_embeddings")(
+            Config.EMBEDDING_BACKEND,
+            max_retries=max_retries,
+            model=Config.EMBEDDING_MODEL,
+            threads=Config.EMBEDDING_THREADS,
+            batch_size=Config.EMBEDDING_BATCH_SIZE,
+            max_wait=Config.EMBEDDING_BATCH_WAIT_MS / 1000,
+            cache_dir=Config.EMBEDDING_MODEL_DIR,
+        )
+
+    @classmethod
+    def _build_rag_model(cls, limiter: Optional[ProviderLimiter] = None) -> "RAGModel":
+        RAGModel, CollectionSettings = _lazy("RAGModel"), _lazy("CollectionSettings")
+        return RAGModel(
+            qdrant_path=Config.QDRANT_PATH,
+            collection_name=_lazy("collection_name_for")(Config.QDRANT_COLLECTION, Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL),
+            # Local models are not rate limited; the scheduler only fronts the OpenAI API.
+            embeddings=cls._build_embeddings(max_retries=0 if limiter else None),
+            embedding_limiter=limiter if Config.EMBEDDING_BACKEND == "openai" else None,
+            qdrant_url=Config.QDRANT_URL,
+            qdrant_api_key=Config.QDRANT_API_KEY,
+            embedding_cache_path=Config.EMBEDDING_CACHE_PATH,
+            ingest_batch_size=Config.INGEST_BATCH_SIZE,
+            embed_concurrency=Config.INGEST_EMBED_CONCURRENCY,
+            parse_workers=Config.INGEST_PARSE_WORKERS,
+            query_cache_size=Config.QUERY_EMBEDDING_CACHE_SIZE,
+            sparse_index_path=Config.BM25_INDEX_PATH if Config.HYBRID_SEARCH_ENABLED else None,
+            dense_weight=Config.HYBRID_DENSE_WEIGHT,
+            sparse_weight=Config.HYBRID_SPARSE_WEIGHT,
+            rrf_k=Config.HYBRID_RRF_K,
+            dense_budget=Config.HYBRID_DENSE_BUDGET_MS / 1000,
+            sparse_budget=Config.HYBRID_SPARSE_BUDGET_MS / 1000,
+            collection_settings=CollectionSettings(
+                quantization=Config.QDRANT_QUANTIZATION,
+                on_disk=Config.QDRANT_ON_DISK,
+                hnsw_m=Config.QDRANT_HNSW_M,
+                hnsw_ef_construct=Config.QDRANT_HNSW_EF_CONSTRUCT,
+                hnsw_ef=Config.QDRANT_HNSW_EF,
+                rescore=Config.QDRANT_RESCORE,
+                oversampling=Config.QDRANT_OVERSAMPLING,
+            ),
+            migrate_collection=Config.QDRANT_MIGRATE,
+            lazy_open=Config.LAZY_INIT,
+        )
+
+    @staticmethod
+    def _build_llm_service(limiter: Optional[ProviderLimiter] = None) -> LLMService:
+        return LLMService(
+            model_name=Config.LLM_MODEL,
+            context_packer=ContextPacker(
+                token_budget=Config.RAG_CONTEXT_TOKEN_BUDGET,
+                mmr_lambda=Config.RAG_CONTEXT_MMR_LAMBDA,
+                duplicate_threshold=Config.RAG_CONTEXT_DUPLICATE_THRESHOLD,
+                model_name=Config.LLM_RAG_RESPONSE_MODEL,
+            ),
+            tiers={
+                "classify": ModelTier(Config.LLM_CLASSIFY_MODEL, Config.LLM_CLASSIFY_MAX_TOKENS or None, Config.LLM_CLASSIFY_TIMEOUT or None),
+                "extract": ModelTier(Config.LLM_EXTRACT_MODEL, Config.LLM_EXTRACT_MAX_TOKENS or None, Config.LLM_EXTRACT_TIMEOUT or None),
+                "summarize_weather": ModelTier(Config.LLM_SUMMARIZE_WEATHER_MODEL, Config.LLM_SUMMARIZE_WEATHER_MAX_TOKENS or None, Config.LLM_SUMMARIZE_WEATHER_TIMEOUT or None),
+                "rag_response": ModelTier(Config.LLM_RAG_RESPONSE_MODEL, Config.LLM_RAG_RESPONSE_MAX_TOKENS or None, Config.LLM_RAG_RESPONSE_TIMEOUT or None),
+            },
+            fallback_models=Config.LLM_FALLBACK_MODELS,
+            escalation_confidence=Config.LLM_ESCALATION_CONFIDENCE,
+            limiter=limiter,
+        )
 
     def determine_intent(self, state: AgentState) -> Dict[str, Any]:
         """
         Analyzes the query and determines the intent.
+        The local router answers confident cases; otherwise one structured LLM
+        call returns the intent together with the cities and other entities.
+        With SPECULATION_ENABLED, retrieval (and city extraction for likely
+        weather queries) runs while an uncertain classification is pending.
         """
         query = state.get("query", "")
-        intent = self.llm_service.classify_intent(query).lower().strip()
-        
+        lean = self._speculation_lean(query)
+        if lean is None:
+            return self._classify(query)
+        branches = {"retrieval": (lambda: self._speculative_retrieval(query), Config.SPECULATIVE_RETRIEVAL_BUDGET_MS / 1000)}
+        if lean == "weather":
+            branches["cities"] = (lambda: self.llm_service.extract_cities(query), Config.SPECULATIVE_CITIES_BUDGET_MS / 1000)
+        update, results = self.speculator.run(lambda: self._classify(query), branches, self._wanted_branches)
+        return self._apply_speculation(update, results)
+
+    async def adetermine_intent(self, state: AgentState) -> Dict[str, Any]:
+        query = state.get("query", "")
+        lean = self._speculation_lean(query)
+        if lean is None:
+            return await self._aclassify(query)
+        branches = {"retrieval": (lambda: self._aspeculative_retrieval(query), Config.SPECULATIVE_RETRIEVAL_BUDGET_MS / 1000)}
+        if lean == "weather":
+            branches["cities"] = (lambda: self.llm_service.aextract_cities(query), Config.SPECULATIVE_CITIES_BUDGET_MS / 1000)
+        update, results = await self.speculator.arun(lambda: self._aclassify(query), branches, self._wanted_branches)
+        return self._apply_speculation(update, results)
+
+    def _classify(self, query: str) -> Dict[str, Any]:
+        if Config.INTENT_ROUTER_ENABLED:
+            routed = self.intent_router.route(query)
+            if routed:
+                return self._routed_intent(*routed)
+        return self._resolve_analysis(self.llm_service.analyze_query(query))
+
+    async def _aclassify(self, query: str) -> Dict[str, Any]:
+        if Config.INTENT_ROUTER_ENABLED:
+            routed = await self.intent_router.aroute(query)
+            if routed:
+                return self._routed_intent(*routed)
+        return self._resolve_analysis(await self.llm_service.aanalyze_query(query))
+
+    def _speculation_lean(self, query: str) -> Optional[str]:
+        """
+        Returns the likelier intent when speculation is worth starting, or
+        None when it is off or the keyword tier will decide instantly.
+        """
+        if not Config.SPECULATION_ENABLED:
+            return None
+        intent, confidence = self.intent_router.keyword_route(query)
+        if Config.INTENT_ROUTER_ENABLED and intent and confidence >= self.intent_router.keyword_threshold:
+            return None
+        return intent or "document"
+
+    def _speculative_retrieval(self, query: str) -> List[Any]:
+        return self.rag_model.retrieve_context(query, embedding=self.rag_model.embed_query(query))
+
+    async def _aspeculative_retrieval(self, query: str) -> List[Any]:
+        return await self.rag_model.aretrieve_context(query, embedding=await self.rag_model.aembed_query(query))
+
+    @staticmethod
+    def _wanted_branches(update: Dict[str, Any]) -> set:
+        if update["intent"] == "weather":
+            return {"cities"} if update.get("cities") is None else set()
+        return {"retrieval"}
+
+    @staticmethod
+    def _apply_speculation(update: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+        if "retrieval" in results:
+            update["rag_context"] = results["retrieval"]
+        if "cities" in results:
+            update["cities"] = results["cities"]
+        return update
+
+    @staticmethod
+    def _routed_intent(intent: str, tier: str) -> Dict[str, Any]:
+        print(f"Decided Intent: {intent} ({tier})")
+        return {"intent": intent, "intent_source": tier}
+
+    @classmethod
+    def _resolve_analysis(cls, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        update = cls._resolve_intent(analysis.get("intent", ""))
+        update["cities"] = analysis.get("cities", [])
+        update["entities"] = analysis.get("entities", {})
+        return update
+
+    @staticmethod
+    def _resolve_intent(raw_intent: str) -> Dict[str, Any]:
+        intent = raw_intent.lower().strip()
+
         if "weather" in intent:
             intent = "weather"
         else:
             intent = "document"
-            
+
         print(f"Decided Intent: {intent}")
-        return {"intent": intent}
+        return {"intent": intent, "intent_source": "llm"}
 
     def handle_weather(self, state: AgentState) -> Dict[str, Any]:
         """
         Handles the weather flow: fetches data and summarizes.
+        Reuses the cities found during classification when present.
         """
+        return self._coalesce(self._weather_key(state), lambda: self._handle_weather(state))
+
+    async def ahandle_weather(self, state: AgentState) -> Dict[str, Any]:
+        return await self._acoalesce(self._weather_key(state), lambda: self._ahandle_weather(state))
+
+    @staticmethod
+    def _weather_key(state: AgentState) -> tuple:
+        cities = state.get("cities")
+        return ("weather", _normalize(state.get("query", "")), tuple(cities) if cities is not None else None)
+
+    def _handle_weather(self, state: AgentState) -> Dict[str, Any]:
+        query = state.get("query", "")
+        cities = state.get("cities")
+        if cities is None:
+            cities = self.llm_service.extract_cities(query)
+        cities, skipped = self._limit_cities(cities)
+
+        if not cities:
+            return {"response": "I could not identify the city for the weather request."}
+
+        results = self.weather_model.fetch_weather_many(
+            cities, fetch=lambda city: self._coalesce(self._fetch_key(city), lambda: self.weather_model.fetch_weather(city))
+        )
+        weather_data, error = self._collect_weather(cities, results, skipped)
+        if error:
+            return {"response": error, "weather_data": weather_data}
+        rendered = self._render_weather(state, weather_data, cities)
+        if rendered:
+            return {"weather_data": weather_data, "response": rendered}
+
+        summary = self.llm_service.summarize_weather(query, weather_data, units=self.weather_model.units)
+        return {"weather_data": weather_data, "response": summary}
+
+    async def _ahandle_weather(self, state: AgentState) -> Dict[str, Any]:
         query = state.get("query", "")
-        city = self.llm_service.extract_city(query)
-        
-        if not city:
+        cities = state.get("cities")
+        if cities is None:
+            cities = await self.llm_service.aextract_cities(query)
+        cities, skipped = self._limit_cities(cities)
+
+        if not cities:
             return {"response": "I could not identify the city for the weather request."}
-            
-        weather_data = self.weather_model.fetch_weather(city)
-        if "error" in weather_data:
-            return {"response": f"Error fetching weather: {weather_data['error']}", "weather_data": weather_data}
-            
-        summary = self.llm_service.summarize_weather(query, weather_data)
+
+        results = await self.weather_model.afetch_weather_many(
+            cities, fetch=lambda city: self._acoalesce(self._fetch_key(city), lambda: self.weather_model.afetch_weather(city))
+        )
+        weather_data, error = self._collect_weather(cities, results, skipped)
+        if error:
+            return {"response": error, "weather_data": weather_data}
+        rendered = self._render_weather(state, weather_data, cities)
+        if rendered:
+            return {"weather_data": weather_data, "response": rendered}
+
+        summary = await self.llm_service.asummarize_weather(query, weather_data, units=self.weather_model.units)
         return {"weather_data": weather_data, "response": summary}
 
+    def _render_weather(self, state: AgentState, weather_data: Dict[str, Any], cities: List[str]) -> Optional[str]:
+        """
+        Templated answer for plain current-conditions questions, skipping the
+        summarize LLM call. None when the question needs the LLM.
+        """
+        if not Config.WEATHER_TEMPLATE_ENABLED:
+            return None
+        time_frame = (state.get("entities") or {}).get("time_frame")
+        if not is_plain_current_query(state.get("query", ""), time_frame):
+            return None
+        return render_weather(weather_data, self.weather_model.units, city=cities[0])
+
+    @staticmethod
+    def _limit_cities(cities: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Drops repeated cities and splits off those beyond WEATHER_MAX_CITIES.
+        """
+        seen, unique = set(), []
+        for city in cities:
+            if _normalize(city) not in seen:
+                seen.add(_normalize(city))
+                unique.append(city)
+        return unique[:Config.WEATHER_MAX_CITIES], unique[Config.WEATHER_MAX_CITIES:]
+
+    @staticmethod
+    def _fetch_key(city: str) -> tuple:
+        # Per city, so "Paris" and "London vs Paris" share the in-flight Paris lookup.
+        return ("weather_fetch", _normalize(city))
+
+    @staticmethod
+    def _collect_weather(cities: List[str], results: List[Dict[str, Any]], skipped: List[str]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Shapes fetched data for the summarizer: the raw payload for one city,
+        {"cities": {city: payload}, "skipped": [...]} for several. Returns an
+        error message when no city could be fetched.
+        """
+        if len(cities) == 1 and not skipped:
+            data = results[0]
+            return data, f"Error fetching weather: {data['error']}" if "error" in data else None
+
+        weather_data: Dict[str, Any] = {"cities": dict(zip(cities, results))}
+        if skipped:
+            weather_data["skipped"] = skipped
+        if all("error" in data for data in results):
+            errors = "; ".join(f"{city}: {data['error']}" for city, data in zip(cities, results))
+            return weather_data, f"Error fetching weather: {errors}"
+        return weather_data, None
+
     def handle_rag(self, state: AgentState) -> Dict[str, Any]:
         """
         Handles the RAG flow: retrieve and condense.
+        Near-identical questions against an unchanged collection are served
+        from the semantic answer cache; chunks retrieved speculatively during
+        classification are reused.
         """
+        return self._coalesce(self._rag_key(state), lambda: self._handle_rag(state))
+
+    async def ahandle_rag(self, state: AgentState) -> Dict[str, Any]:
+        return await self._acoalesce(self._rag_key(state), lambda: self._ahandle_rag(state))
+
+    def _rag_key(self, state: AgentState) -> tuple:
+        # The retrieval signature: same question against the same collection version.
+        return ("rag", _normalize(state.get("query", "")), self.rag_model.collection_version)
+
+    def _handle_rag(self, state: AgentState) -> Dict[str, Any]:
         query = state.get("query", "")
-        retrieved_docs = self.rag_model.retrieve_context(query)
+        embedding = self.rag_model.embed_query(query)
+        version = self.rag_model.collection_version
+        cached = self._lookup_answer(embedding, version)
+        if cached:
+            return {"rag_context": cached["documents"], "response": cached["answer"], "cache_hit": True}
+
+        retrieved_docs = state.get("rag_context")
+        if retrieved_docs is None:
+            retrieved_docs = self.rag_model.retrieve_context(query, embedding=embedding)
         response = self.llm_service.rag_response(query, retrieved_docs)
-        return {"rag_context": retrieved_docs, "response": response}
+        self._store_answer(embedding, version, response, retrieved_docs)
+        return {"rag_context": retrieved_docs, "response": response, "cache_hit": False}
+
+    async def _ahandle_rag(self, state: AgentState) -> Dict[str, Any]:
+        query = state.get("query", "")
+        embedding = await self.rag_model.aembed_query(query)
+        version = self.rag_model.collection_version
+        cached = self._lookup_answer(embedding, version)
+        if cached:
+            return {"rag_context": cached["documents"], "response": cached["answer"], "cache_hit": True}
+
+        retrieved_docs = state.get("rag_context")
+        if retrieved_docs is None:
+            retrieved_docs = await self.rag_model.aretrieve_context(query, embedding=embedding)
+        response = await self.llm_service.arag_response(query, retrieved_docs)
+        self._store_answer(embedding, version, response, retrieved_docs)
+        return {"rag_context": retrieved_docs, "response": response, "cache_hit": False}
+
+    def _coalesce(self, key: tuple, func):
+        if not Config.COALESCE_ENABLED:
+            return func()
+        return self.single_flight.do(key, func)
+
+    async def _acoalesce(self, key: tuple, func):
+        if not Config.COALESCE_ENABLED:
+            return await func()
+        return await self.single_flight.ado(key, func)
+
+    def _lookup_answer(self, embedding: List[float], version: int):
+        if not Config.RAG_CACHE_ENABLED:
+            return None
+        cached = self.answer_cache.lookup(embedding, version)
+        record_cache("rag_answer", "hit" if cached else "miss")
+        return cached
+
+    def _store_answer(self, embedding: List[float], version: int, response: str, retrieved_docs: List[Any]) -> None:
+        if not Config.RAG_CACHE_ENABLED:
+            return
+        chunk_ids = [doc.metadata.get("_id") for doc in retrieved_docs]
+        self.answer_cache.store(embedding, response, chunk_ids, version, documents=retrieved_docs)
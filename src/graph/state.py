@@ -1,10 +1,17 @@
-from typing import TypedDict, List, Optional, Dict, Any
+import operator
+from typing import Annotated, TypedDict, List, Optional, Dict, Any
 from langchain_core.documents import Document
 
 class AgentState(TypedDict):
     query: str
     intent: Optional[str]
+    intent_source: Optional[str]
+    cities: Optional[List[str]]
+    entities: Optional[Dict[str, Any]]
     weather_data: Optional[Dict[str, Any]]
     rag_context: Optional[List[Document]]
     response: Optional[str]
+    cache_hit: Optional[bool]
     error: Optional[str]
+    # Per-request timing records; each node appends its own.
+    timings: Annotated[List[Dict[str, Any]], operator.add]
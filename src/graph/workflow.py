@@ -1,6 +1,9 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from src.controllers.workflow_controller import WorkflowController
 from src.graph.state import AgentState
+from src.utils.config import Config
+from src.utils.instrumentation import instrument_node
 
 def create_workflow(controller=None):
     """
@@ -10,12 +13,19 @@ def create_workflow(controller=None):
         controller = WorkflowController()
     
     workflow = StateGraph(AgentState)
+
+    def node(name, func, afunc):
+        if Config.METRICS_ENABLED:
+            func, afunc = instrument_node(name, func, afunc)
+        return RunnableLambda(func, afunc=afunc)
     
     # Define Nodes
     # Note: The controller methods match the signature (state: AgentState) -> dict which updates the state.
-    workflow.add_node("classify", controller.determine_intent)
-    workflow.add_node("handle_weather", controller.handle_weather)
-    workflow.add_node("handle_rag", controller.handle_rag)
+    # Each node pairs the blocking method with its async twin so both invoke() and ainvoke() work.
+    # Nodes are timed into the state's `timings` and the metrics registry unless METRICS_ENABLED is off.
+    workflow.add_node("classify", node("classify", controller.determine_intent, controller.adetermine_intent))
+    workflow.add_node("handle_weather", node("handle_weather", controller.handle_weather, controller.ahandle_weather))
+    workflow.add_node("handle_rag", node("handle_rag", controller.handle_rag, controller.ahandle_rag))
     
     # Define Edges
     workflow.set_entry_point("classify")
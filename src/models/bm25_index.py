@@ -0,0 +1,132 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Keeps identifiers such as "PX-100", "E42" or "v2.1" as single tokens.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Local Okapi BM25 index kept alongside the Qdrant collection.
+    Documents are keyed by their Qdrant point ID so sparse and dense results
+    can be fused; their text stays in the Qdrant payload. Only postings and
+    document lengths are held in memory.
+    The index is persisted in a SQLite file at `path`: `save` appends the
+    documents added since the last save, and `refresh` loads documents saved
+    by other processes.
+    """
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._unsaved: List[Tuple[str, int, Dict[str, int]]] = []
+        self._last_seq = 0
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bm25_docs ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT NOT NULL UNIQUE, "
+                "length INTEGER NOT NULL, terms TEXT NOT NULL)"
+            )
+            self._conn.commit()
+            self.refresh()
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._lengths
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """
+        Indexes a document; re-adding an existing ID is a no-op.
+        """
+        with self._lock:
+            if doc_id in self._lengths:
+                return
+            counts = dict(Counter(tokenize(text)))
+            length = sum(counts.values())
+            self._index(doc_id, length, counts)
+            self._unsaved.append((doc_id, length, counts))
+
+    def _index(self, doc_id: str, length: int, counts: Dict[str, int]) -> None:
+        self._lengths[doc_id] = length
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._total_length += length
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
+        """
+        Returns up to `k` (doc_id, score) pairs, best first.
+        """
+        with self._lock:
+            n_docs = len(self._lengths)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def save(self) -> None:
+        """
+        Writes the documents added since the last save.
+        """
+        if self._conn is None:
+            return
+        with self._lock:
+            rows = [(doc_id, length, json.dumps(counts, separators=(",", ":"))) for doc_id, length, counts in self._unsaved]
+            self._conn.executemany("INSERT OR IGNORE INTO bm25_docs (doc_id, length, terms) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+            self._unsaved = []
+
+    def refresh(self) -> int:
+        """
+        Loads documents saved since the last refresh, including those written
+        by other processes sharing the file. Returns how many were added.
+        """
+        if self._conn is None:
+            return 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, doc_id, length, terms FROM bm25_docs WHERE seq > ? ORDER BY seq",
+                (self._last_seq,),
+            ).fetchall()
+            added = 0
+            for seq, doc_id, length, terms in rows:
+                self._last_seq = seq
+                if doc_id not in self._lengths:
+                    self._index(doc_id, length, json.loads(terms))
+                    added += 1
+            return added
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,143 @@
+from typing import Any, Dict, Optional
+from qdrant_client.http import models
+
+# Output sizes of known embedding models; anything else is probed once.
+EMBEDDING_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "BAAI/bge-small-en-v1.5": 384,
+    "BAAI/bge-base-en-v1.5": 768,
+    "sentence-transformers/all-MiniLM-L6-v2": 384,
+    "nomic-ai/nomic-embed-text-v1.5": 768,
+}
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+
+def vector_size_for(embeddings: Any) -> int:
+    """
+    Returns the vector size produced by an embeddings object.
+    """
+    dimensions = getattr(embeddings, "dimensions", None) or getattr(embeddings, "size", None)
+    if isinstance(dimensions, int):
+        return dimensions
+    model = getattr(embeddings, "model", None)
+    if model in EMBEDDING_DIMENSIONS:
+        return EMBEDDING_DIMENSIONS[model]
+    return len(embeddings.embed_query("dimension probe"))
+
+
+class CollectionSettings:
+    """
+    Memory-related Qdrant collection settings: quantization with rescoring,
+    on-disk vectors and payloads, and HNSW build/search parameters.
+    """
+    def __init__(
+        self,
+        quantization: str = "none",
+        on_disk: bool = False,
+        hnsw_m: int = 16,
+        hnsw_ef_construct: int = 100,
+        hnsw_ef: Optional[int] = None,
+        rescore: bool = True,
+        oversampling: float = 2.0,
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}.")
+        self.quantization = quantization
+        self.on_disk = on_disk
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.hnsw_ef = hnsw_ef
+        self.rescore = rescore
+        self.oversampling = oversampling
+
+    def quantization_config(self):
+        if self.quantization == "int8":
+            # Quantized vectors stay in RAM; originals may live on disk for rescoring.
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.on_disk)
+
+    def create_kwargs(self, vector_size: int) -> Dict[str, Any]:
+        """
+        Keyword arguments for `QdrantClient.create_collection`.
+        """
+        return {
+            "vectors_config": models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=self.on_disk),
+            "hnsw_config": self.hnsw_config(),
+            "quantization_config": self.quantization_config(),
+            "on_disk_payload": self.on_disk,
+        }
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        if self.quantization == "none" and self.hnsw_ef is None:
+            return None
+        quantization = None
+        if self.quantization != "none":
+            quantization = models.QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        return models.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def ensure_collection(self, client: Any, collection_name: str, vector_size: int, migrate: bool = True) -> None:
+        """
+        Creates the collection, or brings an existing one in line with these
+        settings. Quantization, HNSW and on-disk flags are updated in place;
+        Qdrant rebuilds the affected segments in the background. A different
+        vector size cannot be migrated and raises ValueError.
+        """
+        if not client.collection_exists(collection_name):
+            try:
+                client.create_collection(collection_name=collection_name, **self.create_kwargs(vector_size))
+                return
+            except Exception:
+                # Another worker sharing the server may have created it first.
+                if not client.collection_exists(collection_name):
+                    raise
+
+        params = client.get_collection(collection_name).config.params
+        existing_size = params.vectors.size if isinstance(params.vectors, models.VectorParams) else None
+        if existing_size is not None and existing_size != vector_size:
+            raise ValueError(
+                f"Collection '{collection_name}' stores {existing_size}-d vectors but the embedding model "
+                f"produces {vector_size}-d vectors. Use a new collection name and re-ingest the documents."
+            )
+        if migrate:
+            client.update_collection(
+                collection_name=collection_name,
+                vectors_config={"": models.VectorParamsDiff(on_disk=self.on_disk)},
+                hnsw_config=self.hnsw_config(),
+                quantization_config=self.quantization_config() or models.Disabled.DISABLED,
+                collection_params=models.CollectionParamsDiff(on_disk_payload=self.on_disk),
+            )
+
+    def estimated_ram_bytes(self, points: int, vector_size: int) -> int:
+        """
+        Rough resident memory for vectors and the HNSW graph.
+        """
+        if self.quantization == "int8":
+            quantized = points * vector_size
+        elif self.quantization == "binary":
+            quantized = points * vector_size // 8
+        else:
+            quantized = 0
+        originals = 0 if self.on_disk else points * vector_size * 4
+        graph = 0 if self.on_disk else points * self.hnsw_m * 2 * 4
+        return quantized + originals + graph
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "quantization": self.quantization,
+            "on_disk": self.on_disk,
+            "hnsw_m": self.hnsw_m,
+            "hnsw_ef_construct": self.hnsw_ef_construct,
+            "hnsw_ef": self.hnsw_ef,
+            "rescore": self.rescore,
+            "oversampling": self.oversampling,
+        }
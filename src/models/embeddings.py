@@ -0,0 +1,176 @@
+import asyncio
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from src.models.collection_config import EMBEDDING_DIMENSIONS
+
+EMBEDDING_BACKENDS = ("openai", "local")
+DEFAULT_LOCAL_MODEL = "BAAI/bge-small-en-v1.5"
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-item calls into batch calls. A worker thread
+    takes the first waiting item, collects whatever else arrives within
+    `max_wait` seconds (up to `max_batch` items) and runs `func` once on the
+    whole batch.
+    """
+    def __init__(self, func: Callable[[List[Any]], List[Any]], max_batch: int = 64, max_wait: float = 0.001):
+        self.func = func
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                    self._thread.start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # One bad batch must not end the worker, or every later call would hang.
+                print(f"Embedding batch failed: {e}")
+
+    def _run_batch(self, batch: List[Tuple[Any, Future]]) -> None:
+        # Callers cancelled while queued (e.g. a timed-out aembed_query) are dropped.
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.func([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    CPU sentence embeddings with fastembed (quantized ONNX models), so
+    queries and ingestion never leave the machine.
+    Concurrent queries are micro-batched into one inference call; document
+    batches go straight to the model. `threads` sets the ONNX Runtime
+    intra-op threads (None uses all cores).
+    """
+    def __init__(
+        self,
+        model: str = DEFAULT_LOCAL_MODEL,
+        threads: Optional[int] = None,
+        batch_size: int = 64,
+        max_wait: float = 0.001,
+        cache_dir: Optional[str] = None,
+        encoder: Any = None,
+    ):
+        # `encoder` injects a loaded model with fastembed's query_embed /
+        # passage_embed interface (e.g. a fake for tests).
+        self.model = model
+        self.threads = threads
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir
+        self._encoder = encoder
+        self._load_lock = threading.Lock()
+        self._dimensions: Optional[int] = None
+        self._batcher = MicroBatcher(self._embed_queries, max_batch=batch_size, max_wait=max_wait)
+
+    def load(self) -> None:
+        """
+        Loads the model (downloading it on first use) so the first query
+        does not pay for it.
+        """
+        if self._encoder is not None:
+            return
+        with self._load_lock:
+            if self._encoder is not None:
+                return
+            try:
+                from fastembed import TextEmbedding
+            except ImportError as e:
+                raise ImportError("EMBEDDING_BACKEND=local needs fastembed: pip install fastembed") from e
+            self._encoder = TextEmbedding(model_name=self.model, threads=self.threads, cache_dir=self.cache_dir)
+
+    @property
+    def encoder(self) -> Any:
+        self.load()
+        return self._encoder
+
+    @property
+    def dimensions(self) -> int:
+        if self._dimensions is None:
+            self._dimensions = EMBEDDING_DIMENSIONS.get(self.model) or len(self.embed_query("dimension probe"))
+        return self._dimensions
+
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self.encoder.query_embed(texts)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self.encoder.passage_embed(texts, batch_size=self.batch_size)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._batcher.submit(text).result()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds several queries in one call, with query (not passage) embeddings.
+        """
+        return self._embed_queries(texts) if texts else []
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._batcher.submit(text))
+
+
+def build_embeddings(
+    backend: str = "openai",
+    model: Optional[str] = None,
+    threads: Optional[int] = None,
+    batch_size: int = 64,
+    max_wait: float = 0.001,
+    cache_dir: Optional[str] = None,
+    max_retries: Optional[int] = None,
+) -> Embeddings:
+    """
+    Creates the embeddings for a backend: "openai" (remote) or "local" (fastembed on CPU).
+    `max_retries` overrides the OpenAI client's own retries.
+    """
+    if backend == "local":
+        return LocalEmbeddings(model or DEFAULT_LOCAL_MODEL, threads=threads, batch_size=batch_size, max_wait=max_wait, cache_dir=cache_dir)
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        options = {"max_retries": max_retries} if max_retries is not None else {}
+        return OpenAIEmbeddings(model=model, **options) if model else OpenAIEmbeddings(**options)
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}.")
+
+
+def collection_name_for(base: str, backend: str, model: Optional[str]) -> str:
+    """
+    Collection for an embedding model. Local models get their own collection,
+    sized for their vectors, so switching models never hits a size mismatch.
+    """
+    if backend != "local":
+        return base
+    return f"{base}_{re.sub(r'[^a-z0-9]+', '_', (model or DEFAULT_LOCAL_MODEL).lower()).strip('_')}"
@@ -1,58 +1,606 @@
+import asyncio
+import multiprocessing
 import os
-from typing import List, Any
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client.http.models import PointStruct, QueryRequest
+from src.models.bm25_index import BM25Index
+from src.models.collection_config import CollectionSettings, vector_size_for
+from src.utils.cache import TTLCache
+from src.utils.instrumentation import record_cache, timed
+from src.utils.embedding_cache import EmbeddingCache, content_hash
+from src.utils.rate_limiter import BULK, INTERACTIVE, ProviderLimiter, estimate_text_tokens
+
+# Namespace for deterministic point IDs derived from chunk content hashes.
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "neura-dynamics/chunks")
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Collection metadata key holding the version shared by every process using the collection.
+VERSION_METADATA_KEY = "neura_collection_version"
+
+
+def _make_splitter(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> RecursiveCharacterTextSplitter:
+    # start_index lets the context packer merge overlapping neighbours exactly.
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+
+
+def _parse_pdf(file_path: str, chunk_size: int, chunk_overlap: int) -> Tuple[int, List[Any]]:
+    """
+    Parses and splits one PDF. Runs in a worker process for multi-file uploads.
+    """
+    text_splitter = _make_splitter(chunk_size, chunk_overlap)
+    pages, splits = 0, []
+    for page in PyPDFLoader(file_path).lazy_load():
+        pages += 1
+        splits.extend(text_splitter.split_documents([page]))
+    return pages, splits
+
+
+def _count_pages(file_path: str) -> Optional[int]:
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(file_path).pages)
+    except Exception:
+        return None
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 class RAGModel:
     """
     Model for handling PDF loading, embedding generation, and Vector DB operations.
     """
-    def __init__(self, qdrant_path: str, collection_name: str = "neura_docs"):
+    def __init__(
+        self,
+        qdrant_path: str,
+        collection_name: str = "neura_docs",
+        embedding_cache_path: Optional[str] = None,
+        ingest_batch_size: int = 64,
+        embed_concurrency: int = 4,
+        parse_workers: int = 4,
+        query_cache_size: int = 2048,
+        sparse_index_path: Optional[str] = None,
+        dense_weight: float = 1.0,
+        sparse_weight: float = 1.0,
+        rrf_k: int = 60,
+        dense_budget: float = 1.5,
+        sparse_budget: float = 0.2,
+        collection_settings: Optional[CollectionSettings] = None,
+        migrate_collection: bool = True,
+        embeddings: Any = None,
+        lazy_open: bool = False,
+        qdrant_url: Optional[str] = None,
+        qdrant_api_key: Optional[str] = None,
+        embedding_limiter: Optional[ProviderLimiter] = None,
+        shared_version: Optional[bool] = None,
+        version_check_interval: float = 0.5,
+    ):
         self.qdrant_path = qdrant_path
+        # A Qdrant server (qdrant_url) can be shared by several processes;
+        # the local path mode locks its directory to one process.
+        self.qdrant_url = qdrant_url
+        self.qdrant_api_key = qdrant_api_key
         self.collection_name = collection_name
-        self.embeddings = OpenAIEmbeddings()
-        
-        # Ensure directory exists
-        os.makedirs(self.qdrant_path, exist_ok=True)
-        
-        self.client = QdrantClient(path=self.qdrant_path)
+        self.ingest_batch_size = ingest_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.parse_workers = parse_workers
+        # With a limiter the scheduler owns retries, so the client must not retry on its own.
+        self.embedding_limiter = embedding_limiter
+        if embeddings is None:
+            embeddings = OpenAIEmbeddings(max_retries=0) if embedding_limiter else OpenAIEmbeddings()
+        self.embeddings = embeddings
+        self.embedding_cache = EmbeddingCache(embedding_cache_path) if embedding_cache_path else None
+        self.query_embedding_cache = TTLCache(max_size=query_cache_size, ttl=None)
+
+        # Hybrid retrieval: a BM25 index next to the collection, fused with
+        # dense results by weighted reciprocal rank fusion.
+        self.sparse_index = BM25Index(sparse_index_path) if sparse_index_path else None
+        self.dense_weight = dense_weight
+        self.sparse_weight = sparse_weight
+        self.rrf_k = rrf_k
+        self.dense_budget = dense_budget
+        self.sparse_budget = sparse_budget
+        self._search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-search") if self.sparse_index is not None else None
         
-        # Initialize collection if not exists
-        if not self.client.collection_exists(self.collection_name):
-            self.client.create_collection(
+        self.collection_settings = collection_settings or CollectionSettings()
+        self.migrate_collection = migrate_collection
+        self.search_params = self.collection_settings.search_params()
+        self.vector_size: Optional[int] = None
+        self._client: Optional[QdrantClient] = None
+        self._vector_store: Optional[QdrantVectorStore] = None
+        self._open_lock = threading.Lock()
+        # With lazy_open the Qdrant client and collection are set up on first use.
+        if not lazy_open:
+            self.open()
+
+        # Bumped whenever documents are added so answer caches can detect staleness.
+        # With a Qdrant server several processes share the collection, so the
+        # version lives in its metadata and is re-read every `version_check_interval`.
+        self.shared_version = bool(qdrant_url) if shared_version is None else shared_version
+        self.version_check_interval = version_check_interval
+        self._collection_version = 0
+        self._version_checked = 0.0
+        self._version_lock = threading.Lock()
+
+    def open(self) -> None:
+        """
+        Opens the Qdrant client and creates or migrates the collection.
+        Safe to call repeatedly; only the first call does any work.
+        """
+        if self._client is not None:
+            return
+        with self._open_lock:
+            if self._client is not None:
+                return
+            if self.qdrant_url:
+                client = QdrantClient(url=self.qdrant_url, api_key=self.qdrant_api_key)
+            elif self.qdrant_path == ":memory:":
+                client = QdrantClient(location=":memory:")
+            else:
+                # Ensure directory exists
+                os.makedirs(self.qdrant_path, exist_ok=True)
+                client = QdrantClient(path=self.qdrant_path)
+
+            # Initialize the collection, or migrate its settings if it exists
+            try:
+                # Local embedding models are loaded here rather than on the first query.
+                load = getattr(self.embeddings, "load", None)
+                if callable(load):
+                    load()
+                self.vector_size = vector_size_for(self.embeddings)
+                self.collection_settings.ensure_collection(client, self.collection_name, self.vector_size, migrate=self.migrate_collection)
+            except Exception:
+                client.close()
+                raise
+            # ensure_collection already checked the vector size, so skip the
+            # store's own validation, which embeds a probe text over the network.
+            self._vector_store = QdrantVectorStore(
+                client=client,
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(size=1536, distance=Distance.COSINE),
+                embedding=self.embeddings,
+                validate_collection_config=False,
             )
-            
-        self.vector_store = QdrantVectorStore(
-            client=self.client,
-            collection_name=self.collection_name,
-            embedding=self.embeddings,
-        )
+            self._client = client
+
+    @property
+    def collection_version(self) -> int:
+        if self.shared_version and self._client is not None and time.monotonic() - self._version_checked >= self.version_check_interval:
+            self._sync_version()
+        return self._collection_version
+
+    def _read_version(self) -> int:
+        metadata = self.client.get_collection(self.collection_name).config.metadata or {}
+        return int(metadata.get(VERSION_METADATA_KEY, 0))
 
-    def load_and_process_pdf(self, file_path: str) -> str:
+    def _sync_version(self) -> None:
+        """
+        Picks up ingests made by other processes: adopts the shared version
+        and loads their additions to the BM25 index.
+        """
+        with self._version_lock:
+            self._version_checked = time.monotonic()
+            try:
+                version = self._read_version()
+            except Exception as e:
+                print(f"Could not read the collection version: {e!r}")
+                return
+            if version != self._collection_version:
+                self._collection_version = version
+                if self.sparse_index is not None:
+                    self.sparse_index.refresh()
+
+    def _bump_version(self) -> None:
+        with self._version_lock:
+            if not self.shared_version:
+                self._collection_version += 1
+                return
+            # Concurrent ingests in two processes may write the same number,
+            # but either way every reader sees the version change.
+            version = max(self._read_version(), self._collection_version) + 1
+            self.client.update_collection(self.collection_name, metadata={VERSION_METADATA_KEY: version})
+            self._collection_version = version
+            self._version_checked = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None
+
+    @property
+    def client(self) -> QdrantClient:
+        self.open()
+        return self._client
+
+    @property
+    def vector_store(self) -> QdrantVectorStore:
+        self.open()
+        return self._vector_store
+
+    @property
+    def embedding_model_name(self) -> str:
+        return getattr(self.embeddings, "model", type(self.embeddings).__name__)
+
+    @staticmethod
+    def point_id(digest: str) -> str:
+        """
+        Deterministic Qdrant point ID for a chunk content hash.
+        """
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, digest))
+
+    def load_and_process_pdf(self, file_path: str, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
         """
         Loads a PDF, splits it, and adds it to the vector store.
+        Pages are streamed through parse -> split -> embed -> upsert in
+        bounded batches, so memory stays flat for large manuals.
+        Chunks are content-addressed: chunks already in the collection are
+        skipped and previously embedded text is reused from the embedding cache.
         """
         if not os.path.exists(file_path):
             return f"Error: File {file_path} not found."
-            
+
+        progress = {"files": 1, "pages": 0, "total_pages": _count_pages(file_path)}
+        counts = self._ingest(self._iter_pdf_chunks(file_path, progress), progress, on_progress)
+        return (
+            f"Successfully processed {counts['chunks']} chunks from {file_path} "
+            f"({counts['new']} new, {counts['reused']} reused, {counts['skipped']} skipped)."
+        )
+
+    def load_and_process_pdfs(self, file_paths: List[str], on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        """
+        Ingests several PDFs, parsing and splitting them in a process pool
+        while the calling process embeds and upserts. Files are handed to the
+        pool one per worker, so memory is bounded by `parse_workers` files.
+        """
+        missing = [path for path in file_paths if not os.path.exists(path)]
+        if missing:
+            return f"Error: File {missing[0]} not found."
+
+        progress = {"files": len(file_paths), "pages": 0, "total_pages": sum(_count_pages(path) or 0 for path in file_paths) or None}
+
+        def chunks():
+            workers = min(self.parse_workers, len(file_paths)) or 1
+            queued = iter(file_paths)
+            # Spawned, not forked: the parent already runs threads (API server, UI, ingest pool).
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                # One file per worker in flight, so at most `workers` parsed files are held at once.
+                in_flight = {pool.submit(_parse_pdf, path, CHUNK_SIZE, CHUNK_OVERLAP) for path in islice(queued, workers)}
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pages, splits = future.result()
+                        progress["pages"] += pages
+                        yield from splits
+                        del splits
+                        for path in islice(queued, 1):
+                            in_flight.add(pool.submit(_parse_pdf, path, CHUNK_SIZE, CHUNK_OVERLAP))
+
+        counts = self._ingest(chunks(), progress, on_progress)
+        return (
+            f"Successfully processed {counts['chunks']} chunks from {len(file_paths)} files "
+            f"({counts['new']} new, {counts['reused']} reused, {counts['skipped']} skipped)."
+        )
+
+    def _iter_pdf_chunks(self, file_path: str, progress: Dict[str, Any]) -> Iterator[Any]:
         loader = PyPDFLoader(file_path)
-        docs = loader.load()
-        
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
-        
-        self.vector_store.add_documents(documents=splits)
-        return f"Successfully processed {len(splits)} chunks from {file_path}."
+        text_splitter = _make_splitter()
+        for page in loader.lazy_load():
+            progress["pages"] += 1
+            yield from text_splitter.split_documents([page])
+
+    def _ingest(self, chunks: Iterable[Any], progress: Dict[str, Any], on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, int]:
+        """
+        Embeds chunk batches concurrently and upserts them in order.
+        At most `embed_concurrency` batches are in flight; the producer waits
+        for the oldest one before reading further (backpressure).
+
+        Returns:
+            Dict[str, int]: chunk total plus new, reused and skipped counts.
+        """
+        counts = {"chunks": 0, "new": 0, "reused": 0, "skipped": 0}
+        seen = set()
+        in_flight = deque()
+
+        def drain_oldest():
+            pending, future = in_flight.popleft()
+            vectors, reused = future.result()
+            self._write_points(pending, vectors)
+            # Saved and bumped per written batch so a failure later in the run
+            # still invalidates answer caches, here and in other processes.
+            if self.sparse_index is not None:
+                self.sparse_index.save()
+            self._bump_version()
+            counts["reused"] += reused
+            counts["new"] += len(pending) - reused
+            if on_progress:
+                on_progress({**progress, **counts})
+
+        with ThreadPoolExecutor(max_workers=self.embed_concurrency) as pool:
+            for batch in _batched(chunks, self.ingest_batch_size):
+                counts["chunks"] += len(batch)
+                pending = self._new_chunks(batch, seen, counts)
+                if not pending:
+                    continue
+                in_flight.append((pending, pool.submit(self._embed_chunks, pending)))
+                if len(in_flight) >= self.embed_concurrency:
+                    drain_oldest()
+            while in_flight:
+                drain_oldest()
 
-    def retrieve_context(self, query: str, k: int = 4) -> List[Any]:
+        if self.sparse_index is not None:
+            self.sparse_index.save()
+        if on_progress:
+            on_progress({**progress, **counts, "done": True})
+        return counts
+
+    def _new_chunks(self, batch: List[Any], seen: set, counts: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Drops chunks already seen in this run or already stored in the collection.
+        """
+        pending: Dict[str, Any] = {}
+        for doc in batch:
+            digest = content_hash(doc.page_content)
+            if digest in seen:
+                counts["skipped"] += 1
+                continue
+            seen.add(digest)
+            doc.metadata["content_hash"] = digest
+            pending[digest] = doc
+
+        existing = self._existing_point_ids([self.point_id(digest) for digest in pending])
+        for digest in list(pending):
+            if self.point_id(digest) in existing:
+                doc = pending.pop(digest)
+                counts["skipped"] += 1
+                # Backfill chunks stored before the sparse index existed.
+                if self.sparse_index is not None:
+                    self.sparse_index.add(self.point_id(digest), doc.page_content)
+        return pending
+
+    def _write_points(self, pending: Dict[str, Any], vectors: Dict[str, List[float]]) -> None:
+        points = [
+            PointStruct(
+                id=self.point_id(digest),
+                vector=vectors[digest],
+                payload={
+                    self.vector_store.content_payload_key: doc.page_content,
+                    self.vector_store.metadata_payload_key: doc.metadata,
+                },
+            )
+            for digest, doc in pending.items()
+        ]
+        self.client.upsert(collection_name=self.collection_name, points=points)
+        if self.sparse_index is not None:
+            for digest, doc in pending.items():
+                self.sparse_index.add(self.point_id(digest), doc.page_content)
+
+    def _existing_point_ids(self, point_ids: List[str]) -> set:
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=point_ids,
+            with_payload=False,
+            with_vectors=False,
+        )
+        return {str(record.id) for record in records}
+
+    def _embed_chunks(self, pending: Dict[str, Any]) -> Tuple[Dict[str, List[float]], int]:
+        """
+        Returns vectors for every pending chunk, embedding only cache misses,
+        along with how many came from the cache. Runs on the embedding pool.
+        """
+        model = self.embedding_model_name
+        vectors = self.embedding_cache.get_many(model, list(pending)) if self.embedding_cache else {}
+        reused = len(vectors)
+
+        missing = [digest for digest in pending if digest not in vectors]
+        if missing:
+            embedded = self.embed_texts([pending[digest].page_content for digest in missing], BULK)
+            fresh = dict(zip(missing, embedded))
+            if self.embedding_cache:
+                self.embedding_cache.put_many(model, fresh)
+            vectors.update(fresh)
+        return vectors, reused
+
+    def _limited(self, func: Callable[[], Any], tokens: int, priority: int = INTERACTIVE) -> Any:
+        if self.embedding_limiter is None:
+            return func()
+        return self.embedding_limiter.call(func, tokens, priority)
+
+    async def _alimited(self, func: Callable[[], Any], tokens: int, priority: int = INTERACTIVE) -> Any:
+        if self.embedding_limiter is None:
+            return await func()
+        return await self.embedding_limiter.acall(func, tokens, priority)
+
+    def embed_texts(self, texts: List[str], priority: int = INTERACTIVE) -> List[List[float]]:
+        """
+        Embeds texts through the embedding limiter; ingestion passes BULK so
+        queries are served first when the provider is saturated.
+        """
+        return self._limited(lambda: self.embeddings.embed_documents(texts), estimate_text_tokens(texts), priority)
+
+    async def aembed_texts(self, texts: List[str], priority: int = INTERACTIVE) -> List[List[float]]:
+        return await self._alimited(lambda: self.embeddings.aembed_documents(texts), estimate_text_tokens(texts), priority)
+
+    def _embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds queries through the query path, so batched and single queries
+        get the same vector for a cache key. OpenAI embeds queries and
+        documents identically, so its batch stays one request.
+        """
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if callable(embed_queries):
+            return embed_queries(texts)
+        if isinstance(self.embeddings, OpenAIEmbeddings):
+            return self.embeddings.embed_documents(texts)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def _query_cache_key(self, query: str) -> tuple:
+        return (" ".join(query.split()).casefold(), self.embedding_model_name)
+
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embeds a query, reusing the vector for repeated (normalized) text.
+        """
+        key = self._query_cache_key(query)
+        vector = self.query_embedding_cache.get(key)
+        record_cache("query_embedding", "miss" if vector is None else "hit")
+        if vector is None:
+            vector = self._limited(lambda: self.embeddings.embed_query(query), estimate_text_tokens([query]))
+            self.query_embedding_cache.set(key, vector)
+        return vector
+
+    async def aembed_query(self, query: str) -> List[float]:
+        key = self._query_cache_key(query)
+        vector = self.query_embedding_cache.get(key)
+        record_cache("query_embedding", "miss" if vector is None else "hit")
+        if vector is None:
+            vector = await self._alimited(lambda: self.embeddings.aembed_query(query), estimate_text_tokens([query]))
+            self.query_embedding_cache.set(key, vector)
+        return vector
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embeds many queries, sending all cache misses in a single request.
+        """
+        keys = [self._query_cache_key(query) for query in queries]
+        vectors = {key: self.query_embedding_cache.get(key) for key in keys}
+        # First original spelling per uncached key.
+        missing = {}
+        for key, query in zip(keys, queries):
+            if vectors[key] is None:
+                missing.setdefault(key, query)
+        if missing:
+            texts = list(missing.values())
+            embedded = self._limited(lambda: self._embed_query_batch(texts), estimate_text_tokens(texts))
+            for key, vector in zip(missing, embedded):
+                self.query_embedding_cache.set(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    def retrieve_context(self, query: str, k: int = 4, embedding: Optional[List[float]] = None) -> List[Any]:
         """
         Retrieves relevant documents for a query.
+        Pass a precomputed `embedding` to skip re-embedding the query.
+        With a sparse index configured, dense and BM25 results are fused.
+        """
+        if self.sparse_index is not None:
+            with timed("external", "hybrid_search"):
+                return self._hybrid_search(query, k, embedding)
+        if embedding is None:
+            embedding = self.embed_query(query)
+        with timed("external", "vector_search"):
+            return self._search_by_vector(embedding, k)
+
+    async def aretrieve_context(self, query: str, k: int = 4, embedding: Optional[List[float]] = None) -> List[Any]:
+        """
+        Async variant of `retrieve_context`.
+        """
+        if embedding is None:
+            embedding = await self.aembed_query(query)
+        return await asyncio.to_thread(self.retrieve_context, query, k, embedding)
+
+    def retrieve_many(self, queries: List[str], k: int = 4) -> List[List[Any]]:
+        """
+        Retrieves documents for several queries with one embedding request
+        and one batched vector search.
+        """
+        if not queries:
+            return []
+        embeddings = self.embed_queries(queries)
+        limit = self._candidate_count(k) if self.sparse_index is not None else k
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[QueryRequest(query=embedding, limit=limit, params=self.search_params, with_payload=True) for embedding in embeddings],
+        )
+        results = [self._to_documents(response.points) for response in responses]
+        if self.sparse_index is None:
+            return results
+        return [self._fuse(dense_docs, self.sparse_index.search(query, limit), k) for query, dense_docs in zip(queries, results)]
+
+    @staticmethod
+    def _candidate_count(k: int) -> int:
+        return max(k * 3, 10)
+
+    def _hybrid_search(self, query: str, k: int, embedding: Optional[List[float]] = None) -> List[Any]:
         """
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": k})
-        return retriever.invoke(query)
+        Runs the dense and BM25 legs in parallel, each within its own latency
+        budget, and fuses whatever finished in time.
+        """
+        candidates = self._candidate_count(k)
+
+        def dense():
+            vector = embedding if embedding is not None else self.embed_query(query)
+            return self._search_by_vector(vector, candidates)
+
+        start = time.monotonic()
+        dense_future = self._search_pool.submit(dense)
+        sparse_future = self._search_pool.submit(self.sparse_index.search, query, candidates)
+        dense_docs, dense_error = self._leg_result(dense_future, start + self.dense_budget, "dense")
+        sparse_hits, _ = self._leg_result(sparse_future, start + self.sparse_budget, "sparse")
+
+        if dense_error is not None and not sparse_hits:
+            raise dense_error
+        return self._fuse(dense_docs or [], sparse_hits or [], k)
+
+    @staticmethod
+    def _leg_result(future: Future, deadline: float, name: str) -> Tuple[Any, Optional[BaseException]]:
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic())), None
+        except Exception as e:
+            future.cancel()
+            print(f"{name} retrieval skipped: {e!r}")
+            return None, e
+
+    def _fuse(self, dense_docs: List[Any], sparse_hits: List[Tuple[str, float]], k: int) -> List[Any]:
+        """
+        Weighted reciprocal rank fusion: score = sum(weight / (rrf_k + rank)).
+        """
+        scores: Dict[str, float] = {}
+        docs: Dict[str, Any] = {}
+        for rank, doc in enumerate(dense_docs, start=1):
+            doc_id = str(doc.metadata["_id"])
+            scores[doc_id] = scores.get(doc_id, 0.0) + self.dense_weight / (self.rrf_k + rank)
+            docs[doc_id] = doc
+        for rank, (doc_id, _) in enumerate(sparse_hits, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + self.sparse_weight / (self.rrf_k + rank)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+        # The BM25 index holds no text; sparse-only hits are read from Qdrant.
+        missing = [doc_id for doc_id in ranked if doc_id not in docs]
+        if missing:
+            for doc in self._to_documents(self.client.retrieve(collection_name=self.collection_name, ids=missing, with_payload=True)):
+                docs[str(doc.metadata["_id"])] = doc
+        return [docs[doc_id] for doc_id in ranked if doc_id in docs]
+
+    def _search_by_vector(self, embedding: List[float], k: int) -> List[Any]:
+        # Query Qdrant directly; the vector store wrapper re-validates the
+        # collection config on every search.
+        points = self.client.query_points(
+            collection_name=self.collection_name,
+            query=embedding,
+            limit=k,
+            search_params=self.search_params,
+            with_payload=True,
+        ).points
+        return self._to_documents(points)
+
+    def _to_documents(self, points: List[Any]) -> List[Document]:
+        documents = []
+        for point in points:
+            metadata = dict(point.payload.get(self.vector_store.metadata_payload_key) or {})
+            metadata["_id"] = point.id
+            metadata["_collection_name"] = self.collection_name
+            documents.append(Document(page_content=point.payload.get(self.vector_store.content_payload_key, ""), metadata=metadata))
+        return documents
@@ -1,39 +1,260 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+from src.utils.cache import TTLCache, HIT, STALE
+from src.utils.instrumentation import record, record_cache
+from src.utils.rate_limiter import BULK, INTERACTIVE, ProviderLimiter
 
 class WeatherModel:
     """
     Model for fetching weather data from OpenWeatherMap API.
     Refrains from business logic or complex decision making.
     """
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.openweathermap.org/data/2.5/weather",
+        units: str = "metric",
+        cache_ttl: float = 600.0,
+        cache_stale_ttl: float = 300.0,
+        cache_max_size: int = 1024,
+        timeout: float = 5.0,
+        pool_size: int = 20,
+        limiter: Optional[ProviderLimiter] = None,
+    ):
         self.api_key = api_key
-        self.base_url = "https://api.openweathermap.org/data/2.5/weather"
+        self.base_url = base_url
+        self.units = units
+        self.timeout = timeout
+        # Shared scheduler for OpenWeatherMap calls: rate limits and retries.
+        self.limiter = limiter
+        self.cache = TTLCache(max_size=cache_max_size, ttl=cache_ttl, stale_ttl=cache_stale_ttl)
 
-    def fetch_weather(self, city: str) -> Dict[str, Any]:
+        # One keep-alive session so repeated lookups reuse the TLS connection.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.pool_size = pool_size
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(city: str, units: str) -> tuple:
+        return (" ".join(city.split()).casefold(), units)
+
+    def fetch_weather(self, city: str, units: Optional[str] = None) -> Dict[str, Any]:
         """
         Fetches weather data for a specific city.
-        
+        Successful responses are cached per normalized city name and units.
+
         Args:
             city (str): Name of the city.
-            
+            units (str, optional): OpenWeatherMap units, defaults to the model's units.
+
         Returns:
             Dict[str, Any]: Raw weather data or error info.
         """
         if not self.api_key:
             return {"error": "API key not configured."}
 
-        params = {
+        units = units or self.units
+        key = self._cache_key(city, units)
+        status, cached = self.cache.lookup(key)
+        record_cache("weather", status)
+        if status == HIT:
+            return cached
+        if status == STALE:
+            self._refresh_in_background(key, city, units)
+            return cached
+
+        data = self._request(city, units)
+        if "error" not in data:
+            self.cache.set(key, data)
+        return data
+
+    async def afetch_weather(self, city: str, units: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async variant of `fetch_weather` sharing the same cache.
+        """
+        if not self.api_key:
+            return {"error": "API key not configured."}
+
+        units = units or self.units
+        key = self._cache_key(city, units)
+        status, cached = self.cache.lookup(key)
+        record_cache("weather", status)
+        if status == HIT:
+            return cached
+        if status == STALE:
+            self._refresh_in_background(key, city, units)
+            return cached
+
+        data = await self._arequest(city, units)
+        if "error" not in data:
+            self.cache.set(key, data)
+        return data
+
+    def fetch_weather_many(
+        self,
+        cities: List[str],
+        units: Optional[str] = None,
+        fetch: Optional[Callable[[str], Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetches several cities concurrently, returning results in input order.
+        OpenWeatherMap has no bulk lookup by city name, so this fans out one
+        cached request per city over the shared connection pool.
+        `fetch(city)` replaces the per-city lookup, e.g. to coalesce it with
+        other in-flight requests for the same city.
+        """
+        fetch = fetch or (lambda city: self.fetch_weather(city, units))
+        if len(cities) <= 1:
+            return [fetch(city) for city in cities]
+        # Each call runs in a copy of the caller's context so its timings reach the request's records.
+        executor = self._get_executor()
+        futures = [executor.submit(contextvars.copy_context().run, fetch, city) for city in cities]
+        return [future.result() for future in futures]
+
+    async def afetch_weather_many(
+        self,
+        cities: List[str],
+        units: Optional[str] = None,
+        fetch: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of `fetch_weather_many`.
+        """
+        fetch = fetch or (lambda city: self.afetch_weather(city, units))
+        return list(await asyncio.gather(*(fetch(city) for city in cities)))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="weather")
+        return self._executor
+
+    def _params(self, city: str, units: str) -> Dict[str, str]:
+        return {
             "q": city,
             "appid": self.api_key,
-            "units": "metric"
+            "units": units
         }
-        
+
+    def _request(self, city: str, units: str, priority: int = INTERACTIVE) -> Dict[str, Any]:
+        start = time.perf_counter()
+        data = self._send(city, units, priority)
+        record("external", "openweather", time.perf_counter() - start, error=data.get("error"))
+        return data
+
+    async def _arequest(self, city: str, units: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        data = await self._asend(city, units)
+        record("external", "openweather", time.perf_counter() - start, error=data.get("error"))
+        return data
+
+    def _get(self, params: Dict[str, str]) -> Dict[str, Any]:
+        response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        if self.limiter:
+            self.limiter.observe_headers(response.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def _aget(self, params: Dict[str, str]) -> Dict[str, Any]:
+        response = await self._get_async_client().get(self.base_url, params=params)
+        if self.limiter:
+            self.limiter.observe_headers(response.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def _send(self, city: str, units: str, priority: int = INTERACTIVE) -> Dict[str, Any]:
+        params = self._params(city, units)
+
         try:
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            return response.json()
+            if self.limiter:
+                return self.limiter.call(lambda: self._get(params), priority=priority)
+            return self._get(params)
         except requests.exceptions.HTTPError as http_err:
-             return {"error": f"HTTP error occurred: {http_err}", "status_code": response.status_code}
+            return {"error": f"HTTP error occurred: {http_err}", "status_code": http_err.response.status_code}
+        except Exception as err:
+            return {"error": f"An error occurred: {err}"}
+
+    async def _asend(self, city: str, units: str) -> Dict[str, Any]:
+        params = self._params(city, units)
+
+        try:
+            if self.limiter:
+                return await self.limiter.acall(lambda: self._aget(params))
+            return await self._aget(params)
+        except httpx.HTTPStatusError as http_err:
+            return {"error": f"HTTP error occurred: {http_err}", "status_code": http_err.response.status_code}
         except Exception as err:
             return {"error": f"An error occurred: {err}"}
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        Returns a pooled async client bound to the running event loop.
+        A new client is created when called from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._close_stale_client()
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+            self._async_client_loop = loop
+        return self._async_client
+
+    def _close_stale_client(self) -> None:
+        # A client bound to another loop is closed on that loop while it still runs;
+        # callers that end their loop (e.g. asyncio.run) close it first with aclose().
+        client, loop = self._async_client, self._async_client_loop
+        self._async_client = self._async_client_loop = None
+        if client is not None and loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+
+    def _refresh_in_background(self, key: tuple, city: str, units: str) -> None:
+        """
+        Re-fetches a stale entry without blocking the caller.
+        At most one refresh per key is in flight.
+        """
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                # Nobody waits on a refresh, so it yields to live lookups.
+                data = self._request(city, units, BULK)
+                if "error" not in data:
+                    self.cache.set(key, data)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters for the weather cache.
+        """
+        return self.cache.stats()
@@ -0,0 +1,179 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class ContextPacker:
+    """
+    Assembles retrieved chunks into a prompt context of bounded size.
+    Overlapping or adjacent chunks from the same source page are merged,
+    near-duplicates are removed with maximal marginal relevance (MMR) over
+    lexical similarity, and the result is packed into a token budget with a
+    source header per passage.
+    """
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        mmr_lambda: float = 0.7,
+        duplicate_threshold: float = 0.85,
+        model_name: str = "gpt-4o",
+        min_overlap: int = 20,
+    ):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.model_name = model_name
+        self.min_overlap = min_overlap
+        self._encoder = None
+        self._encoder_loaded = False
+
+    def pack(self, docs: List[Any]) -> str:
+        """
+        Returns the context text for the prompt, best passages first.
+        """
+        passages = self.merge(docs)
+        passages = self.select(passages)
+
+        parts, used = [], 0
+        for passage in passages:
+            block = f"[{self._label(passage['metadata'])}]\n{passage['text']}"
+            cost = self.count_tokens(block)
+            remaining = self.token_budget - used
+            if cost > remaining:
+                # Truncate the last passage only if a useful amount fits.
+                if remaining >= 50:
+                    parts.append(self._truncate(block, remaining))
+                break
+            parts.append(block)
+            used += cost
+        return "\n\n".join(parts)
+
+    def merge(self, docs: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Merges chunks that overlap or touch within the same source and page.
+        Merged passages keep the rank of their best-ranked chunk.
+        """
+        passages: List[Dict[str, Any]] = []
+        groups: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+        for rank, doc in enumerate(docs):
+            metadata = doc.metadata or {}
+            passage = {
+                "text": doc.page_content,
+                "metadata": metadata,
+                "rank": rank,
+                "start": metadata.get("start_index"),
+            }
+            groups.setdefault((metadata.get("source"), metadata.get("page")), []).append(passage)
+
+        for group in groups.values():
+            if all(p["start"] is not None for p in group):
+                group.sort(key=lambda p: p["start"])
+            merged = [group[0]]
+            for passage in group[1:]:
+                combined = self._combine(merged[-1], passage)
+                if combined is None:
+                    merged.append(passage)
+                else:
+                    merged[-1] = combined
+            passages.extend(merged)
+
+        passages.sort(key=lambda p: p["rank"])
+        return passages
+
+    def select(self, passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Orders passages by MMR and drops near-duplicates of already chosen ones.
+        Relevance is taken from retrieval rank.
+        """
+        if not passages:
+            return []
+        token_sets = [set(WORD_PATTERN.findall(p["text"].lower())) for p in passages]
+        relevance = [1.0 - i / len(passages) for i in range(len(passages))]
+        remaining = list(range(len(passages)))
+        chosen: List[int] = []
+
+        while remaining:
+            best, best_score = None, None
+            for i in list(remaining):
+                redundancy = max((_jaccard(token_sets[i], token_sets[j]) for j in chosen), default=0.0)
+                if redundancy >= self.duplicate_threshold:
+                    remaining.remove(i)
+                    continue
+                score = self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+                if best_score is None or score > best_score:
+                    best, best_score = i, score
+            if best is None:
+                break
+            chosen.append(best)
+            remaining.remove(best)
+        return [passages[i] for i in chosen]
+
+    def count_tokens(self, text: str) -> int:
+        encoder = self._get_encoder()
+        if encoder is None:
+            # Roughly four characters per token for English text.
+            return max(1, len(text) // 4)
+        return len(encoder.encode(text))
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        encoder = self._get_encoder()
+        if encoder is None:
+            return text[:tokens * 4]
+        return encoder.decode(encoder.encode(text)[:tokens])
+
+    def _get_encoder(self):
+        if not self._encoder_loaded:
+            self._encoder_loaded = True
+            try:
+                import tiktoken
+                self._encoder = tiktoken.encoding_for_model(self.model_name)
+            except Exception:
+                # Unknown model or no access to the encoding files.
+                self._encoder = None
+        return self._encoder
+
+    def _combine(self, first: Dict[str, Any], second: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if first["start"] is not None and second["start"] is not None:
+            end = first["start"] + len(first["text"])
+            # The splitter strips whitespace, so touching chunks may be a char apart.
+            if second["start"] > end + 1:
+                return None
+            overlap = max(0, end - second["start"])
+            text = first["text"] + ("" if overlap else " ") + second["text"][overlap:]
+        else:
+            overlap = _text_overlap(first["text"], second["text"], self.min_overlap)
+            if not overlap:
+                return None
+            text = first["text"] + second["text"][overlap:]
+        return {
+            "text": text,
+            "metadata": first["metadata"],
+            "rank": min(first["rank"], second["rank"]),
+            "start": first["start"],
+        }
+
+    @staticmethod
+    def _label(metadata: Dict[str, Any]) -> str:
+        source = metadata.get("source")
+        label = f"Source: {os.path.basename(source)}" if source else "Source: document"
+        page = metadata.get("page_label") or (metadata["page"] + 1 if isinstance(metadata.get("page"), int) else None)
+        return f"{label}, page {page}" if page is not None else label
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _text_overlap(first: str, second: str, min_overlap: int, max_overlap: int = 500) -> int:
+    """
+    Length of the longest suffix of `first` that is a prefix of `second`,
+    looking at most `max_overlap` characters back.
+    """
+    for size in range(min(len(first), len(second), max_overlap), min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
@@ -0,0 +1,231 @@
+import math
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# (pattern, weight) pairs. Strong cues alone clear the default threshold,
+# weak cues need corroboration from another match. "forecast" is weak: sales
+# and budget forecasts are common, so it needs a location or second cue.
+WEATHER_PATTERNS = [
+    (r"\bweather\b", 0.9),
+    (r"\bforecasts?\b", 0.55),
+    (r"\b(rain|raining|rainy|snow|snowing|snowy|drizzle|thunderstorms?)\b", 0.85),
+    (r"\b(sunny|cloudy|overcast|foggy|humid|humidity)\b", 0.6),
+    (r"\b(temperature|degrees|celsius|fahrenheit|windy|wind speed)\b", 0.5),
+    (r"\b(umbrella|jacket)\b", 0.4),
+    (r"\b(hot|cold|warm|chilly)\b", 0.3),
+]
+DOCUMENT_PATTERNS = [
+    (r"\b(pdf|document|doc|docs|file|handbook|manual)\b", 0.9),
+    (r"\b(uploaded|according to|in the text)\b", 0.9),
+    (r"\b(summari[sz]e|summary|overview|tl;?dr)\b", 0.85),
+    (r"\b(page|chapter|section|paragraph|appendix)\s*\d*\b", 0.6),
+    (r"\b(explain|define|definition|what is|what are|who is|how do(es)?)\b", 0.3),
+]
+# Case-sensitive: "in London", "for New York" hint at a location.
+LOCATION_PATTERN = (re.compile(r"\b(in|at|for)\s+[A-Z][a-zA-Z]+"), 0.3)
+
+DEFAULT_EXEMPLARS = {
+    "weather": [
+        "What's the weather in London?",
+        "Will it rain tomorrow in Paris?",
+        "How hot is it in Dubai right now?",
+        "Current temperature in Tokyo",
+        "Is it snowing in Chicago?",
+        "Do I need an umbrella in Seattle today?",
+        "What's the forecast for Berlin this weekend?",
+        "How windy is it in Wellington?",
+    ],
+    "document": [
+        "Summarize the uploaded PDF.",
+        "What does the document say about refunds?",
+        "Tell me about this file.",
+        "What are the key points in chapter 3?",
+        "Explain the installation steps from the manual.",
+        "Who is the author of the report?",
+        "List the requirements mentioned in the handbook.",
+        "What is the definition of a service level agreement?",
+    ],
+}
+
+
+class IntentRouter:
+    """
+    Local routing tiers placed in front of the LLM intent classifier.
+    Tier 1 scores keyword/regex cues; tier 2 compares the query embedding with
+    labeled exemplars. A tier only answers when its confidence clears its
+    threshold, otherwise the query falls through to the LLM.
+    """
+    def __init__(
+        self,
+        embeddings: Any = None,
+        keyword_threshold: float = 0.8,
+        embedding_threshold: float = 0.82,
+        embedding_margin: float = 0.03,
+        exemplars: Optional[Dict[str, List[str]]] = None,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+        aembed_query: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+        embed_documents: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        aembed_documents: Optional[Callable[[List[str]], Awaitable[List[List[float]]]]] = None,
+    ):
+        self.embeddings = embeddings
+        # Optional embedders (e.g. a cached one shared with retrieval, or one
+        # resolving a lazily built model); default to the embeddings object's own methods.
+        self._embed_query = embed_query
+        self._aembed_query = aembed_query
+        self._embed_documents = embed_documents
+        self._aembed_documents = aembed_documents
+        self.keyword_threshold = keyword_threshold
+        self.embedding_threshold = embedding_threshold
+        self.embedding_margin = embedding_margin
+        self.exemplars = exemplars or DEFAULT_EXEMPLARS
+        self._patterns = {
+            "weather": [(re.compile(p, re.IGNORECASE), w) for p, w in WEATHER_PATTERNS],
+            "document": [(re.compile(p, re.IGNORECASE), w) for p, w in DOCUMENT_PATTERNS],
+        }
+        self._exemplar_vectors: Optional[List[Tuple[str, List[float]]]] = None
+        self._lock = threading.Lock()
+        self.counters = {"keyword": 0, "embedding": 0, "llm": 0}
+
+    def keyword_route(self, query: str) -> Tuple[Optional[str], float]:
+        """
+        Scores each label by its matched cues.
+        Confidence is the winning score minus the losing one, capped at 1.
+        """
+        scores = {}
+        for label, patterns in self._patterns.items():
+            scores[label] = sum(weight for pattern, weight in patterns if pattern.search(query))
+        pattern, weight = LOCATION_PATTERN
+        if pattern.search(query):
+            scores["weather"] += weight
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+        if best_score == 0:
+            return None, 0.0
+        return best, min(1.0, best_score - runner_up)
+
+    @property
+    def embedding_enabled(self) -> bool:
+        return self.embeddings is not None or self._embed_documents is not None
+
+    def embedding_route(self, query: str) -> Tuple[Optional[str], float]:
+        """
+        Nearest-exemplar classification over query embeddings.
+        """
+        if not self.embedding_enabled:
+            return None, 0.0
+        try:
+            exemplars = self._get_exemplar_vectors()
+            vector = (self._embed_query or self.embeddings.embed_query)(query)
+        except Exception as e:
+            print(f"Embedding router unavailable: {e}")
+            return None, 0.0
+        return self._nearest_label(vector, exemplars)
+
+    async def aembedding_route(self, query: str) -> Tuple[Optional[str], float]:
+        if not self.embedding_enabled:
+            return None, 0.0
+        try:
+            exemplars = self._exemplar_vectors
+            if exemplars is None:
+                texts, labels = self._flatten_exemplars()
+                vectors = await (self._aembed_documents or self.embeddings.aembed_documents)(texts)
+                exemplars = self._store_exemplar_vectors(labels, vectors)
+            vector = await (self._aembed_query or self.embeddings.aembed_query)(query)
+        except Exception as e:
+            print(f"Embedding router unavailable: {e}")
+            return None, 0.0
+        return self._nearest_label(vector, exemplars)
+
+    def route(self, query: str) -> Optional[Tuple[str, str]]:
+        """
+        Runs the local tiers in order.
+
+        Returns:
+            Optional[Tuple[str, str]]: (intent, tier) or None when the LLM must decide.
+        """
+        intent, confidence = self.keyword_route(query)
+        if intent and confidence >= self.keyword_threshold:
+            return self._record(intent, "keyword")
+
+        intent, confidence = self.embedding_route(query)
+        if intent and confidence >= self.embedding_threshold:
+            return self._record(intent, "embedding")
+
+        self.counters["llm"] += 1
+        return None
+
+    async def aroute(self, query: str) -> Optional[Tuple[str, str]]:
+        intent, confidence = self.keyword_route(query)
+        if intent and confidence >= self.keyword_threshold:
+            return self._record(intent, "keyword")
+
+        intent, confidence = await self.aembedding_route(query)
+        if intent and confidence >= self.embedding_threshold:
+            return self._record(intent, "embedding")
+
+        self.counters["llm"] += 1
+        return None
+
+    def warm_up(self) -> None:
+        """
+        Embeds the exemplars ahead of the first ambiguous query.
+        """
+        if self.embedding_enabled:
+            self._get_exemplar_vectors()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns how many queries each tier answered.
+        """
+        return dict(self.counters)
+
+    def _record(self, intent: str, tier: str) -> Tuple[str, str]:
+        self.counters[tier] += 1
+        return intent, tier
+
+    def _flatten_exemplars(self) -> Tuple[List[str], List[str]]:
+        texts, labels = [], []
+        for label, examples in self.exemplars.items():
+            texts.extend(examples)
+            labels.extend([label] * len(examples))
+        return texts, labels
+
+    def _store_exemplar_vectors(self, labels: List[str], vectors: List[List[float]]) -> List[Tuple[str, List[float]]]:
+        with self._lock:
+            if self._exemplar_vectors is None:
+                self._exemplar_vectors = list(zip(labels, vectors))
+            return self._exemplar_vectors
+
+    def _get_exemplar_vectors(self) -> List[Tuple[str, List[float]]]:
+        if self._exemplar_vectors is None:
+            texts, labels = self._flatten_exemplars()
+            self._store_exemplar_vectors(labels, (self._embed_documents or self.embeddings.embed_documents)(texts))
+        return self._exemplar_vectors
+
+    def _nearest_label(self, vector: List[float], exemplars: List[Tuple[str, List[float]]]) -> Tuple[Optional[str], float]:
+        """
+        Returns the best label when its top similarity beats every other label
+        by at least `embedding_margin`; confidence is that top similarity.
+        """
+        best: Dict[str, float] = {}
+        for label, exemplar in exemplars:
+            score = _cosine(vector, exemplar)
+            if score > best.get(label, -1.0):
+                best[label] = score
+        if not best:
+            return None, 0.0
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        label, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if score - runner_up < self.embedding_margin:
+            return None, 0.0
+        return label, score
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
@@ -1,93 +1,358 @@
-from langchain_openai import ChatOpenAI
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config, merge_configs
+from src.services.context_packer import ContextPacker
+from src.services.weather_formatter import project_weather
+from src.utils.instrumentation import LLMMetricsHandler, record_escalation
+from src.utils.rate_limiter import FirstTokenHandler, ProviderLimiter, RateLimitHeadersHandler, estimate_tokens
 
+# Tag carried by user-facing answer chains so graph streaming can pick out their tokens.
+FINAL_ANSWER_TAG = "final_answer"
+
+class QueryAnalysis(BaseModel):
+    """Routing decision and entities extracted from a user query."""
+    intent: Literal["weather", "document"] = Field(description="'weather' for weather questions about a location, otherwise 'document'.")
+    cities: List[str] = Field(default_factory=list, description="City names mentioned for a weather question, in the order asked. Empty if none.")
+    time_frame: Optional[str] = Field(default=None, description="When the user asks about, e.g. 'now', 'tomorrow', 'this afternoon'.")
+    topics: List[str] = Field(default_factory=list, description="Key subjects of a document question.")
+    confidence: float = Field(default=1.0, description="How sure you are of the intent, from 0 to 1.")
+
+class ModelTier:
+    """
+    Chat model settings for one LLM step. `None` fields fall back to the
+    service's default model and the provider's defaults.
+    """
+    def __init__(self, model: Optional[str] = None, max_tokens: Optional[int] = None, timeout: Optional[float] = None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+
+    def __repr__(self) -> str:
+        return f"ModelTier(model={self.model!r}, max_tokens={self.max_tokens!r}, timeout={self.timeout!r})"
+
+# Steps with their own model tier; "classify" is the analyze_query step.
+STEPS = ("classify", "extract", "summarize_weather", "rag_response")
 class LLMService:
     """
     Service for handling LLM interactions using LangChain.
     Includes classification, weather summarization, and RAG QA.
+    Every step has a blocking method and an `a`-prefixed async twin.
+    Each step can use its own model tier; the routing steps (classify,
+    extract) retry on the `fallback_models` when the output does not parse
+    or the classifier's confidence is below `escalation_confidence`.
+    With a `limiter`, every call goes through the shared rate-limit
+    scheduler, which also takes over retries from the OpenAI client.
     """
-    def __init__(self, model_name: str = "gpt-4o"):
-        self.llm = ChatOpenAI(model=model_name, temperature=0)
+    def __init__(
+        self,
+        model_name: str = "gpt-4o",
+        llm: Any = None,
+        context_packer: Optional[ContextPacker] = None,
+        tiers: Optional[Dict[str, ModelTier]] = None,
+        fallback_models: Optional[List[str]] = None,
+        escalation_confidence: float = 0.0,
+        models: Optional[Dict[str, Any]] = None,
+        limiter: Optional[ProviderLimiter] = None,
+    ):
+        # `llm` lets callers inject any LangChain chat model (e.g. a fake for tests),
+        # used for every step; `models` injects chat models by model name.
+        # Otherwise ChatOpenAI clients are created on first use to keep startup fast.
+        self.model_name = model_name
+        self._injected_llm = llm
+        self.tiers = {step: ModelTier() for step in STEPS}
+        self.tiers.update(tiers or {})
+        self.fallback_models = fallback_models or []
+        self.escalation_confidence = escalation_confidence
+        self._models: Dict[Tuple, Any] = {}
+        self._injected = dict(models or {})
+        self.context_packer = context_packer or ContextPacker(model_name=model_name)
+        self.metrics_handler = LLMMetricsHandler()
+        self.limiter = limiter
+        self._callbacks = [self.metrics_handler] + ([RateLimitHeadersHandler(limiter)] if limiter else [])
+
+    @property
+    def llm(self) -> Any:
+        # Not stored: a lazily built default must not replace the per-step tiers.
+        return self._model(ModelTier())
 
-    def classify_intent(self, query: str) -> str:
+    @llm.setter
+    def llm(self, llm: Any) -> None:
+        self._injected_llm = llm
+
+    def _model(self, tier: ModelTier) -> Any:
         """
-        Decides if the query is about 'weather' or 'document'.
+        Returns the chat model for a tier, building it on first use.
         """
-        system_prompt = """You are a helpful assistant. Classify the user query into one of two categories: 'weather' or 'document'.
-        - 'weather': Questions about current weather, temperature, forecast, etc. for a specific location.
-        - 'document': General questions, requests for information, summarization, or questions that might need external knowledge from a loaded PDF.
-        
-        Return ONLY one word: 'weather' or 'document'.
+        name = tier.model or self.model_name
+        if name in self._injected:
+            return self._injected[name]
+        if self._injected_llm is not None:
+            return self._injected_llm
+        key = (name, tier.max_tokens, tier.timeout)
+        if key not in self._models:
+            from langchain_openai import ChatOpenAI
+            # stream_usage makes streamed answers report token counts too.
+            # Under the scheduler the response headers feed its rate limits and it does the retrying.
+            scheduled = {"include_response_headers": True, "max_retries": 0} if self.limiter else {}
+            self._models[key] = ChatOpenAI(model=name, temperature=0, stream_usage=True, max_tokens=tier.max_tokens, timeout=tier.timeout, **scheduled)
+        return self._models[key]
+
+    def _step_model(self, step: str) -> Any:
+        return self._model(self.tiers[step])
+
+    def _escalation_chain(self, step: str) -> List[ModelTier]:
+        """
+        The step's tier followed by one tier per fallback model, keeping the
+        step's limits.
+        """
+        tier = self.tiers[step]
+        chain = [tier]
+        seen = {tier.model or self.model_name}
+        for model in self.fallback_models:
+            if model not in seen:
+                seen.add(model)
+                chain.append(ModelTier(model, tier.max_tokens, tier.timeout))
+        return chain
+
+    def _escalate(self, step: str, call: Callable[[Any], Any], problem: Callable[[Any], Optional[str]]) -> Any:
+        """
+        Calls `call(model)` along the escalation chain until `problem(result)`
+        reports nothing. Parse errors surface as ValueError; the last model's
+        result (or error) is returned as is.
+        """
+        chain = self._escalation_chain(step)
+        for i, tier in enumerate(chain):
+            last = i == len(chain) - 1
+            try:
+                result = call(self._model(tier))
+            except ValueError:
+                if last:
+                    raise
+                record_escalation(step, "parse_error")
+                continue
+            reason = problem(result)
+            if reason is None or last:
+                return result
+            record_escalation(step, reason)
+
+    async def _aescalate(self, step: str, call: Callable[[Any], Awaitable[Any]], problem: Callable[[Any], Optional[str]]) -> Any:
+        chain = self._escalation_chain(step)
+        for i, tier in enumerate(chain):
+            last = i == len(chain) - 1
+            try:
+                result = await call(self._model(tier))
+            except ValueError:
+                if last:
+                    raise
+                record_escalation(step, "parse_error")
+                continue
+            reason = problem(result)
+            if reason is None or last:
+                return result
+            record_escalation(step, reason)
+
+    def warm_up(self) -> None:
         """
-        
+        Builds the chat model clients of every step.
+        """
+        for step in STEPS:
+            self._step_model(step)
+
+    def _chat_model(self, runnable: Any = None):
+        """
+        Attaches the metrics handler; bound callbacks are merged with the
+        caller's, so graph streaming keeps working.
+        """
+        return (runnable if runnable is not None else self.llm).with_config(callbacks=self._callbacks)
+
+    def _invoke(self, step: str, chain: Any, inputs: Dict[str, Any], config: RunnableConfig) -> Any:
+        if self.limiter is None:
+            return chain.invoke(inputs, config=config)
+        config, retryable = self._retry_guard(config)
+        return self.limiter.call(lambda: chain.invoke(inputs, config=config), estimate_tokens(inputs, self.tiers[step].max_tokens), retryable=retryable)
+
+    async def _ainvoke(self, step: str, chain: Any, inputs: Dict[str, Any], config: RunnableConfig) -> Any:
+        if self.limiter is None:
+            return await chain.ainvoke(inputs, config=config)
+        config, retryable = self._retry_guard(config)
+        return await self.limiter.acall(lambda: chain.ainvoke(inputs, config=config), estimate_tokens(inputs, self.tiers[step].max_tokens), retryable=retryable)
+
+    @staticmethod
+    def _retry_guard(config: RunnableConfig) -> Tuple[RunnableConfig, Optional[Callable[[], bool]]]:
+        """
+        Answer tokens are streamed to the client as they arrive (graph
+        streaming), so an answer call is only retried before its first token.
+        """
+        if FINAL_ANSWER_TAG not in config.get("tags", []):
+            return config, None
+        handler = FirstTokenHandler()
+        # Merged with the inherited config so the graph's stream handler stays attached.
+        return merge_configs(ensure_config(config), {"callbacks": [handler]}), lambda: not handler.emitted
+
+    @staticmethod
+    def _config(run_name: str) -> RunnableConfig:
+        return RunnableConfig(run_name=run_name, metadata={"llm_step": run_name})
+
+    def _analysis_chain(self, model: Any):
+        system_prompt = """You analyze user queries for an assistant that answers weather questions and questions about an uploaded document.
+        - intent: 'weather' for questions about current weather, temperature, forecast, etc. for a specific location; 'document' for everything else.
+        - cities: every city the weather question is about, without country or region. Empty list if none.
+        - time_frame: when the user asks about, if stated.
+        - topics: the key subjects for document questions.
+        """
+
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("user", "{query}")
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        
-        # We can add explicit LangSmith tags here via config
-        return chain.invoke({"query": query}, config=RunnableConfig(run_name="classify_intent"))
 
-    def summarize_weather(self, query: str, weather_data: dict) -> str:
+        return prompt | self._chat_model(model.with_structured_output(QueryAnalysis))
+
+    @staticmethod
+    def _analysis_to_dict(analysis: QueryAnalysis) -> Dict[str, Any]:
+        return {
+            "intent": analysis.intent,
+            "cities": [city.strip() for city in analysis.cities if city.strip()],
+            "entities": {"time_frame": analysis.time_frame, "topics": analysis.topics},
+        }
+
+    def analyze_query(self, query: str) -> Dict[str, Any]:
         """
-        Summarizes weather data in response to a user query.
+        Classifies intent and extracts cities and other entities in one structured call.
+
+        Returns:
+            Dict[str, Any]: {"intent": str, "cities": List[str], "entities": dict}
         """
-        system_prompt = """You are a weather assistant. Given the user query and the raw weather JSON data, provide a natural language summary of the weather.
+        analysis = self._escalate(
+            "classify",
+            lambda model: self._invoke("classify", self._analysis_chain(model), {"query": query}, self._config("analyze_query")),
+            self._analysis_problem,
+        )
+        return self._analysis_to_dict(analysis)
+
+    async def aanalyze_query(self, query: str) -> Dict[str, Any]:
+        analysis = await self._aescalate(
+            "classify",
+            lambda model: self._ainvoke("classify", self._analysis_chain(model), {"query": query}, self._config("analyze_query")),
+            self._analysis_problem,
+        )
+        return self._analysis_to_dict(analysis)
+
+    def _analysis_problem(self, analysis: QueryAnalysis) -> Optional[str]:
+        return "low_confidence" if analysis.confidence < self.escalation_confidence else None
+
+    def _weather_chain(self, model: Any = None):
+        system_prompt = """You are a weather assistant. Given the user query and the current weather JSON data, provide a natural language summary of the weather.
+        When the data covers several cities ("cities" maps each city to its data), answer for all of them in one reply and compare them if the user asks to.
+        Mention any city whose data has an "error" or that is listed under "skipped" as unavailable.
         Be concise and helpful.
         """
-        
+
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("user", "Query: {query}\nData: {data}")
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"query": query, "data": str(weather_data)}, config=RunnableConfig(run_name="summarize_weather"))
 
-    def rag_response(self, query: str, context: list) -> str:
+        return prompt | self._chat_model(model or self._step_model("summarize_weather")) | StrOutputParser()
+
+    @classmethod
+    def _answer_config(cls, run_name: str) -> RunnableConfig:
+        return RunnableConfig(**cls._config(run_name), tags=[FINAL_ANSWER_TAG])
+
+    @staticmethod
+    def _weather_input(query: str, weather_data: dict, units: str) -> Dict[str, str]:
+        # A compact projection instead of the raw payload keeps the prompt small.
+        return {"query": query, "data": json.dumps(project_weather(weather_data, units), ensure_ascii=False, separators=(",", ":"))}
+
+    def summarize_weather(self, query: str, weather_data: dict, units: str = "metric") -> str:
         """
-        Generates a response based on retrieved context.
+        Summarizes weather data in response to a user query.
         """
-        system_prompt = """You are a helpful assistant analyzing an uploaded document. 
+        return self._invoke("summarize_weather", self._weather_chain(), self._weather_input(query, weather_data, units), self._answer_config("summarize_weather"))
+
+    async def asummarize_weather(self, query: str, weather_data: dict, units: str = "metric") -> str:
+        return await self._ainvoke("summarize_weather", self._weather_chain(), self._weather_input(query, weather_data, units), self._answer_config("summarize_weather"))
+
+    def _rag_chain(self, model: Any = None):
+        system_prompt = """You are a helpful assistant analyzing an uploaded document.
         Use the following pieces of retrieved context to answer the user's question.
-        
+
         If the user asks for a summary or general information about the document (Example: "tell me about this pdf"), use the provided chunks to give a high-level overview.
         If the answer is not in the context, say "I don't have enough information in the uploaded document to answer that."
-        
+
         Context:
         {context}
         """
-        
+
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("user", "{query}")
         ])
-        
-        # Flatten context
-        context_text = "\n\n".join([doc.page_content for doc in context])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"query": query, "context": context_text}, config=RunnableConfig(run_name="rag_response"))
 
-    def extract_city(self, query: str) -> str:
+        return prompt | self._chat_model(model or self._step_model("rag_response")) | StrOutputParser()
+
+    def _build_context(self, context: list) -> str:
+        """
+        Merges, de-duplicates and packs retrieved chunks into the token budget.
+        """
+        return self.context_packer.pack(context)
+
+    def rag_response(self, query: str, context: list) -> str:
         """
-        Extracts the city name from a weather-related query.
+        Generates a response based on retrieved context.
         """
-        system_prompt = """You are an entity extractor. Extract the city name from the user's query.
-        Return ONLY the city name. If no city is found, return nothing.
+        context_text = self._build_context(context)
+        return self._invoke("rag_response", self._rag_chain(), {"query": query, "context": context_text}, self._answer_config("rag_response"))
+
+    async def arag_response(self, query: str, context: list) -> str:
+        context_text = self._build_context(context)
+        return await self._ainvoke("rag_response", self._rag_chain(), {"query": query, "context": context_text}, self._answer_config("rag_response"))
+
+    def _city_chain(self, model: Any):
+        system_prompt = """You are an entity extractor. Extract every city name from the user's query, in the order asked.
+        Return ONLY the city names separated by " | ". If no city is found, return nothing.
         Example: "What's the weather in London?" -> London
         Example: "Forecast for Paris, France" -> Paris
-        Example: "What's the weather like in New York?" -> New York
+        Example: "London vs Paris vs New York this afternoon" -> London | Paris | New York
+        Example: "Is it raining in Washington, D.C. or Baltimore?" -> Washington, D.C. | Baltimore
         """
-        
+
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("user", "{query}")
         ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"query": query}, config=RunnableConfig(run_name="extract_city")).strip()
+
+        return prompt | self._chat_model(model) | StrOutputParser()
+
+    @staticmethod
+    def _split_cities(text: str) -> List[str]:
+        # "|" (or one name per line) never occurs in a city name, unlike the comma in "Washington, D.C.".
+        return [city.strip() for city in re.split(r"[|\n]", text) if city.strip()]
+
+    def extract_cities(self, query: str) -> List[str]:
+        """
+        Extracts the city names from a weather-related query.
+        """
+        return self._split_cities(self._escalate(
+            "extract",
+            lambda model: self._invoke("extract", self._city_chain(model), {"query": query}, self._config("extract_cities")),
+            self._cities_problem,
+        ))
+
+    async def aextract_cities(self, query: str) -> List[str]:
+        result = await self._aescalate(
+            "extract",
+            lambda model: self._ainvoke("extract", self._city_chain(model), {"query": query}, self._config("extract_cities")),
+            self._cities_problem,
+        )
+        return self._split_cities(result)
+
+    @classmethod
+    def _cities_problem(cls, result: str) -> Optional[str]:
+        # A sentence instead of a list of names means the model ignored the format.
+        return "parse_error" if any(len(city.split()) > 4 for city in cls._split_cities(result)) else None
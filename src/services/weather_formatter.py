@@ -0,0 +1,128 @@
+import re
+from typing import Any, Dict, Optional
+
+UNIT_LABELS = {
+    "metric": ("°C", "m/s"),
+    "imperial": ("°F", "mph"),
+    "standard": ("K", "m/s"),
+}
+
+# The only question shapes a template answers: short, present-tense questions
+# about conditions right now in one place ("What's the weather in Oslo?",
+# "Is it raining in Paris now?", "London temperature").
+_NOW = r"(?: (?:right now|now|currently|today))?"
+PLAIN_CURRENT = re.compile(
+    r"(?:"
+    r"(?:(?:what|how)(?:['’]s| is) (?:the )?(?:current )?(?:weather|temperature|temp|conditions)(?: like)?"
+    r"|(?:current )?(?:weather|temperature|temp|conditions)"
+    r"|how (?:hot|cold|warm|windy|humid) is it"
+    r"|is it (?:raining|snowing|sunny|cloudy|windy))"
+    r"(?: (?:in|for)) (?P<place>[^\W\d][\w .,'-]*?)" + _NOW +
+    r"|(?P<place_first>[^\W\d][\w .,'-]*?) (?:weather|temperature)" + _NOW +
+    r")[?.!]*",
+    re.IGNORECASE,
+)
+# Anything about another time, a specific time of day, units or advice goes to the LLM.
+NEEDS_REASONING = re.compile(
+    r"\b(will|would|was|were|been|going|forecast|yesterday|tomorrow|tonight|later|ago|last|next|week|weekend|"
+    r"morning|afternoon|evening|night|noon|midnight|hours?|days?|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"o'clock|am|pm|fahrenheit|celsius|kelvin|metric|imperial|degrees?|"
+    r"should|umbrella|jacket|coat|wear|bring|good|nice|compare|vs|versus|better|warmer|colder|than|why|recommend|plan)\b"
+    r"|\d|°",
+    re.IGNORECASE,
+)
+PLAIN_MAX_WORDS = 10
+CURRENT_TIME_FRAMES = ("now", "right now", "currently", "current", "today")
+
+
+def is_plain_current_query(query: str, time_frame: Optional[str] = None) -> bool:
+    """
+    True for plain "what's the weather in X" questions a template can answer.
+    """
+    if time_frame and time_frame.strip().lower() not in CURRENT_TIME_FRAMES:
+        return False
+    query = " ".join(query.split())
+    if len(query.split()) > PLAIN_MAX_WORDS or NEEDS_REASONING.search(query):
+        return False
+    return bool(PLAIN_CURRENT.fullmatch(query))
+
+
+def _project_city(data: Dict[str, Any]) -> Dict[str, Any]:
+    if "error" in data:
+        return {"error": data["error"]}
+    main, wind = data.get("main") or {}, data.get("wind") or {}
+    fields = {
+        "city": data.get("name"),
+        "country": (data.get("sys") or {}).get("country"),
+        "conditions": ", ".join(w["description"] for w in data.get("weather") or [] if w.get("description")) or None,
+        "temp": main.get("temp"),
+        "feels_like": main.get("feels_like"),
+        "temp_min": main.get("temp_min"),
+        "temp_max": main.get("temp_max"),
+        "humidity": main.get("humidity"),
+        "wind_speed": wind.get("speed"),
+        "wind_gust": wind.get("gust"),
+        "clouds": (data.get("clouds") or {}).get("all"),
+        "rain_1h": (data.get("rain") or {}).get("1h"),
+        "snow_1h": (data.get("snow") or {}).get("1h"),
+        "visibility": data.get("visibility"),
+    }
+    return {key: value for key, value in fields.items() if value not in (None, "")}
+
+
+def project_weather(data: Dict[str, Any], units: str = "metric") -> Dict[str, Any]:
+    """
+    Keeps the fields a summary needs from an OpenWeatherMap payload, or from
+    the {"cities": {...}, "skipped": [...]} shape of multi-city queries.
+    """
+    temperature, speed = UNIT_LABELS.get(units, UNIT_LABELS["metric"])
+    projected: Dict[str, Any] = {"units": {"temperature": temperature, "wind_speed": speed}}
+    if "cities" in data:
+        projected["cities"] = {city: _project_city(payload) for city, payload in data["cities"].items()}
+        if data.get("skipped"):
+            projected["skipped"] = data["skipped"]
+        return projected
+    projected.update(_project_city(data))
+    return projected
+
+
+def _render_city(data: Dict[str, Any], fallback_name: str, units: str) -> Optional[str]:
+    temperature, speed = UNIT_LABELS.get(units, UNIT_LABELS["metric"])
+    fields = _project_city(data)
+    if "error" in fields:
+        return f"{fallback_name}: weather data is unavailable."
+    if "temp" not in fields or "conditions" not in fields:
+        return None
+    place = fields.get("city") or fallback_name
+    if fields.get("country"):
+        place = f"{place}, {fields['country']}"
+    parts = [f"{fields['conditions']}, {fields['temp']:.1f}{temperature}"]
+    if "feels_like" in fields:
+        parts[0] += f" (feels like {fields['feels_like']:.1f}{temperature})"
+    if "humidity" in fields:
+        parts.append(f"humidity {fields['humidity']}%")
+    if "wind_speed" in fields:
+        parts.append(f"wind {fields['wind_speed']:g} {speed}")
+    return f"{place}: {', '.join(parts)}."
+
+
+def render_weather(data: Dict[str, Any], units: str = "metric", city: str = "") -> Optional[str]:
+    """
+    Renders current conditions without an LLM. Returns None when the payload
+    lacks the fields the template needs.
+    """
+    if "cities" not in data:
+        line = _render_city(data, city, units)
+        return f"Current weather in {line}" if line else None
+
+    lines = []
+    for name, payload in data["cities"].items():
+        line = _render_city(payload, name, units)
+        if line is None:
+            return None
+        lines.append(f"- {line}")
+    if data.get("skipped"):
+        lines.append(f"Not looked up (too many cities in one question): {', '.join(data['skipped'])}.")
+    return "Current weather:\n" + "\n".join(lines)
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+HIT = "hit"
+STALE = "stale"
+MISS = "miss"
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+    Entries past their TTL can still be served for `stale_ttl` seconds so the
+    caller can refresh them in the background (stale-while-revalidate).
+    """
+    def __init__(self, max_size: int = 256, ttl: Optional[float] = 300.0, stale_ttl: float = 0.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key: Hashable) -> Tuple[str, Any]:
+        """
+        Looks up a key and reports its freshness.
+
+        Returns:
+            Tuple[str, Any]: ("hit" | "stale" | "miss", value or None).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS, None
+
+            value, stored_at = entry
+            age = now - stored_at
+            if self.ttl is None or age <= self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return HIT, value
+            if age <= self.ttl + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                return STALE, value
+
+            del self._data[key]
+            self.misses += 1
+            return MISS, None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the fresh value for a key, or `default`.
+        """
+        status, value = self.lookup(key)
+        return value if status == HIT else default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
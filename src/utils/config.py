@@ -10,3 +10,139 @@ class Config:
     LANGCHAIN_TRACING_V2 = os.getenv("LANGCHAIN_TRACING_V2", "true")
     LANGCHAIN_PROJECT = os.getenv("LANGCHAIN_PROJECT", "neura-dynamics-demo")
     QDRANT_PATH = os.getenv("QDRANT_PATH", "./data/qdrant_db")
+    # Qdrant server URL; when set it is used instead of the local QDRANT_PATH store
+    QDRANT_URL = os.getenv("QDRANT_URL") or None
+    QDRANT_API_KEY = os.getenv("QDRANT_API_KEY") or None
+
+    # Qdrant collection settings (applied on startup, existing collections are migrated)
+    QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")
+    QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+    QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+    QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+    QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF")) if os.getenv("QDRANT_HNSW_EF") else None
+    QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+    QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+    QDRANT_MIGRATE = os.getenv("QDRANT_MIGRATE", "true").lower() == "true"
+
+    QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "neura_docs")
+
+    # Embedding backend: "openai" or "local" (fastembed ONNX models on CPU; local models get their own collection)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or None
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) or None
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "1"))
+    EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", "./data/models")
+
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite")
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+    # Hybrid (BM25 + dense) retrieval
+    HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "./data/bm25_index.sqlite")
+    HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+    HYBRID_SPARSE_WEIGHT = float(os.getenv("HYBRID_SPARSE_WEIGHT", "1.0"))
+    HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+    HYBRID_DENSE_BUDGET_MS = float(os.getenv("HYBRID_DENSE_BUDGET_MS", "1500"))
+    HYBRID_SPARSE_BUDGET_MS = float(os.getenv("HYBRID_SPARSE_BUDGET_MS", "200"))
+
+    # Context assembly for rag_response
+    RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+    RAG_CONTEXT_MMR_LAMBDA = float(os.getenv("RAG_CONTEXT_MMR_LAMBDA", "0.7"))
+    RAG_CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("RAG_CONTEXT_DUPLICATE_THRESHOLD", "0.85"))
+
+    # PDF ingestion pipeline
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+    INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+    INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # Weather API client
+    OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5/weather")
+    WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_CACHE_STALE_TTL = float(os.getenv("WEATHER_CACHE_STALE_TTL", "300"))
+    WEATHER_CACHE_MAX_SIZE = int(os.getenv("WEATHER_CACHE_MAX_SIZE", "1024"))
+    WEATHER_HTTP_TIMEOUT = float(os.getenv("WEATHER_HTTP_TIMEOUT", "5"))
+    WEATHER_HTTP_POOL_SIZE = int(os.getenv("WEATHER_HTTP_POOL_SIZE", "20"))
+    WEATHER_MAX_CITIES = int(os.getenv("WEATHER_MAX_CITIES", "5"))
+    # Answer plain current-conditions questions from a template instead of the LLM
+    WEATHER_TEMPLATE_ENABLED = os.getenv("WEATHER_TEMPLATE_ENABLED", "true").lower() == "true"
+
+    # Query execution
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+    # Chat model per LLM step (max tokens / timeout of 0 leave the provider default).
+    # Routing steps escalate through LLM_FALLBACK_MODELS on parse failure or low confidence.
+    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+    LLM_CLASSIFY_MODEL = os.getenv("LLM_CLASSIFY_MODEL", "gpt-4o-mini")
+    LLM_CLASSIFY_MAX_TOKENS = int(os.getenv("LLM_CLASSIFY_MAX_TOKENS", "256"))
+    LLM_CLASSIFY_TIMEOUT = float(os.getenv("LLM_CLASSIFY_TIMEOUT", "10"))
+    LLM_EXTRACT_MODEL = os.getenv("LLM_EXTRACT_MODEL", "gpt-4o-mini")
+    LLM_EXTRACT_MAX_TOKENS = int(os.getenv("LLM_EXTRACT_MAX_TOKENS", "64"))
+    LLM_EXTRACT_TIMEOUT = float(os.getenv("LLM_EXTRACT_TIMEOUT", "10"))
+    LLM_SUMMARIZE_WEATHER_MODEL = os.getenv("LLM_SUMMARIZE_WEATHER_MODEL") or LLM_MODEL
+    LLM_SUMMARIZE_WEATHER_MAX_TOKENS = int(os.getenv("LLM_SUMMARIZE_WEATHER_MAX_TOKENS", "400"))
+    LLM_SUMMARIZE_WEATHER_TIMEOUT = float(os.getenv("LLM_SUMMARIZE_WEATHER_TIMEOUT", "30"))
+    LLM_RAG_RESPONSE_MODEL = os.getenv("LLM_RAG_RESPONSE_MODEL") or LLM_MODEL
+    LLM_RAG_RESPONSE_MAX_TOKENS = int(os.getenv("LLM_RAG_RESPONSE_MAX_TOKENS", "1024"))
+    LLM_RAG_RESPONSE_TIMEOUT = float(os.getenv("LLM_RAG_RESPONSE_TIMEOUT", "60"))
+    LLM_FALLBACK_MODELS = [model.strip() for model in os.getenv("LLM_FALLBACK_MODELS", "gpt-4o").split(",") if model.strip()]
+    LLM_ESCALATION_CONFIDENCE = float(os.getenv("LLM_ESCALATION_CONFIDENCE", "0.6"))
+
+    # Local intent routing in front of the LLM classifier
+    INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+    INTENT_KEYWORD_THRESHOLD = float(os.getenv("INTENT_KEYWORD_THRESHOLD", "0.8"))
+    INTENT_EMBEDDING_ENABLED = os.getenv("INTENT_EMBEDDING_ENABLED", "true").lower() == "true"
+    INTENT_EMBEDDING_THRESHOLD = float(os.getenv("INTENT_EMBEDDING_THRESHOLD", "0.82"))
+    INTENT_EMBEDDING_MARGIN = float(os.getenv("INTENT_EMBEDDING_MARGIN", "0.03"))
+
+    # Speculative execution: start retrieval / city extraction while classification is pending
+    SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "false").lower() == "true"
+    SPECULATIVE_RETRIEVAL_BUDGET_MS = float(os.getenv("SPECULATIVE_RETRIEVAL_BUDGET_MS", "2000"))
+    SPECULATIVE_CITIES_BUDGET_MS = float(os.getenv("SPECULATIVE_CITIES_BUDGET_MS", "2000"))
+    SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "8"))
+
+    # Client-side scheduler for outbound calls (OpenAI chat, OpenAI embeddings, OpenWeatherMap):
+    # per-provider requests/tokens per minute (0 = unlimited until the provider's headers say otherwise),
+    # adaptive concurrency, and retries with jittered exponential backoff. Bulk ingestion embeds
+    # leave SCHEDULER_BULK_RESERVE of each rate budget to interactive queries.
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_MAX_RETRIES = int(os.getenv("SCHEDULER_MAX_RETRIES", "4"))
+    SCHEDULER_BACKOFF_BASE_MS = float(os.getenv("SCHEDULER_BACKOFF_BASE_MS", "500"))
+    SCHEDULER_BACKOFF_MAX_MS = float(os.getenv("SCHEDULER_BACKOFF_MAX_MS", "20000"))
+    SCHEDULER_BULK_RESERVE = float(os.getenv("SCHEDULER_BULK_RESERVE", "0.2"))
+    OPENAI_CHAT_RPM = float(os.getenv("OPENAI_CHAT_RPM", "500"))
+    OPENAI_CHAT_TPM = float(os.getenv("OPENAI_CHAT_TPM", "0"))
+    OPENAI_CHAT_CONCURRENCY = int(os.getenv("OPENAI_CHAT_CONCURRENCY", "16"))
+    OPENAI_EMBEDDING_RPM = float(os.getenv("OPENAI_EMBEDDING_RPM", "3000"))
+    OPENAI_EMBEDDING_TPM = float(os.getenv("OPENAI_EMBEDDING_TPM", "1000000"))
+    OPENAI_EMBEDDING_CONCURRENCY = int(os.getenv("OPENAI_EMBEDDING_CONCURRENCY", "8"))
+    OPENWEATHER_RPM = float(os.getenv("OPENWEATHER_RPM", "60"))
+    OPENWEATHER_CONCURRENCY = int(os.getenv("OPENWEATHER_CONCURRENCY", "10"))
+
+    # Semantic answer cache for the RAG path
+    RAG_CACHE_ENABLED = os.getenv("RAG_CACHE_ENABLED", "true").lower() == "true"
+    RAG_CACHE_THRESHOLD = float(os.getenv("RAG_CACHE_THRESHOLD", "0.97"))
+    RAG_CACHE_MAX_SIZE = int(os.getenv("RAG_CACHE_MAX_SIZE", "512"))
+    RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "3600"))
+
+    # Concurrent identical queries (and weather lookups for the same city) share one computation
+    COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+
+    # Instrumentation: per-node timings in the state and a Prometheus endpoint (0 disables the endpoint)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+    # Startup: defer heavy imports, the vector store and the chat model until first use
+    LAZY_INIT = os.getenv("LAZY_INIT", "true").lower() == "true"
+    WARM_UP_ON_START = os.getenv("WARM_UP_ON_START", "false").lower() == "true"
+
+    # HTTP API (views/api.py) and the Streamlit client of it
+    API_HOST = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+    API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "16"))
+    API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "64"))
+    API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "60"))
+    API_INGEST_WORKERS = int(os.getenv("API_INGEST_WORKERS", "1"))
+    API_INGEST_TIMEOUT = float(os.getenv("API_INGEST_TIMEOUT", "600"))
+    API_URL = os.getenv("API_URL") or None
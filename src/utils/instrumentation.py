@@ -0,0 +1,207 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from src.utils.metrics import METRICS
+
+# Timing records of the graph node currently running in this context.
+_records: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("neura_timing_records", default=None)
+
+
+def record(kind: str, name: str, seconds: float, error: Any = None, **fields: Any) -> None:
+    """
+    Observes a duration in the metrics registry and, inside an instrumented
+    node, adds it to that node's per-request timings.
+    `kind` is one of "node", "llm" or "external".
+    """
+    METRICS.observe(f"neura_{kind}_duration_seconds", seconds, name=name)
+    if error:
+        METRICS.inc(f"neura_{kind}_errors_total", name=name)
+    records = _records.get()
+    if records is not None:
+        entry = {"kind": kind, "name": name, "ms": round(seconds * 1000, 2), **fields}
+        if error:
+            entry["error"] = str(error)
+        records.append(entry)
+
+
+def record_cache(cache: str, result: str) -> None:
+    """
+    Counts a cache lookup; `result` is "hit", "stale" or "miss".
+    """
+    METRICS.inc("neura_cache_requests_total", cache=cache, result=result)
+    records = _records.get()
+    if records is not None:
+        records.append({"kind": "cache", "name": cache, "result": result})
+
+
+def record_coalesced(kind: str) -> None:
+    """
+    Counts a call that waited on an identical in-flight call instead of running.
+    """
+    METRICS.inc("neura_coalesced_total", name=kind)
+    records = _records.get()
+    if records is not None:
+        records.append({"kind": "coalesced", "name": kind})
+
+
+def record_speculation(branch: str, outcome: str) -> None:
+    """
+    Counts how a speculative branch ended: "used", "wasted", "timeout",
+    "error" or "skipped".
+    """
+    METRICS.inc("neura_speculation_total", branch=branch, outcome=outcome)
+    records = _records.get()
+    if records is not None:
+        records.append({"kind": "speculation", "name": branch, "result": outcome})
+
+
+def record_escalation(step: str, reason: str) -> None:
+    """
+    Counts an LLM step retried on a larger model; `reason` is "parse_error"
+    or "low_confidence".
+    """
+    METRICS.inc("neura_llm_escalations_total", name=step, reason=reason)
+    records = _records.get()
+    if records is not None:
+        records.append({"kind": "escalation", "name": step, "result": reason})
+
+
+def record_rate_limit(provider: str, result: str) -> None:
+    """
+    Counts a scheduler event for an outbound call: "retry", "throttled"
+    (a 429 retried after backing off) or "gave_up".
+    """
+    METRICS.inc("neura_ratelimit_events_total", provider=provider, result=result)
+    records = _records.get()
+    if records is not None:
+        records.append({"kind": "rate_limit", "name": provider, "result": result})
+
+
+@contextmanager
+def timed(kind: str, name: str, **fields: Any) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record(kind, name, time.perf_counter() - start, error=e, **fields)
+        raise
+    record(kind, name, time.perf_counter() - start, **fields)
+
+
+def instrument_node(name: str, func: Callable, afunc: Callable) -> Tuple[Callable, Callable]:
+    """
+    Wraps a node's sync and async implementations. The returned update gains
+    a `timings` list: the node's own wall time followed by the LLM calls,
+    external requests and cache lookups made while it ran.
+    """
+    def finish(start: float, records: List[Dict[str, Any]], update: Dict[str, Any], error: Any = None) -> Dict[str, Any]:
+        seconds = time.perf_counter() - start
+        METRICS.observe("neura_node_duration_seconds", seconds, name=name)
+        if error:
+            METRICS.inc("neura_node_errors_total", name=name)
+        entry = {"kind": "node", "name": name, "ms": round(seconds * 1000, 2)}
+        if error:
+            entry["error"] = str(error)
+        return {**update, "timings": [entry, *records]}
+
+    @functools.wraps(func)
+    def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        records: List[Dict[str, Any]] = []
+        token = _records.set(records)
+        start = time.perf_counter()
+        try:
+            update = func(state)
+        except Exception as e:
+            finish(start, records, {}, error=e)
+            raise
+        finally:
+            _records.reset(token)
+        return finish(start, records, update)
+
+    @functools.wraps(afunc)
+    async def arun(state: Dict[str, Any]) -> Dict[str, Any]:
+        records: List[Dict[str, Any]] = []
+        token = _records.set(records)
+        start = time.perf_counter()
+        try:
+            update = await afunc(state)
+        except Exception as e:
+            finish(start, records, {}, error=e)
+            raise
+        finally:
+            _records.reset(token)
+        return finish(start, records, update)
+
+    return run, arun
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Callback handler timing chat model calls and counting their tokens.
+    The step name comes from the `llm_step` metadata key set by LLMService.
+    Runs inline so records land in the calling node's context. One handler
+    is shared by every thread, so start times are kept under a lock.
+    """
+    run_inline = True
+
+    def __init__(self):
+        self._starts: Dict[UUID, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._finish(run_id)
+        if started is None:
+            return
+        start, step = started
+        input_tokens, output_tokens = _token_usage(response)
+        if input_tokens or output_tokens:
+            METRICS.inc("neura_llm_tokens_total", input_tokens, name=step, type="input")
+            METRICS.inc("neura_llm_tokens_total", output_tokens, name=step, type="output")
+            record("llm", step, time.perf_counter() - start, input_tokens=input_tokens, output_tokens=output_tokens)
+        else:
+            record("llm", step, time.perf_counter() - start)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._finish(run_id)
+        if started is not None:
+            record("llm", started[1], time.perf_counter() - started[0], error=error)
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]]) -> None:
+        started = (time.perf_counter(), (metadata or {}).get("llm_step", "llm"))
+        with self._lock:
+            self._starts[run_id] = started
+
+    def _finish(self, run_id: UUID) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            return self._starts.pop(run_id, None)
+
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    """
+    Reads token counts from the message usage metadata, falling back to the
+    provider's `token_usage` report.
+    """
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not (input_tokens or output_tokens) and response.llm_output:
+        usage = response.llm_output.get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
@@ -0,0 +1,141 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Latency buckets in seconds, from cache hits to slow LLM answers.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "neura_node_duration_seconds": "Wall time of graph nodes.",
+    "neura_node_errors_total": "Graph node invocations that raised.",
+    "neura_llm_duration_seconds": "Wall time of LLM calls by step.",
+    "neura_llm_errors_total": "LLM calls that raised, by step.",
+    "neura_llm_tokens_total": "Tokens used by LLM calls, by step and type.",
+    "neura_external_duration_seconds": "Wall time of external requests (weather API, vector search).",
+    "neura_external_errors_total": "External requests that failed.",
+    "neura_cache_requests_total": "Cache lookups by cache and result.",
+    "neura_coalesced_total": "Calls served by an identical in-flight call, by kind.",
+    "neura_llm_escalations_total": "LLM steps retried on a fallback model, by step and reason.",
+    "neura_speculation_total": "Speculative branches started next to classification, by branch and outcome.",
+    "neura_ratelimit_events_total": "Outbound call retries and give-ups by provider and result.",
+    "neura_ratelimit_wait_seconds": "Time outbound calls waited for rate-limit capacity, by provider.",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process counters and histograms rendered in the Prometheus
+    text exposition format. Thread-safe; needs no client library.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, /, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, /, **labels: str) -> None:
+        """
+        Records one histogram sample. Each series keeps per-bucket counts
+        followed by the running sum and count.
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def counter_value(self, name: str, /, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(self._key(labels), 0.0)
+
+    def histogram_count(self, name: str, /, **labels: str) -> int:
+        with self._lock:
+            state = self._histograms.get(name, {}).get(self._key(labels))
+            return int(state[-1]) if state else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text format (version 0.0.4).
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {_number(value)}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, state in sorted(series.items()):
+                    for bound, count in zip(self.buckets, state):
+                        lines.append(f"{name}_bucket{_labels(key + (('le', _number(bound)),))} {_number(count)}")
+                    lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {_number(state[-1])}")
+                    lines.append(f"{name}_sum{_labels(key)} {state[-2]!r}")
+                    lines.append(f"{name}_count{_labels(key)} {_number(state[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in key)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+# Process-wide registry shared by the graph, services and models.
+METRICS = MetricsRegistry()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """
+    Serves `registry.render()` at /metrics from a daemon thread.
+    """
+    registry = registry or METRICS
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,472 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Mapping, Optional
+import httpx
+import requests
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from src.utils.instrumentation import record_rate_limit
+from src.utils.metrics import METRICS
+
+# Priorities, highest first: user-facing queries pre-empt ingestion.
+INTERACTIVE, BULK = 0, 1
+PRIORITIES = (INTERACTIVE, BULK)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute up to `capacity` (one minute's
+    worth by default). A `per_minute` of 0 means unlimited.
+    """
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.per_minute = per_minute
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float, floor: float = 0.0, now: Optional[float] = None) -> float:
+        """
+        Seconds until `amount` can be taken while leaving `floor` in the bucket.
+        """
+        if not self.per_minute:
+            return 0.0
+        self._refill(time.monotonic() if now is None else now)
+        # Capped at capacity, or a call larger than capacity - floor could never be admitted.
+        needed = min(amount + floor, self.capacity)
+        return max(0.0, (needed - self.level) * 60.0 / self.per_minute)
+
+    def take(self, amount: float) -> None:
+        if self.per_minute:
+            self.level -= min(amount, self.capacity)
+
+    def set_rate(self, per_minute: float) -> None:
+        if per_minute and per_minute != self.per_minute:
+            self._refill(time.monotonic())
+            self.per_minute = self.capacity = per_minute
+            self.level = min(self.level, self.capacity)
+
+    def cap(self, remaining: float) -> None:
+        # The provider's count of what is left wins over our estimate.
+        if self.per_minute:
+            self._refill(time.monotonic())
+            self.level = min(self.level, remaining)
+
+
+class _Waiter:
+    __slots__ = ("event", "future", "loop", "granted")
+
+    def __init__(self, event: Optional[threading.Event] = None, future: Optional[asyncio.Future] = None, loop: Any = None):
+        self.event = event
+        self.future = future
+        self.loop = loop
+        self.granted = False
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class PrioritySlots:
+    """
+    A semaphore shared by threads and event loops that hands free slots to
+    the highest-priority waiter first (FIFO within a priority).
+    """
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self._waiters = {priority: deque() for priority in PRIORITIES}
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> bool:
+        if self.in_use < self.limit and not any(self._waiters.values()):
+            self.in_use += 1
+            return True
+        return False
+
+    def acquire(self, priority: int = INTERACTIVE) -> None:
+        with self._lock:
+            if self._try_acquire():
+                return
+            waiter = _Waiter(event=threading.Event())
+            self._waiters[priority].append(waiter)
+        waiter.event.wait()
+
+    async def aacquire(self, priority: int = INTERACTIVE) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                return
+            waiter = _Waiter(future=loop.create_future(), loop=loop)
+            self._waiters[priority].append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self.in_use -= 1
+                    self._grant()
+                else:
+                    self._waiters[priority].remove(waiter)
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+            self._grant()
+
+    def set_limit(self, limit: int) -> None:
+        with self._lock:
+            self.limit = max(1, limit)
+            self._grant()
+
+    def waiting(self) -> Dict[int, int]:
+        with self._lock:
+            return {priority: len(waiters) for priority, waiters in self._waiters.items()}
+
+    def _grant(self) -> None:
+        while self.in_use < self.limit:
+            waiter = next((waiters.popleft() for waiters in self._waiters.values() if waiters), None)
+            if waiter is None:
+                return
+            self.in_use += 1
+            waiter.granted = True
+            if waiter.event is not None:
+                waiter.event.set()
+            else:
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+
+def _parse_duration(value: Any) -> Optional[float]:
+    """
+    Parses "20", "1.5", "20ms" or OpenAI's "6m0s" style into seconds.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(text)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def error_headers(error: BaseException) -> Mapping[str, str]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    return headers if headers is not None else {}
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    True for errors worth retrying: throttling, 5xx, timeouts and dropped connections.
+    """
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError, requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    # The OpenAI SDK is only imported with the chat models, so match its transport errors by name.
+    return any(cls.__name__ == "APIConnectionError" for cls in type(error).__mro__)
+
+
+class ProviderLimiter:
+    """
+    Client-side scheduling for one provider's API, shared by every caller:
+    token buckets for requests and tokens per minute, a priority slot pool
+    for concurrency, and retries with jittered exponential backoff.
+
+    Rate-limit headers (x-ratelimit-*, retry-after) adjust the buckets and
+    pause all callers until the reset; 429s halve the concurrency, which
+    then grows back by one after a window of successes. BULK callers leave
+    `bulk_reserve` of each bucket to INTERACTIVE ones.
+    """
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        bulk_reserve: float = 0.2,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.slots = PrioritySlots(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bulk_reserve = bulk_reserve
+        self._paused_until = 0.0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.throttled = 0
+
+    # Admission
+
+    def _reserve(self, tokens: float, priority: int) -> float:
+        """
+        Takes one request and `tokens` from the buckets, or returns how long
+        to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            reserve = self.bulk_reserve if priority == BULK else 0.0
+            wait = max(
+                self.requests.wait_time(1, reserve * self.requests.capacity, now),
+                self.tokens.wait_time(tokens, reserve * self.tokens.capacity, now),
+            )
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return wait
+
+    def acquire(self, tokens: float = 0, priority: int = INTERACTIVE) -> None:
+        start = time.perf_counter()
+        while (wait := self._reserve(tokens, priority)) > 0:
+            time.sleep(min(wait, self.max_delay))
+        self.slots.acquire(priority)
+        self._observe_wait(time.perf_counter() - start)
+
+    async def aacquire(self, tokens: float = 0, priority: int = INTERACTIVE) -> None:
+        start = time.perf_counter()
+        while (wait := self._reserve(tokens, priority)) > 0:
+            await asyncio.sleep(min(wait, self.max_delay))
+        await self.slots.aacquire(priority)
+        self._observe_wait(time.perf_counter() - start)
+
+    def _observe_wait(self, seconds: float) -> None:
+        if seconds >= 0.001:
+            METRICS.observe("neura_ratelimit_wait_seconds", seconds, provider=self.name)
+
+    @contextmanager
+    def slot(self, tokens: float = 0, priority: int = INTERACTIVE) -> Iterator[None]:
+        """
+        Holds a slot for the block; no retries.
+        """
+        self.acquire(tokens, priority)
+        try:
+            yield
+        finally:
+            self.slots.release()
+
+    @asynccontextmanager
+    async def aslot(self, tokens: float = 0, priority: int = INTERACTIVE) -> AsyncIterator[None]:
+        await self.aacquire(tokens, priority)
+        try:
+            yield
+        finally:
+            self.slots.release()
+
+    # Calls
+
+    def call(self, func: Callable[[], Any], tokens: float = 0, priority: int = INTERACTIVE, retryable: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Runs `func` once admitted, retrying transient errors. A failed attempt
+        is only retried while `retryable()` (if given) still returns True.
+        """
+        attempt = 0
+        while True:
+            with self.slot(tokens, priority):
+                try:
+                    result = func()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, retryable is None or retryable())
+                    if delay is None:
+                        raise
+                else:
+                    self._succeeded()
+                    return result
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, func: Callable[[], Awaitable[Any]], tokens: float = 0, priority: int = INTERACTIVE, retryable: Optional[Callable[[], bool]] = None) -> Any:
+        attempt = 0
+        while True:
+            async with self.aslot(tokens, priority):
+                try:
+                    result = await func()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, retryable is None or retryable())
+                    if delay is None:
+                        raise
+                else:
+                    self._succeeded()
+                    return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, error: BaseException, attempt: int, retryable: bool = True) -> Optional[float]:
+        """
+        Seconds to wait before retrying `error`, or None to give up.
+        """
+        retry_after = self.observe_headers(error_headers(error))
+        throttled = status_code(error) == 429
+        if throttled:
+            self._decrease()
+        if not retryable or not is_transient(error):
+            return None
+        if attempt >= self.max_retries:
+            record_rate_limit(self.name, "gave_up")
+            return None
+        # Full jitter keeps retries from a burst from arriving together.
+        delay = retry_after if retry_after is not None else random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if delay > self.max_delay:
+            record_rate_limit(self.name, "gave_up")
+            return None
+        with self._lock:
+            self.retries += 1
+        record_rate_limit(self.name, "throttled" if throttled else "retry")
+        return delay
+
+    # Adaptation
+
+    def observe_headers(self, headers: Mapping[str, str]) -> Optional[float]:
+        """
+        Applies rate-limit headers from a response. Returns the retry-after
+        delay in seconds when the provider sent one.
+        """
+        if not isinstance(headers, Mapping) or not headers:
+            return None
+        get = headers.get
+        retry_after = _number(get("retry-after-ms"))
+        retry_after = retry_after / 1000 if retry_after is not None else _parse_duration(get("retry-after"))
+        pause = retry_after or 0.0
+        with self._lock:
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                limit = _number(get(f"x-ratelimit-limit-{kind}"))
+                remaining = _number(get(f"x-ratelimit-remaining-{kind}"))
+                if limit:
+                    bucket.set_rate(limit)
+                if remaining is not None:
+                    bucket.cap(remaining)
+                    if remaining <= 0:
+                        pause = max(pause, _parse_duration(get(f"x-ratelimit-reset-{kind}")) or 0.0)
+            if pause:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        return retry_after
+
+    def _decrease(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            self._successes = 0
+            # One cut per second, or a burst of 429s collapses concurrency to the floor.
+            if now - self._last_decrease < 1.0:
+                return
+            self._last_decrease = now
+            limit = max(self.min_concurrency, self.slots.limit // 2)
+        self.slots.set_limit(limit)
+
+    def _succeeded(self) -> None:
+        with self._lock:
+            self._successes += 1
+            if self._successes < self.slots.limit or self.slots.limit >= self.max_concurrency:
+                return
+            self._successes = 0
+            limit = self.slots.limit + 1
+        self.slots.set_limit(limit)
+
+    def stats(self) -> Dict[str, Any]:
+        waiting = self.slots.waiting()
+        with self._lock:
+            return {
+                "concurrency": self.slots.limit,
+                "in_flight": self.slots.in_use,
+                "waiting": {"interactive": waiting[INTERACTIVE], "bulk": waiting[BULK]},
+                "requests_per_minute": self.requests.per_minute,
+                "tokens_per_minute": self.tokens.per_minute,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+                "retries": self.retries,
+                "throttled": self.throttled,
+            }
+
+
+class RateLimitHeadersHandler(BaseCallbackHandler):
+    """
+    Feeds the rate-limit headers of chat model responses to a limiter.
+    Needs a chat model created with `include_response_headers=True`.
+    """
+    run_inline = True
+
+    def __init__(self, limiter: ProviderLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "response_metadata", None) or {}
+                if metadata.get("headers"):
+                    self.limiter.observe_headers(metadata["headers"])
+
+
+class FirstTokenHandler(BaseCallbackHandler):
+    """
+    Notes whether a chat model call has emitted a token. Once one has, it
+    may already have reached the client, so the call must not be retried.
+    """
+    run_inline = True
+
+    def __init__(self):
+        self.emitted = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.emitted = True
+
+
+def estimate_tokens(inputs: Mapping[str, Any], max_output_tokens: Optional[int] = None) -> int:
+    """
+    Rough token cost of a prompt (about four characters per token) plus the
+    completion budget, for the tokens-per-minute bucket.
+    """
+    return sum(len(str(value)) for value in inputs.values()) // 4 + (max_output_tokens or 256)
+
+
+def limiter_stats(limiters: Mapping[str, ProviderLimiter]) -> Dict[str, Any]:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def estimate_text_tokens(texts: List[str]) -> int:
+    """
+    Rough token cost of embedding `texts`.
+    """
+    return sum(len(text) for text in texts) // 4 + len(texts)
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings rather than exact text.
+    A lookup hits when a stored query is at least `threshold` cosine-similar
+    and was answered against the same collection version. Entries are evicted
+    by TTL and, beyond `max_size`, least-recently-used first.
+    Embeddings live in one preallocated (max_size, dim) matrix, one row per
+    slot, so a lookup is a single matrix-vector product without copying.
+    """
+    def __init__(self, threshold: float = 0.97, max_size: int = 512, ttl: Optional[float] = 3600.0):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        # Slot -> entry, least recently used first.
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._occupied = np.zeros(max_size, dtype=bool)
+        self._stored_at = np.zeros(max_size, dtype=np.float64)
+        self._versions = np.empty(max_size, dtype=object)
+        self._free = list(range(max_size - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: List[float], version: Any) -> Optional[Dict[str, Any]]:
+        """
+        Returns the closest cached entry above the threshold, or None.
+        Expired entries and entries from older collection versions are dropped.
+        """
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_invalid(version, now)
+            if not self._entries or self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            scores = self._matrix @ query
+            scores[~self._occupied] = -np.inf
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            entry = dict(self._entries[slot])
+            entry["similarity"] = float(scores[slot])
+            return entry
+
+    def store(self, embedding: List[float], answer: str, chunk_ids: List[Any], version: Any, documents: Optional[List[Any]] = None) -> None:
+        if self.max_size <= 0:
+            return
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                # First entry, or the embedding model changed: earlier rows are not comparable.
+                self._clear()
+                self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+            if not self._free:
+                self._release(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free.pop()
+            self._matrix[slot] = vector
+            self._occupied[slot] = True
+            self._stored_at[slot] = time.monotonic()
+            self._versions[slot] = version
+            self._entries[slot] = {
+                "answer": answer,
+                "chunk_ids": chunk_ids,
+                "documents": documents or [],
+                "version": version,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _evict_invalid(self, version: Any, now: float) -> None:
+        invalid = self._occupied & (self._versions != version)
+        if self.ttl is not None:
+            invalid |= self._occupied & (now - self._stored_at > self.ttl)
+        for slot in np.flatnonzero(invalid):
+            self._release(int(slot))
+            self.evictions += 1
+
+    def _release(self, slot: int) -> None:
+        del self._entries[slot]
+        self._occupied[slot] = False
+        self._versions[slot] = None
+        self._free.append(slot)
+
+    def _clear(self) -> None:
+        for slot in list(self._entries):
+            self._release(slot)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from src.utils.instrumentation import record_coalesced
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it is in flight wait and share its
+    result (or exception). Nothing is cached once the call completes.
+    Keys are (kind, ...) tuples; `kind` labels the metrics.
+    """
+    def __init__(self, max_tracked_keys: int = 256):
+        self.max_tracked_keys = max_tracked_keys
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.executed: Counter = Counter()
+        self.saved: Counter = Counter()
+        self._saved_by_key: Counter = Counter()
+
+    def do(self, key: Tuple, func: Callable[[], Any]) -> Any:
+        """
+        Runs `func` once per concurrent group of callers with an equal key.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            self._count_saved(key)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._count_executed(key)
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key: Tuple, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of `do`. The work runs as a task, so a cancelled caller
+        does not cancel it for the others.
+        """
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(loop_key)
+        if task is not None:
+            self._count_saved(key)
+            return await asyncio.shield(task)
+
+        self._count_executed(key)
+        task = asyncio.ensure_future(func())
+        self._tasks[loop_key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(loop_key, None))
+        return await asyncio.shield(task)
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Executed and saved (coalesced) calls per kind, and the keys that saved the most.
+        """
+        with self._lock:
+            kinds = sorted(set(self.executed) | set(self.saved))
+            return {
+                "kinds": {kind: {"executed": self.executed[kind], "saved": self.saved[kind]} for kind in kinds},
+                "top_keys": [(list(key), count) for key, count in self._saved_by_key.most_common(top)],
+            }
+
+    def _count_executed(self, key: Tuple) -> None:
+        with self._lock:
+            self.executed[key[0]] += 1
+
+    def _count_saved(self, key: Tuple) -> None:
+        with self._lock:
+            self.saved[key[0]] += 1
+            self._saved_by_key[key] += 1
+            # Keep only the busiest keys so memory stays bounded.
+            if len(self._saved_by_key) > 2 * self.max_tracked_keys:
+                self._saved_by_key = Counter(dict(self._saved_by_key.most_common(self.max_tracked_keys)))
+        record_coalesced(key[0])
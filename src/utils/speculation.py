@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from src.utils.instrumentation import record_speculation
+
+
+class Speculator:
+    """
+    Starts work that a decision will probably need while the decision is
+    still being made. Each branch is a (function, budget in seconds) pair;
+    once `decide` returns, `pick` names the branches the decision needs.
+    Those are awaited until their budget runs out, the rest are cancelled.
+    Outcomes per branch ("used", "wasted", "timeout", "error", "skipped")
+    are counted.
+    """
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.counters: Counter = Counter()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._active = 0
+        self._lock = threading.Lock()
+
+    async def arun(
+        self,
+        decide: Callable[[], Awaitable[Any]],
+        branches: Dict[str, Tuple[Callable[[], Awaitable[Any]], float]],
+        pick: Callable[[Any], Set[str]],
+    ) -> Tuple[Any, Dict[str, Any]]:
+        async def bounded(func: Callable[[], Awaitable[Any]], budget: float) -> Any:
+            return await asyncio.wait_for(func(), budget)
+
+        tasks = {}
+        for name, (func, budget) in branches.items():
+            task = asyncio.ensure_future(bounded(func, budget))
+            # Unused branches may fail after the decision; nobody awaits them then.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            tasks[name] = task
+        try:
+            decision = await decide()
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        wanted = pick(decision)
+        results = {}
+        for name, task in tasks.items():
+            if name not in wanted:
+                task.cancel()
+                self._count(name, "wasted")
+                continue
+            try:
+                results[name] = await task
+                self._count(name, "used")
+            except asyncio.TimeoutError:
+                self._count(name, "timeout")
+            except Exception as e:
+                print(f"Speculative {name} failed: {e}")
+                self._count(name, "error")
+        return decision, results
+
+    def run(
+        self,
+        decide: Callable[[], Any],
+        branches: Dict[str, Tuple[Callable[[], Any], float]],
+        pick: Callable[[Any], Set[str]],
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Blocking variant of `arun` on a thread pool. A branch that already
+        started cannot be interrupted; it finishes in the background and its
+        result is dropped. While the pool is busy with such branches, new
+        branches are skipped rather than queued behind them.
+        """
+        start = time.perf_counter()
+        futures = {}
+        for name, (func, budget) in branches.items():
+            future = self._submit(func)
+            if future is None:
+                self._count(name, "skipped")
+                continue
+            futures[name] = (future, budget)
+        try:
+            decision = decide()
+        except BaseException:
+            for future, _ in futures.values():
+                future.cancel()
+            raise
+
+        wanted = pick(decision)
+        results = {}
+        for name, (future, budget) in futures.items():
+            if name not in wanted:
+                future.cancel()
+                self._count(name, "wasted")
+                continue
+            try:
+                results[name] = future.result(timeout=max(0.0, start + budget - time.perf_counter()))
+                self._count(name, "used")
+            except FutureTimeout:
+                future.cancel()
+                self._count(name, "timeout")
+            except Exception as e:
+                print(f"Speculative {name} failed: {e}")
+                self._count(name, "error")
+        return decision, results
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Outcome counts per branch.
+        """
+        with self._lock:
+            stats: Dict[str, Dict[str, int]] = {}
+            for (name, outcome), count in self.counters.items():
+                stats.setdefault(name, {})[outcome] = count
+            return stats
+
+    def _count(self, name: str, outcome: str) -> None:
+        with self._lock:
+            self.counters[(name, outcome)] += 1
+        record_speculation(name, outcome)
+
+    def _submit(self, func: Callable[[], Any]) -> Optional[Future]:
+        with self._lock:
+            if self._active >= self.max_workers:
+                return None
+            self._active += 1
+        future = self._get_executor().submit(contextvars.copy_context().run, func)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="speculation")
+        return self._executor
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from starlette.testclient import TestClient
+from langchain_core.documents import Document
+from benchmarks.fakes import write_pdf
+from src.controllers.remote_controller import RemoteController
+from views.api import create_app
+
+class FakeController:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.uploaded = []
+
+    async def ahandle_query(self, query):
+        await asyncio.sleep(self.delay)
+        return f"Answer to {query}", {"query": query, "intent": "document", "rag_context": [Document(page_content="chunk", metadata={"page": 0})]}
+
+    async def astream_query(self, query):
+        for token in ("Answer ", "streamed"):
+            yield {"token": token}
+        yield {"response": "Answer streamed", "state": {"query": query, "rag_context": [Document(page_content="chunk")]}}
+
+    async def ahandle_batch(self, queries, max_concurrency=None):
+        return [await self.ahandle_query(query) for query in queries]
+
+    def upload_pdf(self, path, on_progress=None):
+        self.uploaded.append(path)
+        return "Successfully processed 1 chunks"
+
+    def upload_pdfs(self, paths, on_progress=None):
+        self.uploaded.extend(paths)
+        return f"Successfully processed from {len(paths)} files"
+
+@pytest.fixture
+def client():
+    with TestClient(create_app(FakeController())) as test_client:
+        yield test_client
+
+def test_query_returns_serialized_state(client):
+    response = client.post("/query", json={"query": "What is E42?"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["response"] == "Answer to What is E42?"
+    assert body["state"]["rag_context"] == [{"page_content": "chunk", "metadata": {"page": 0}}]
+    assert client.post("/query", json={}).status_code == 400
+
+def test_query_timeout_returns_504():
+    with TestClient(create_app(FakeController(delay=1.0), request_timeout=0.05)) as client:
+        response = client.post("/query", json={"query": "slow"})
+
+    assert response.status_code == 504
+
+def test_remote_controller_streams_and_uploads(client, tmp_path):
+    remote = RemoteController("http://testserver", client=client)
+    events = list(remote.stream_query("Summarize"))
+
+    assert [e["token"] for e in events if "token" in e] == ["Answer ", "streamed"]
+    assert isinstance(events[-1]["state"]["rag_context"][0], Document)
+
+    path = str(tmp_path / "doc.pdf")
+    write_pdf(path, ["Hello"])
+    assert remote.upload_pdf(path) == "Successfully processed 1 chunks"
+    assert remote.handle_batch(["a", "b"])[1][0] == "Answer to b"
+
+def test_batch_errors_return_json():
+    class FailingController(FakeController):
+        async def ahandle_batch(self, queries, max_concurrency=None):
+            raise RuntimeError("vector store down")
+
+    with TestClient(create_app(FailingController())) as client:
+        response = client.post("/batch", json={"queries": ["a"]})
+
+    assert response.status_code == 500
+    assert "vector store down" in response.json()["error"]
@@ -0,0 +1,51 @@
+import json
+from unittest.mock import MagicMock
+from benchmarks import pipeline
+from benchmarks.fakes import FakeChatModel
+from benchmarks.weather_stub import WeatherStub
+from src.models.weather_model import WeatherModel
+from src.services.llm_service import LLMService
+
+def test_fake_chat_model_answers_app_prompts():
+    service = LLMService(llm=FakeChatModel())
+
+    assert service.extract_cities("What's the weather in New York?") == ["New York"]
+    assert service.extract_cities("Weather in London vs Paris") == ["London", "Paris"]
+    analysis = service.analyze_query("Is it snowing in Oslo?")
+    assert analysis["intent"] == "weather"
+    assert analysis["cities"] == ["Oslo"]
+    assert service.analyze_query("Summarize the handbook")["intent"] == "document"
+
+def test_weather_stub_serves_weather_model():
+    with WeatherStub() as stub:
+        model = WeatherModel(api_key="test", base_url=stub.url)
+        data = model.fetch_weather("London")
+        missing = model.fetch_weather("Nowhere")
+
+    assert data["name"] == "London"
+    assert missing["status_code"] == 404
+
+def test_pipeline_benchmark_writes_report(tmp_path):
+    output = tmp_path / "result.json"
+    report = pipeline.main([
+        "--rounds", "1", "--concurrency", "1,4", "--ingest-pages", "3", "--dim", "32",
+        "--llm-latency", "0", "--token-latency", "0", "--embed-latency", "0", "--weather-latency", "0",
+        "--output", str(output),
+    ])
+
+    saved = json.loads(output.read_text())
+    assert saved["ingestion"]["pages"] == 3
+    assert {"classify", "handle_weather", "handle_rag"} <= set(saved["latency"]["nodes"])
+    assert saved["latency"]["end_to_end"]["count"] == len(pipeline.DEFAULT_QUERIES)
+    assert [row["concurrency"] for row in report["throughput"]] == [1, 4]
+
+def test_throughput_levels_start_from_empty_caches():
+    controller = MagicMock()
+    controller.handle_batch.return_value = []
+
+    pipeline.bench_throughput(controller, [], [1, 4])
+
+    workflow = controller.workflow_controller
+    assert workflow.answer_cache.clear.call_count == 2
+    assert workflow.weather_model.cache.clear.call_count == 2
+    assert workflow.rag_model.query_embedding_cache.clear.call_count == 2
@@ -0,0 +1,49 @@
+from langchain_core.documents import Document
+from src.services.context_packer import ContextPacker
+
+PAGE = "Pumps must be serviced every six months. " * 10 + "Filters are replaced yearly. " * 10
+
+def chunk(start, end, page=0, source="/tmp/manual.pdf"):
+    return Document(page_content=PAGE[start:end], metadata={"source": source, "page": page, "start_index": start})
+
+def test_overlapping_chunks_are_merged():
+    packer = ContextPacker()
+    passages = packer.merge([chunk(300, 700), chunk(0, 400)])
+
+    assert len(passages) == 1
+    assert passages[0]["text"] == PAGE[0:700]
+
+def test_chunks_without_start_index_merge_on_text_overlap():
+    packer = ContextPacker()
+    docs = [Document(page_content=PAGE[0:400], metadata={"page": 0}), Document(page_content=PAGE[300:700], metadata={"page": 0})]
+
+    assert [p["text"] for p in packer.merge(docs)] == [PAGE[0:700]]
+
+def test_chunks_from_other_pages_are_kept_apart():
+    packer = ContextPacker()
+    passages = packer.merge([chunk(0, 400, page=0), chunk(300, 700, page=1)])
+
+    assert len(passages) == 2
+
+def test_near_duplicates_are_dropped():
+    packer = ContextPacker()
+    docs = [
+        Document(page_content="Reset the controller by holding the power button.", metadata={"page": 1}),
+        Document(page_content="Reset the controller by holding the power button!", metadata={"page": 7}),
+        Document(page_content="Warranty covers parts for two years.", metadata={"page": 9}),
+    ]
+
+    context = packer.pack(docs)
+
+    assert context.count("Reset the controller") == 1
+    assert "Warranty" in context
+    assert "[Source: document, page 2]" in context
+
+def test_context_respects_token_budget():
+    packer = ContextPacker(token_budget=120)
+    docs = [Document(page_content=f"Section {i}: " + "detail " * 80, metadata={"page": i}) for i in range(5)]
+
+    context = packer.pack(docs)
+
+    assert packer.count_tokens(context) <= 125
+    assert context.startswith("[Source: document, page 1]")
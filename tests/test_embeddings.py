@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import numpy as np
+from src.models.embeddings import LocalEmbeddings, collection_name_for
+from src.models.rag_model import RAGModel
+
+class FakeEncoder:
+    """fastembed-style encoder: one-hot-ish vectors derived from the text length."""
+    def __init__(self, size=384):
+        self.size = size
+        self.query_batches = []
+
+    def _vector(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        vector[len(text) % self.size] = 1.0
+        return vector
+
+    def query_embed(self, texts):
+        self.query_batches.append(len(texts))
+        return (self._vector(text) for text in texts)
+
+    def passage_embed(self, texts, batch_size=256):
+        return (self._vector(text) for text in texts)
+
+def test_concurrent_queries_are_micro_batched():
+    encoder = FakeEncoder()
+    embeddings = LocalEmbeddings(encoder=encoder, max_wait=0.05)
+    texts = ["a" * n for n in range(1, 9)]
+    results = {}
+    barrier = threading.Barrier(len(texts))
+
+    def embed(text):
+        barrier.wait()
+        results[text] = embeddings.embed_query(text)
+
+    threads = [threading.Thread(target=embed, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(results[text][len(text)] == 1.0 for text in texts)
+    assert sum(encoder.query_batches) == len(texts)
+    assert len(encoder.query_batches) < len(texts)
+
+    async def run():
+        return await asyncio.gather(*(embeddings.aembed_query(text) for text in texts[:3]))
+
+    assert [vector.index(1.0) for vector in asyncio.run(run())] == [1, 2, 3]
+
+def test_rag_model_sizes_collection_for_local_model(tmp_path):
+    embeddings = LocalEmbeddings("BAAI/bge-small-en-v1.5", encoder=FakeEncoder(384))
+    name = collection_name_for("neura_docs", "local", embeddings.model)
+    model = RAGModel(qdrant_path=":memory:", collection_name=name, embeddings=embeddings)
+    try:
+        assert name == "neura_docs_baai_bge_small_en_v1_5"
+        assert model.client.get_collection(name).config.params.vectors.size == 384
+        assert len(model.embed_query("hello")) == 384
+    finally:
+        model.client.close()
+    assert collection_name_for("neura_docs", "openai", None) == "neura_docs"
+
+def test_batched_queries_match_single_query_vectors():
+    class PassageEncoder(FakeEncoder):
+        def passage_embed(self, texts, batch_size=256):
+            return (np.roll(self._vector(text), 1) for text in texts)
+
+    embeddings = LocalEmbeddings("BAAI/bge-small-en-v1.5", encoder=PassageEncoder(384))
+    model = RAGModel(qdrant_path=":memory:", collection_name="queries", embeddings=embeddings)
+    try:
+        batched = model.embed_queries(["hello", "hi"])
+        model.query_embedding_cache.clear()
+        assert batched == [model.embed_query("hello"), model.embed_query("hi")]
+    finally:
+        model.client.close()
+
+def test_cancelled_query_does_not_stop_the_batcher():
+    release = threading.Event()
+
+    class SlowEncoder(FakeEncoder):
+        def query_embed(self, texts):
+            release.wait(1)
+            return super().query_embed(texts)
+
+    embeddings = LocalEmbeddings(encoder=SlowEncoder())
+
+    async def run():
+        # The first call occupies the worker; the second is cancelled while queued.
+        first = asyncio.ensure_future(embeddings.aembed_query("a"))
+        await asyncio.sleep(0.01)
+        try:
+            await asyncio.wait_for(embeddings.aembed_query("bb"), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        release.set()
+        await first
+        return await asyncio.wait_for(embeddings.aembed_query("ccc"), 1)
+
+    assert asyncio.run(run()).index(1.0) == 3
@@ -0,0 +1,43 @@
+from src.services.intent_router import IntentRouter
+
+class KeywordEmbeddings:
+    """Maps text onto two axes so exemplar similarity is predictable."""
+    def embed_query(self, text):
+        text = text.lower()
+        return [1.0 if any(w in text for w in ("hot", "rain", "forecast", "weather", "umbrella", "snow", "temperature", "windy")) else 0.0,
+                1.0 if any(w in text for w in ("pdf", "document", "file", "chapter", "manual", "report", "handbook", "definition")) else 0.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+def test_keyword_tier_routes_weather():
+    router = IntentRouter()
+    assert router.route("What's the weather in London?") == ("weather", "keyword")
+    assert router.stats()["keyword"] == 1
+
+def test_keyword_tier_routes_document():
+    router = IntentRouter()
+    assert router.route("Summarize the uploaded pdf") == ("document", "keyword")
+
+def test_ambiguous_query_falls_through_to_llm():
+    router = IntentRouter()
+    assert router.route("What is the temperature limit in the manual?") is None
+    assert router.stats() == {"keyword": 0, "embedding": 0, "llm": 1}
+
+def test_forecast_needs_a_second_weather_cue():
+    router = IntentRouter()
+    assert router.route("Give me the Q3 sales forecast") is None
+    assert router.route("What's the forecast for Berlin?") == ("weather", "keyword")
+    assert router.route("Is rain in the forecast?") == ("weather", "keyword")
+
+def test_embedding_tier_used_when_keywords_are_weak():
+    router = IntentRouter(embeddings=KeywordEmbeddings(), embedding_threshold=0.9, embedding_margin=0.1)
+    assert router.route("is it going to be hot") == ("weather", "embedding")
+    assert router.stats()["embedding"] == 1
+
+def test_embedding_failure_falls_through():
+    class Broken:
+        def embed_documents(self, texts):
+            raise RuntimeError("offline")
+    router = IntentRouter(embeddings=Broken())
+    assert router.route("hello there") is None
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from src.services.llm_service import LLMService, ModelTier, QueryAnalysis
+from src.utils.metrics import METRICS
+from src.utils.rate_limiter import ProviderLimiter
+
+def fake(*replies):
+    return GenericFakeChatModel(messages=iter([AIMessage(content=reply) for reply in replies]))
+
+class FixedAnalysisModel:
+    def __init__(self, analysis):
+        self.analysis = analysis
+        self.calls = 0
+
+    def with_structured_output(self, schema):
+        def analyze(_):
+            self.calls += 1
+            if self.analysis is None:
+                raise ValueError("Could not parse output")
+            return self.analysis
+        return RunnableLambda(analyze)
+
+def test_steps_use_their_own_models():
+    service = LLMService(
+        tiers={"extract": ModelTier("small"), "summarize_weather": ModelTier("large")},
+        models={"small": fake("Rome"), "large": fake("Sunny in Rome.")},
+    )
+
+    assert service.extract_cities("Rain in Rome?") == ["Rome"]
+    assert service.summarize_weather("Rain in Rome?", {"temp": 20}) == "Sunny in Rome."
+
+def test_analysis_escalation_is_counted():
+    service = LLMService(
+        tiers={"classify": ModelTier("small")},
+        fallback_models=["large"],
+        models={"small": FixedAnalysisModel(None), "large": FixedAnalysisModel(QueryAnalysis(intent="document"))},
+    )
+    before = METRICS.counter_value("neura_llm_escalations_total", name="classify", reason="parse_error")
+
+    assert asyncio.run(service.aanalyze_query("Tell me more"))["intent"] == "document"
+    assert METRICS.counter_value("neura_llm_escalations_total", name="classify", reason="parse_error") == before + 1
+
+def test_analysis_escalates_on_low_confidence_or_parse_error():
+    large = FixedAnalysisModel(QueryAnalysis(intent="weather", cities=["Oslo"], confidence=0.9))
+
+    def service(small, fallback_models=("large",)):
+        return LLMService(
+            tiers={"classify": ModelTier("small")},
+            fallback_models=list(fallback_models),
+            escalation_confidence=0.6,
+            models={"small": small, "large": large},
+        )
+
+    assert service(FixedAnalysisModel(QueryAnalysis(intent="document", confidence=0.3))).analyze_query("Oslo?")["cities"] == ["Oslo"]
+    assert service(FixedAnalysisModel(None)).analyze_query("Oslo?")["intent"] == "weather"
+    assert large.calls == 2
+
+    with pytest.raises(ValueError):
+        service(FixedAnalysisModel(None), fallback_models=()).analyze_query("Oslo?")
+
+def test_weather_summary_gets_compact_payload():
+    payload = {"coord": {"lon": 10.7, "lat": 59.9}, "base": "stations", "name": "Oslo", "weather": [{"id": 600, "description": "light snow", "icon": "13n"}],
+               "main": {"temp": -3.2, "pressure": 1012}, "timezone": 3600, "id": 3143244, "cod": 200}
+
+    data = json.loads(LLMService._weather_input("Snow in Oslo?", payload, "metric")["data"])
+
+    assert data == {"units": {"temperature": "°C", "wind_speed": "m/s"}, "city": "Oslo", "conditions": "light snow", "temp": -3.2}
+
+def test_limiter_retries_transient_errors():
+    class Flaky(GenericFakeChatModel):
+        failures: int = 1
+
+        def _generate(self, *args, **kwargs):
+            if self.failures:
+                self.failures -= 1
+                raise TimeoutError("upstream timed out")
+            return super()._generate(*args, **kwargs)
+
+    limiter = ProviderLimiter("openai_chat", base_delay=0.001)
+    service = LLMService(llm=Flaky(messages=iter([AIMessage(content="Sunny in Rome.")])), limiter=limiter)
+
+    assert service.summarize_weather("Rain in Rome?", {"temp": 20}) == "Sunny in Rome."
+    assert limiter.stats()["retries"] == 1
+    assert limiter.stats()["in_flight"] == 0
+
+def test_default_llm_access_keeps_step_tiers():
+    default = fake("unused")
+    service = LLMService(tiers={"extract": ModelTier("small")}, models={"gpt-4o": default, "small": fake("Rome")})
+
+    assert service.llm is default
+    assert service.extract_cities("Rain in Rome?") == ["Rome"]
+
+def test_extract_cities_keeps_commas_inside_names():
+    service = LLMService(tiers={"extract": ModelTier("small")}, models={"small": fake("Washington, D.C. | Baltimore")})
+
+    assert service.extract_cities("Is it raining in Washington, D.C. or Baltimore?") == ["Washington, D.C.", "Baltimore"]
@@ -0,0 +1,45 @@
+import pytest
+from urllib.request import urlopen
+from src.utils.instrumentation import instrument_node, record
+from src.utils.metrics import METRICS, MetricsRegistry, start_metrics_server
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("neura_cache_requests_total", cache="weather", result="hit")
+    registry.observe("neura_node_duration_seconds", 0.5, name="classify")
+
+    text = registry.render()
+    assert '# TYPE neura_cache_requests_total counter' in text
+    assert 'neura_cache_requests_total{cache="weather",result="hit"} 1' in text
+    assert 'neura_node_duration_seconds_bucket{name="classify",le="0.1"} 0' in text
+    assert 'neura_node_duration_seconds_bucket{name="classify",le="1"} 1' in text
+    assert 'neura_node_duration_seconds_count{name="classify"} 1' in text
+
+def test_instrumented_node_adds_timings_and_counts_errors():
+    def node(state):
+        record("external", "openweather", 0.02)
+        return {"response": "ok"}
+
+    def failing(state):
+        raise RuntimeError("boom")
+
+    run, _ = instrument_node("probe", node, None)
+    update = run({})
+    assert update["response"] == "ok"
+    assert [t["kind"] for t in update["timings"]] == ["node", "external"]
+
+    errors = METRICS.counter_value("neura_node_errors_total", name="failing_probe")
+    run_failing, _ = instrument_node("failing_probe", failing, None)
+    with pytest.raises(RuntimeError):
+        run_failing({})
+    assert METRICS.counter_value("neura_node_errors_total", name="failing_probe") == errors + 1
+
+def test_metrics_server_serves_registry():
+    registry = MetricsRegistry()
+    registry.inc("neura_llm_tokens_total", 12, name="rag_response", type="output")
+    server = start_metrics_server(0, host="127.0.0.1", registry=registry)
+    try:
+        body = urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics").read().decode()
+    finally:
+        server.shutdown()
+    assert 'neura_llm_tokens_total{name="rag_response",type="output"} 12' in body
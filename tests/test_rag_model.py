@@ -0,0 +1,229 @@
+import time
+import pytest
+from unittest.mock import patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from qdrant_client.http.models import Distance, VectorParams
+from benchmarks.fakes import write_pdf
+from src.models.bm25_index import BM25Index
+from src.models.collection_config import CollectionSettings
+from src.models.rag_model import RAGModel
+from src.utils.embedding_cache import content_hash
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+    queries: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+PAGES = [
+    "Error code E42 means the pump is overheating.",
+    "Part number PX-100 is the replacement filter.",
+]
+
+@pytest.fixture
+def rag_model(tmp_path):
+    with patch('src.models.rag_model.OpenAIEmbeddings', return_value=CountingEmbeddings(size=1536)):
+        model = RAGModel(qdrant_path=str(tmp_path / "qdrant"), embedding_cache_path=str(tmp_path / "emb.sqlite"))
+    yield model
+    model.client.close()
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = str(tmp_path / "manual.pdf")
+    write_pdf(path, PAGES)
+    return path
+
+def ingest(model, path):
+    return model.load_and_process_pdf(path)
+
+def test_ingest_reports_new_chunks(rag_model, pdf_path):
+    msg = ingest(rag_model, pdf_path)
+
+    assert "(2 new, 0 reused, 0 skipped)" in msg
+    assert rag_model.client.count(rag_model.collection_name).count == 2
+    assert rag_model.collection_version == 1
+
+def test_reupload_is_idempotent(rag_model, pdf_path):
+    ingest(rag_model, pdf_path)
+    embedded = rag_model.embeddings.embedded
+    msg = ingest(rag_model, pdf_path)
+
+    assert "(0 new, 0 reused, 2 skipped)" in msg
+    assert rag_model.client.count(rag_model.collection_name).count == 2
+    assert rag_model.embeddings.embedded == embedded
+    assert rag_model.collection_version == 1
+
+def test_cached_embeddings_are_reused(rag_model, pdf_path):
+    ingest(rag_model, pdf_path)
+    embedded = rag_model.embeddings.embedded
+    rag_model.client.delete_collection(rag_model.collection_name)
+    rag_model.client.create_collection(rag_model.collection_name, vectors_config=VectorParams(size=1536, distance=Distance.COSINE))
+
+    msg = ingest(rag_model, pdf_path)
+
+    assert "(0 new, 2 reused, 0 skipped)" in msg
+    assert rag_model.embeddings.embedded == embedded
+
+def test_retrieve_context_after_ingest(rag_model, pdf_path):
+    ingest(rag_model, pdf_path)
+    docs = rag_model.retrieve_context("Error code E42 means the pump is overheating.", k=1)
+
+    assert docs[0].page_content.startswith("Error code E42")
+
+def test_ingest_streams_batches_with_progress(rag_model, tmp_path):
+    path = str(tmp_path / "long.pdf")
+    write_pdf(path, [f"Page {i} covers maintenance step {i}." for i in range(10)])
+    rag_model.ingest_batch_size = 3
+    rag_model.embed_concurrency = 2
+    updates = []
+
+    msg = rag_model.load_and_process_pdf(path, on_progress=updates.append)
+
+    assert "Successfully processed 10 chunks" in msg
+    assert updates[-1]["done"] and updates[-1]["pages"] == 10 and updates[-1]["total_pages"] == 10
+    assert [u["new"] for u in updates[:-1]] == [3, 6, 9, 10]
+
+def test_ingest_multiple_files(rag_model, tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = str(tmp_path / f"{name}.pdf")
+        write_pdf(path, [f"Document {name} page {i}." for i in range(3)])
+        paths.append(path)
+    # Fewer workers than files: the next file is queued as one finishes.
+    rag_model.parse_workers = 2
+
+    msg = rag_model.load_and_process_pdfs(paths)
+
+    assert "Successfully processed 9 chunks from 3 files (9 new, 0 reused, 0 skipped)." == msg
+    assert rag_model.client.count(rag_model.collection_name).count == 9
+
+def test_failed_ingest_still_bumps_collection_version(rag_model, pdf_path):
+    rag_model.ingest_batch_size = 1
+    rag_model.embed_concurrency = 1
+    embed_documents = rag_model.embeddings.embed_documents
+    calls = []
+
+    def fail_second_batch(texts):
+        calls.append(texts)
+        if len(calls) == 2:
+            raise RuntimeError("embedding API down")
+        return embed_documents(texts)
+
+    with patch.object(type(rag_model.embeddings), "embed_documents", side_effect=fail_second_batch):
+        with pytest.raises(RuntimeError):
+            ingest(rag_model, pdf_path)
+
+    assert rag_model.client.count(rag_model.collection_name).count == 1
+    assert rag_model.collection_version == 1
+
+def test_repeated_query_embedded_once(rag_model, pdf_path):
+    ingest(rag_model, pdf_path)
+    queries = rag_model.embeddings.queries
+    rag_model.retrieve_context("Error code E42?")
+    rag_model.retrieve_context("  error code e42? ")
+
+    assert rag_model.embeddings.queries == queries + 1
+
+def test_retrieve_many_embeds_each_distinct_query_once(rag_model, pdf_path):
+    ingest(rag_model, pdf_path)
+    embedded, embedded_queries = rag_model.embeddings.embedded, rag_model.embeddings.queries
+    queries = [PAGES[0], PAGES[1], PAGES[0]]
+
+    results = rag_model.retrieve_many(queries, k=1)
+
+    # Queries go through the query path, never embed_documents.
+    assert rag_model.embeddings.embedded == embedded
+    assert rag_model.embeddings.queries == embedded_queries + 2
+    assert [docs[0].page_content for docs in results] == queries
+    assert results[0][0].metadata["_id"] == rag_model.point_id(results[0][0].metadata["content_hash"])
+
+@pytest.fixture
+def hybrid_model(tmp_path):
+    with patch('src.models.rag_model.OpenAIEmbeddings', return_value=CountingEmbeddings(size=1536)):
+        model = RAGModel(qdrant_path=str(tmp_path / "qdrant"), sparse_index_path=str(tmp_path / "bm25.sqlite"))
+    yield model
+    model.client.close()
+
+def test_hybrid_search_finds_exact_part_number(hybrid_model, tmp_path):
+    path = str(tmp_path / "parts.pdf")
+    write_pdf(path, [f"Filter model FX-{i} fits the standard housing." for i in range(20)])
+    hybrid_model.load_and_process_pdf(path)
+
+    docs = hybrid_model.retrieve_context("Which housing does FX-13 fit?", k=3)
+
+    assert "FX-13" in docs[0].page_content
+    assert len(docs) == 3
+
+def test_hybrid_search_survives_slow_dense_leg(hybrid_model, pdf_path):
+    ingest(hybrid_model, pdf_path)
+    hybrid_model.dense_budget = 0.0
+
+    with patch.object(hybrid_model, '_search_by_vector', side_effect=lambda *a: time.sleep(0.2) or []):
+        docs = hybrid_model.retrieve_context("PX-100", k=2)
+
+    assert docs[0].page_content.startswith("Part number PX-100")
+
+def test_sparse_index_persists(hybrid_model, pdf_path, tmp_path):
+    ingest(hybrid_model, pdf_path)
+
+    reloaded = BM25Index(str(tmp_path / "bm25.sqlite"))
+
+    assert len(reloaded) == 2
+    assert reloaded.search("E42", k=1)[0][0] == hybrid_model.point_id(content_hash(PAGES[0]))
+
+def test_sparse_index_appends_and_refreshes(tmp_path):
+    path = str(tmp_path / "bm25.sqlite")
+    writer, reader = BM25Index(path), BM25Index(path)
+    writer.add("a", "pump error E42")
+    writer.save()
+    writer.add("b", "filter PX-100")
+    writer.save()
+
+    assert reader.refresh() == 2
+    assert reader.search("PX-100", k=1)[0][0] == "b"
+    assert reader.refresh() == 0
+
+def test_shared_version_reaches_other_processes(tmp_path, pdf_path):
+    from qdrant_client import QdrantClient
+    client = QdrantClient(location=":memory:")
+    models = []
+    with patch('src.models.rag_model.OpenAIEmbeddings', return_value=CountingEmbeddings(size=1536)), \
+         patch('src.models.rag_model.QdrantClient', return_value=client):
+        for _ in range(2):
+            models.append(RAGModel(qdrant_path=":memory:", sparse_index_path=str(tmp_path / "bm25.sqlite"), shared_version=True, version_check_interval=0))
+    writer, reader = models
+
+    assert reader.collection_version == 0
+    ingest(writer, pdf_path)
+
+    assert reader.collection_version == writer.collection_version == 1
+    assert len(reader.sparse_index) == 2
+    client.close()
+
+def test_quantized_collection_settings(tmp_path, pdf_path):
+    settings = CollectionSettings(quantization="int8", on_disk=True, hnsw_m=8, hnsw_ef=64)
+    with patch('src.models.rag_model.OpenAIEmbeddings', return_value=CountingEmbeddings(size=768)):
+        model = RAGModel(qdrant_path=str(tmp_path / "qdrant"), collection_settings=settings)
+    try:
+        ingest(model, pdf_path)
+        params = model.client.get_collection(model.collection_name).config.params
+
+        assert params.vectors.size == 768
+        assert params.vectors.on_disk is True
+        assert model.search_params.quantization.rescore is True
+        assert model.retrieve_context(PAGES[1], k=1)[0].page_content == PAGES[1]
+    finally:
+        model.client.close()
+
+def test_vector_size_mismatch_is_rejected(tmp_path):
+    with patch('src.models.rag_model.OpenAIEmbeddings', return_value=CountingEmbeddings(size=1536)):
+        RAGModel(qdrant_path=str(tmp_path / "qdrant")).client.close()
+    with patch('src.models.rag_model.OpenAIEmbeddings', return_value=CountingEmbeddings(size=384)):
+        with pytest.raises(ValueError, match="1536-d"):
+            RAGModel(qdrant_path=str(tmp_path / "qdrant"))
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+import requests
+from unittest.mock import Mock, patch
+from src.models.weather_model import WeatherModel
+from src.utils.rate_limiter import BULK, INTERACTIVE, PrioritySlots, ProviderLimiter, TokenBucket
+
+def _http_error(status, headers=None):
+    request = httpx.Request("GET", "https://api.example.com")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"{status}", request=request, response=response)
+
+def test_retries_429_after_retry_after_and_halves_concurrency():
+    limiter = ProviderLimiter("test", max_concurrency=8, base_delay=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise _http_error(429, {"retry-after-ms": "50"})
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert attempts[1] - attempts[0] >= 0.045
+    assert limiter.stats()["concurrency"] == 4
+    assert limiter.stats()["throttled"] == 1
+
+def test_gives_up_on_client_errors_and_after_max_retries():
+    limiter = ProviderLimiter("test", max_retries=2, base_delay=0.001)
+    calls = []
+
+    def fail(status):
+        def run():
+            calls.append(status)
+            raise _http_error(status)
+        return run
+
+    with pytest.raises(httpx.HTTPStatusError):
+        limiter.call(fail(404))
+    assert calls == [404]
+
+    with pytest.raises(httpx.HTTPStatusError):
+        limiter.call(fail(503))
+    assert calls.count(503) == 3
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=60)
+    now = time.monotonic()
+    assert bucket.wait_time(60, now=now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now=now) == pytest.approx(1.0, abs=0.01)
+    # BULK callers leave a reserve untouched.
+    assert bucket.wait_time(1, floor=12, now=now + 1) == pytest.approx(12.0, abs=0.01)
+
+def test_headers_lower_rate_and_pause_callers():
+    limiter = ProviderLimiter("test", requests_per_minute=1000)
+    limiter.observe_headers({
+        "x-ratelimit-limit-requests": "120",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "80ms",
+    })
+
+    assert limiter.requests.per_minute == 120
+    start = time.monotonic()
+    limiter.call(lambda: None)
+    assert time.monotonic() - start >= 0.07
+
+def test_interactive_waiters_go_before_bulk():
+    slots = PrioritySlots(1)
+    slots.acquire()
+    order = []
+
+    def waiter(priority, name):
+        slots.acquire(priority)
+        order.append(name)
+        slots.release()
+
+    bulk = threading.Thread(target=waiter, args=(BULK, "bulk"))
+    bulk.start()
+    while slots.waiting()[BULK] == 0:
+        time.sleep(0.001)
+    interactive = threading.Thread(target=waiter, args=(INTERACTIVE, "interactive"))
+    interactive.start()
+    while slots.waiting()[INTERACTIVE] == 0:
+        time.sleep(0.001)
+
+    slots.release()
+    bulk.join()
+    interactive.join()
+    assert order == ["interactive", "bulk"]
+
+def test_cancelled_async_waiter_frees_its_place():
+    slots = PrioritySlots(1)
+
+    async def main():
+        await slots.aacquire()
+        waiter = asyncio.ensure_future(slots.aacquire(BULK))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        slots.release()
+        await asyncio.wait_for(slots.aacquire(), 1)
+
+    asyncio.run(main())
+    assert slots.in_use == 1
+    assert slots.waiting() == {INTERACTIVE: 0, BULK: 0}
+
+def test_weather_model_retries_through_limiter():
+    limiter = ProviderLimiter("openweather", base_delay=0.001)
+    throttled = Mock(status_code=429, headers={"retry-after": "0"})
+    throttled.raise_for_status.side_effect = requests.exceptions.HTTPError(response=throttled)
+    ok = Mock(headers={})
+    ok.raise_for_status.return_value = None
+    ok.json.return_value = {"main": {"temp": 20}}
+
+    with patch("requests.Session.get", side_effect=[throttled, ok]) as mock_get:
+        data = WeatherModel("key", limiter=limiter).fetch_weather("Oslo")
+
+    assert data == {"main": {"temp": 20}}
+    assert mock_get.call_count == 2
+
+def test_large_bulk_request_is_admitted_from_a_full_bucket():
+    limiter = ProviderLimiter("test", tokens_per_minute=10000, bulk_reserve=0.2)
+
+    assert limiter._reserve(9000, BULK) == 0
+    assert limiter._reserve(20000, BULK) > 0
+    limiter.tokens.level = limiter.tokens.capacity
+    assert limiter._reserve(20000, BULK) == 0
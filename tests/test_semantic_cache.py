@@ -0,0 +1,29 @@
+from src.utils.semantic_cache import SemanticCache
+
+def test_similar_query_hits_and_other_versions_miss():
+    cache = SemanticCache(threshold=0.95)
+    cache.store([1.0, 0.0], "Answer", [1], version=1)
+
+    assert cache.lookup([0.99, 0.05], version=1)["answer"] == "Answer"
+    assert cache.lookup([0.0, 1.0], version=1) is None
+    assert cache.lookup([1.0, 0.0], version=2) is None
+    assert len(cache) == 0
+
+def test_least_recently_used_slot_is_reused():
+    cache = SemanticCache(threshold=0.99, max_size=2)
+    cache.store([1.0, 0.0, 0.0], "x", [], version=1)
+    cache.store([0.0, 1.0, 0.0], "y", [], version=1)
+    cache.lookup([1.0, 0.0, 0.0], version=1)
+    cache.store([0.0, 0.0, 1.0], "z", [], version=1)
+
+    assert cache.lookup([0.0, 1.0, 0.0], version=1) is None
+    assert cache.lookup([1.0, 0.0, 0.0], version=1)["answer"] == "x"
+    assert cache.lookup([0.0, 0.0, 1.0], version=1)["answer"] == "z"
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+def test_expired_entries_are_dropped():
+    cache = SemanticCache(ttl=0.0)
+    cache.store([1.0, 0.0], "Answer", [], version=1)
+
+    assert cache.lookup([1.0, 0.0], version=1) is None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from src.utils.single_flight import SingleFlight
+
+def test_concurrent_async_duplicates_run_once():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado(("rag", "q"), work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["kinds"] == {"rag": {"executed": 1, "saved": 4}}
+    assert flight.stats()["top_keys"] == [(["rag", "q"], 4)]
+
+def test_threaded_followers_share_result_and_error():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def slow(value):
+        def run():
+            started.set()
+            time.sleep(0.1)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return run
+
+    for value in ("ok", ValueError("boom")):
+        started.clear()
+        results = []
+
+        def follower():
+            try:
+                results.append(flight.do(("weather_fetch", "paris"), slow("unused")))
+            except ValueError as e:
+                results.append(str(e))
+
+        leader = threading.Thread(target=lambda: results.append(_run(flight, slow(value))))
+        leader.start()
+        started.wait()
+        threads = [threading.Thread(target=follower) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads + [leader]:
+            thread.join()
+        expected = "ok" if value == "ok" else "boom"
+        assert results == [expected] * 4
+
+    assert flight.stats()["kinds"]["weather_fetch"] == {"executed": 2, "saved": 6}
+
+def _run(flight, func):
+    try:
+        return flight.do(("weather_fetch", "paris"), func)
+    except ValueError as e:
+        return str(e)
+
+def test_completed_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do(("rag", "q"), lambda: 1) == 1
+    assert flight.do(("rag", "q"), lambda: 2) == 2
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+from src.utils.speculation import Speculator
+
+def test_branch_over_budget_is_dropped():
+    speculator = Speculator()
+
+    decision, results = speculator.run(
+        lambda: "document",
+        {"retrieval": (lambda: time.sleep(0.3) or ["late"], 0.05)},
+        lambda decision: {"retrieval"},
+    )
+
+    assert decision == "document"
+    assert results == {}
+    assert speculator.stats() == {"retrieval": {"timeout": 1}}
+
+def test_async_unneeded_branch_is_cancelled():
+    speculator = Speculator()
+    finished = []
+
+    async def slow_branch():
+        await asyncio.sleep(0.2)
+        finished.append(True)
+
+    async def main():
+        result = await speculator.arun(
+            lambda: asyncio.sleep(0.01, result="weather"),
+            {"retrieval": (slow_branch, 1.0)},
+            lambda decision: set(),
+        )
+        await asyncio.sleep(0.3)
+        return result
+
+    assert asyncio.run(main()) == ("weather", {})
+    assert finished == []
+    assert speculator.stats() == {"retrieval": {"wasted": 1}}
+
+def test_busy_pool_skips_speculation():
+    speculator = Speculator(max_workers=1)
+    release = threading.Event()
+
+    speculator.run(lambda: "document", {"retrieval": (release.wait, 0.01)}, lambda decision: {"retrieval"})
+    decision, results = speculator.run(lambda: "document", {"retrieval": (lambda: ["docs"], 1.0)}, lambda decision: {"retrieval"})
+
+    assert (decision, results) == ("document", {})
+    assert speculator.stats() == {"retrieval": {"timeout": 1, "skipped": 1}}
+    release.set()
+    while speculator._active:
+        time.sleep(0.001)
+    speculator.run(lambda: "document", {"retrieval": (lambda: ["docs"], 1.0)}, lambda decision: {"retrieval"})
+    assert speculator.stats()["retrieval"]["used"] == 1
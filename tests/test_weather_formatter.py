@@ -0,0 +1,34 @@
+import pytest
+from src.services.weather_formatter import is_plain_current_query
+
+@pytest.mark.parametrize("query", [
+    "What's the weather in Oslo?",
+    "what is the temperature in Rome",
+    "What’s the weather like in Lisbon?",
+    "How's the weather in New York right now?",
+    "Is it raining in Washington, D.C.?",
+    "How cold is it in Helsinki today?",
+    "London weather",
+    "Current weather for Saint-Étienne",
+])
+def test_plain_current_queries_use_the_template(query):
+    assert is_plain_current_query(query)
+
+@pytest.mark.parametrize("query", [
+    "What will the weather be in Paris on Saturday?",
+    "What was the weather in London yesterday?",
+    "Weather in Paris in Fahrenheit",
+    "What is the temperature in Rome at 6pm?",
+    "What is the temperature in Rome at 18:00?",
+    "Weather in Berlin on 12/24",
+    "What's the weather in Oslo tomorrow?",
+    "Should I wear a coat in Oslo?",
+    "Weather in London vs Paris",
+    "Tell me about the weather in Oslo",
+    "What's the weather in the city where the Eiffel Tower stands and the Louvre is?",
+])
+def test_other_weather_questions_go_to_the_llm(query):
+    assert not is_plain_current_query(query)
+
+def test_non_current_time_frame_goes_to_the_llm():
+    assert not is_plain_current_query("What's the weather in Oslo?", time_frame="this weekend")
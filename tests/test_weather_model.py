@@ -1,13 +1,16 @@
-import pytest
-from unittest.mock import Mock, patch
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
 from src.models.weather_model import WeatherModel
+from src.utils.instrumentation import instrument_node
 
 def test_init():
     model = WeatherModel("test_key")
     assert model.api_key == "test_key"
 
 def test_fetch_weather_success():
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response = Mock()
         mock_response.json.return_value = {"weather": [{"description": "sunny"}], "main": {"temp": 25}}
         mock_response.raise_for_status.return_value = None
@@ -27,7 +30,7 @@ def test_fetch_weather_no_key():
     assert data["error"] == "API key not configured."
 
 def test_fetch_weather_failure():
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_get.side_effect = Exception("Network fail")
         
         model = WeatherModel("fake_key")
@@ -35,3 +38,113 @@ def test_fetch_weather_failure():
         
         assert "error" in data
         assert "Network fail" in data["error"]
+
+def test_fetch_weather_cached():
+    with patch('requests.Session.get') as mock_get:
+        mock_response = Mock()
+        mock_response.json.return_value = {"main": {"temp": 25}}
+        mock_response.raise_for_status.return_value = None
+        mock_get.return_value = mock_response
+
+        model = WeatherModel("fake_key")
+        model.fetch_weather("London")
+        data = model.fetch_weather("  london ")
+
+        assert data["main"]["temp"] == 25
+        mock_get.assert_called_once()
+        assert model.cache_stats()["hits"] == 1
+
+def test_fetch_weather_errors_not_cached():
+    with patch('requests.Session.get') as mock_get:
+        mock_get.side_effect = Exception("Network fail")
+
+        model = WeatherModel("fake_key")
+        model.fetch_weather("London")
+        model.fetch_weather("London")
+
+        assert mock_get.call_count == 2
+
+def test_fetch_weather_stale_served_and_refreshed():
+    with patch('requests.Session.get') as mock_get:
+        mock_response = Mock()
+        mock_response.json.return_value = {"main": {"temp": 25}}
+        mock_response.raise_for_status.return_value = None
+        mock_get.return_value = mock_response
+
+        model = WeatherModel("fake_key", cache_ttl=0.01, cache_stale_ttl=60)
+        model.fetch_weather("London")
+        time.sleep(0.02)
+        with patch.object(model, '_refresh_in_background') as mock_refresh:
+            data = model.fetch_weather("London")
+
+        assert data["main"]["temp"] == 25
+        mock_get.assert_called_once()
+        mock_refresh.assert_called_once()
+
+def test_afetch_weather_uses_cache():
+    with patch('httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+        mock_response = Mock()
+        mock_response.json.return_value = {"main": {"temp": 25}}
+        mock_response.raise_for_status.return_value = None
+        mock_get.return_value = mock_response
+
+        model = WeatherModel("fake_key")
+
+        async def run():
+            first = await model.afetch_weather("London")
+            second = await model.afetch_weather("LONDON")
+            await model.aclose()
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first == second == {"main": {"temp": 25}}
+        mock_get.assert_awaited_once()
+
+def test_fetch_weather_many_runs_concurrently_in_order():
+    from benchmarks.weather_stub import WeatherStub
+
+    with WeatherStub(latency=0.2) as stub:
+        model = WeatherModel("fake_key", base_url=stub.url)
+        start = time.perf_counter()
+        results = model.fetch_weather_many(["London", "Nowhere", "Berlin"])
+        elapsed = time.perf_counter() - start
+        aresults = asyncio.run(model.afetch_weather_many(["Paris", "Rome"]))
+
+    assert [r.get("name") for r in results] == ["London", None, "Berlin"]
+    assert results[1]["status_code"] == 404
+    assert [r["name"] for r in aresults] == ["Paris", "Rome"]
+    assert elapsed < 0.5
+
+def test_fetch_weather_many_records_timings_in_caller_context():
+    from benchmarks.weather_stub import WeatherStub
+
+    def node(state):
+        model.fetch_weather_many(["London", "Berlin"])
+        return {}
+
+    with WeatherStub() as stub:
+        model = WeatherModel("fake_key", base_url=stub.url)
+        update = instrument_node("handle_weather", node, None)[0]({})
+
+    assert [t["name"] for t in update["timings"] if t["kind"] == "external"] == ["openweather", "openweather"]
+
+def test_replaced_async_client_is_closed_on_its_loop():
+    model = WeatherModel("fake_key")
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+
+    async def get_client():
+        return model._get_async_client()
+
+    try:
+        stale = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result(1)
+        fresh = asyncio.run(get_client())
+        time.sleep(0.05)
+        assert fresh is not stale
+        assert stale.is_closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(1)
+        other_loop.close()
@@ -1,7 +1,16 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from src.controllers.main_controller import MainController
 from src.controllers.workflow_controller import WorkflowController
-from src.graph.state import AgentState
+from src.graph.workflow import create_workflow
+from src.services.llm_service import LLMService
+from src.utils.rate_limiter import ProviderLimiter
+from src.models.weather_model import WeatherModel
 
 @pytest.fixture
 def mock_controller():
@@ -12,32 +21,41 @@ def mock_controller():
         # Instantiate controller with mocked deps
         # Since we patched the classes, init() uses the mocks
         controller = WorkflowController()
+        controller.rag_model.embed_query.return_value = [1.0, 0.0]
+        controller.rag_model.aembed_query = AsyncMock(return_value=[1.0, 0.0])
+        controller.rag_model.collection_version = 0
         # The instances on the controller are the return values of the class mocks
         # But we need to access the specific instance mocks
         # Re-assigning for clarity in tests or we can configure the class mocks
         return controller
 
 def test_determine_intent_weather(mock_controller):
-    # Setup mock
-    mock_controller.llm_service.classify_intent.return_value = "weather"
-    
-    state = {"query": "Is it raining?"}
-    result = mock_controller.determine_intent(state)
-    
-    assert result["intent"] == "weather"
+    result = mock_controller.determine_intent({"query": "Is it raining in Oslo?"})
+
+    assert result == {"intent": "weather", "intent_source": "keyword"}
+    mock_controller.llm_service.analyze_query.assert_not_called()
 
 def test_determine_intent_document(mock_controller):
-    mock_controller.llm_service.classify_intent.return_value = "document"
-    
-    state = {"query": "Summarize pdf"}
-    result = mock_controller.determine_intent(state)
-    
+    result = mock_controller.determine_intent({"query": "Summarize the pdf"})
+
+    assert result["intent"] == "document"
+    assert result["intent_source"] == "keyword"
+    mock_controller.llm_service.analyze_query.assert_not_called()
+
+def test_determine_intent_uses_analysis_for_unrouted_queries(mock_controller):
+    mock_controller.intent_router.embeddings = None
+    mock_controller.llm_service.analyze_query.return_value = {"intent": "document", "cities": [], "entities": {"time_frame": None, "topics": ["sales forecast"]}}
+
+    result = mock_controller.determine_intent({"query": "Give me the Q3 sales forecast"})
+
     assert result["intent"] == "document"
+    assert result["intent_source"] == "llm"
+    mock_controller.llm_service.analyze_query.assert_called_once_with("Give me the Q3 sales forecast")
 
 def test_handle_weather_flow(mock_controller):
     # Setup mocks
-    mock_controller.llm_service.extract_city.return_value = "London"
-    mock_controller.weather_model.fetch_weather.return_value = {"temp": 10}
+    mock_controller.llm_service.extract_cities.return_value = ["London"]
+    mock_controller.weather_model.fetch_weather_many.return_value = [{"temp": 10}]
     mock_controller.llm_service.summarize_weather.return_value = "It is cold."
     
     state = {"query": "Weather in London"}
@@ -46,14 +64,70 @@ def test_handle_weather_flow(mock_controller):
     assert result["response"] == "It is cold."
     assert result["weather_data"] == {"temp": 10}
 
+def test_handle_weather_reuses_extracted_cities(mock_controller):
+    mock_controller.weather_model.fetch_weather_many.return_value = [{"temp": 10}]
+    mock_controller.llm_service.summarize_weather.return_value = "It is cold."
+
+    state = {"query": "Weather in London", "cities": ["London"]}
+    result = mock_controller.handle_weather(state)
+
+    assert result["response"] == "It is cold."
+    assert mock_controller.weather_model.fetch_weather_many.call_args.args[0] == ["London"]
+    mock_controller.llm_service.extract_cities.assert_not_called()
+
 def test_handle_weather_no_city(mock_controller):
-    mock_controller.llm_service.extract_city.return_value = ""
+    mock_controller.llm_service.extract_cities.return_value = []
     
     state = {"query": "Weather somewhere"}
     result = mock_controller.handle_weather(state)
     
     assert "could not identify" in result["response"]
 
+def test_handle_weather_fetches_several_cities_for_one_summary(mock_controller):
+    mock_controller.llm_service.extract_cities.return_value = ["London", "Paris", "london", "Berlin"]
+    mock_controller.weather_model.fetch_weather_many.return_value = [{"temp": 10}, {"error": "HTTP error occurred"}]
+    mock_controller.llm_service.summarize_weather.return_value = "London is colder."
+
+    with patch('src.controllers.workflow_controller.Config.WEATHER_MAX_CITIES', 2):
+        result = mock_controller.handle_weather({"query": "London vs Paris vs Berlin"})
+
+    assert mock_controller.weather_model.fetch_weather_many.call_args.args[0] == ["London", "Paris"]
+    expected = {"cities": {"London": {"temp": 10}, "Paris": {"error": "HTTP error occurred"}}, "skipped": ["Berlin"]}
+    mock_controller.llm_service.summarize_weather.assert_called_once_with("London vs Paris vs Berlin", expected, units=mock_controller.weather_model.units)
+    assert result["weather_data"] == expected
+
+def test_overlapping_city_lists_share_in_flight_fetches(mock_controller):
+    fetched = []
+
+    def slow_fetch(city, units=None):
+        fetched.append(city)
+        time.sleep(0.1)
+        return {"temp": 10}
+
+    mock_controller.weather_model = WeatherModel("key")
+    mock_controller.llm_service.summarize_weather.return_value = "Mild."
+    states = [{"query": "Forecast for Paris", "cities": ["Paris"]}, {"query": "Forecast for London vs Paris", "cities": ["London", "paris"]}]
+
+    with patch.object(WeatherModel, "fetch_weather", side_effect=slow_fetch):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(mock_controller.handle_weather, states))
+
+    assert sorted(city.lower() for city in fetched) == ["london", "paris"]
+
+def test_plain_current_weather_is_rendered_without_llm(mock_controller):
+    payload = {"name": "Oslo", "sys": {"country": "NO"}, "weather": [{"description": "light snow"}],
+               "main": {"temp": -3.24, "feels_like": -7.0, "humidity": 86}, "wind": {"speed": 3.6}}
+    mock_controller.weather_model.units = "metric"
+    mock_controller.weather_model.fetch_weather_many.return_value = [payload]
+
+    result = mock_controller.handle_weather({"query": "What's the weather in Oslo?", "cities": ["Oslo"]})
+
+    assert result["response"] == "Current weather in Oslo, NO: light snow, -3.2°C (feels like -7.0°C), humidity 86%, wind 3.6 m/s."
+    mock_controller.llm_service.summarize_weather.assert_not_called()
+
+    mock_controller.handle_weather({"query": "Should I wear a coat in Oslo?", "cities": ["Oslo"]})
+    mock_controller.llm_service.summarize_weather.assert_called_once()
+
 def test_handle_rag_flow(mock_controller):
     mock_docs = [MagicMock(page_content="doc1")]
     mock_controller.rag_model.retrieve_context.return_value = mock_docs
@@ -64,3 +138,233 @@ def test_handle_rag_flow(mock_controller):
     
     assert result["response"] == "Summary of doc"
     assert result["rag_context"] == mock_docs
+
+def test_handle_rag_serves_similar_query_from_cache(mock_controller):
+    mock_docs = [MagicMock(page_content="doc1")]
+    mock_controller.rag_model.retrieve_context.return_value = mock_docs
+    mock_controller.llm_service.rag_response.return_value = "Summary of doc"
+
+    mock_controller.handle_rag({"query": "What does the doc say?"})
+    mock_controller.rag_model.embed_query.return_value = [0.999, 0.01]
+    result = mock_controller.handle_rag({"query": "what does the document say"})
+
+    assert result["response"] == "Summary of doc"
+    assert result["cache_hit"] is True
+    mock_controller.llm_service.rag_response.assert_called_once()
+
+def test_handle_rag_cache_invalidated_by_new_documents(mock_controller):
+    mock_controller.rag_model.retrieve_context.return_value = []
+    mock_controller.llm_service.rag_response.side_effect = ["Old answer", "New answer"]
+
+    mock_controller.handle_rag({"query": "What does the doc say?"})
+    mock_controller.rag_model.collection_version = 1
+    result = mock_controller.handle_rag({"query": "What does the doc say?"})
+
+    assert result["response"] == "New answer"
+    assert result["cache_hit"] is False
+
+def test_ahandle_weather_flow(mock_controller):
+    mock_controller.llm_service.aextract_cities = AsyncMock(return_value=["London"])
+    mock_controller.weather_model.afetch_weather_many = AsyncMock(return_value=[{"temp": 10}])
+    mock_controller.llm_service.asummarize_weather = AsyncMock(return_value="It is cold.")
+
+    result = asyncio.run(mock_controller.ahandle_weather({"query": "Weather in London"}))
+
+    assert result["response"] == "It is cold."
+    assert result["weather_data"] == {"temp": 10}
+
+def test_graph_ainvoke_uses_async_nodes(mock_controller):
+    mock_controller.llm_service.aanalyze_query = AsyncMock(return_value={"intent": "document", "cities": [], "entities": {}})
+    mock_controller.rag_model.aretrieve_context = AsyncMock(return_value=[])
+    mock_controller.llm_service.arag_response = AsyncMock(return_value="Async answer")
+
+    graph = create_workflow(mock_controller)
+    result = asyncio.run(graph.ainvoke({"query": "What does the doc say?"}))
+
+    assert result["response"] == "Async answer"
+    mock_controller.llm_service.aanalyze_query.assert_not_called()
+
+def test_handle_batch_preserves_order_and_isolates_errors():
+    with patch('src.controllers.main_controller.WorkflowController'), \
+         patch('src.controllers.main_controller.create_workflow') as mock_create:
+        async def fake_ainvoke(inputs):
+            if inputs["query"] == "boom":
+                raise RuntimeError("failed")
+            await asyncio.sleep(0)
+            return {"response": inputs["query"].upper()}
+
+        mock_create.return_value.ainvoke = fake_ainvoke
+        controller = MainController()
+        controller.workflow_controller.aclose = AsyncMock()
+        results = controller.handle_batch(["a", "boom", "c"], max_concurrency=2)
+
+    assert [response for response, _ in results] == ["A", "An error occurred: failed", "C"]
+    controller.workflow_controller.aclose.assert_awaited_once()
+
+def test_determine_intent_falls_back_to_llm(mock_controller):
+    mock_controller.intent_router.embeddings = None
+    mock_controller.llm_service.analyze_query.return_value = {
+        "intent": "weather", "cities": ["Rome"], "entities": {"time_frame": "tomorrow", "topics": []}
+    }
+
+    result = mock_controller.determine_intent({"query": "Should I bring sunglasses in Rome tomorrow?"})
+
+    assert result["intent"] == "weather"
+    assert result["intent_source"] == "llm"
+    assert result["cities"] == ["Rome"]
+    mock_controller.llm_service.analyze_query.assert_called_once()
+
+def test_determine_intent_keyword_skips_llm(mock_controller):
+    result = mock_controller.determine_intent({"query": "What's the weather in Paris?"})
+
+    assert result == {"intent": "weather", "intent_source": "keyword"}
+    mock_controller.llm_service.analyze_query.assert_not_called()
+
+def test_stream_query_yields_answer_tokens(mock_controller):
+    fake_llm = GenericFakeChatModel(messages=iter([AIMessage(content="The manual covers pumps.")]))
+    mock_controller.llm_service = LLMService(llm=fake_llm)
+    mock_controller.rag_model.retrieve_context.return_value = []
+
+    with patch('src.controllers.main_controller.WorkflowController', return_value=mock_controller):
+        controller = MainController()
+    events = list(controller.stream_query("Summarize the pdf"))
+
+    tokens = [e["token"] for e in events if "token" in e]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "The manual covers pumps."
+    assert events[-1]["response"] == "The manual covers pumps."
+    assert events[-1]["state"]["intent"] == "document"
+
+def test_answer_is_not_retried_after_tokens_were_streamed(mock_controller):
+    class FlakyStream(GenericFakeChatModel):
+        failures: int = 1
+
+        def _stream(self, *args, **kwargs):
+            for i, chunk in enumerate(super()._stream(*args, **kwargs)):
+                if i == 3 and self.failures:
+                    self.failures -= 1
+                    raise TimeoutError("upstream timed out")
+                yield chunk
+
+    answer = AIMessage(content="The manual covers pumps and valves.")
+    limiter = ProviderLimiter("openai_chat", base_delay=0.001)
+    mock_controller.llm_service = LLMService(llm=FlakyStream(messages=iter([answer, answer])), limiter=limiter)
+    mock_controller.rag_model.retrieve_context.return_value = []
+
+    with patch('src.controllers.main_controller.WorkflowController', return_value=mock_controller):
+        controller = MainController()
+    tokens = []
+    with pytest.raises(TimeoutError):
+        for event in controller.stream_query("Summarize the pdf"):
+            tokens.append(event.get("token"))
+
+    assert "".join(tokens) == "The manual"
+    assert limiter.stats()["retries"] == 0
+
+def test_stream_query_emits_non_llm_answer_as_single_token(mock_controller):
+    mock_controller.llm_service.extract_cities.return_value = []
+
+    with patch('src.controllers.main_controller.WorkflowController', return_value=mock_controller):
+        controller = MainController()
+    events = list(controller.stream_query("What's the weather like?"))
+
+    assert events[0] == {"token": "I could not identify the city for the weather request."}
+    assert events[-1]["response"] == events[0]["token"]
+
+def test_graph_records_node_and_llm_timings(mock_controller):
+    fake_llm = GenericFakeChatModel(messages=iter([AIMessage(content="The manual covers pumps.")]))
+    mock_controller.llm_service = LLMService(llm=fake_llm)
+    mock_controller.rag_model.retrieve_context.return_value = []
+
+    with patch('src.controllers.main_controller.WorkflowController', return_value=mock_controller):
+        controller = MainController()
+    events = list(controller.stream_query("Summarize the pdf"))
+
+    timings = events[-1]["state"]["timings"]
+    assert [t["name"] for t in timings if t["kind"] == "node"] == ["classify", "handle_rag"]
+    assert {"kind": "cache", "name": "rag_answer", "result": "miss"} in timings
+    assert any(t["kind"] == "llm" and t["name"] == "rag_response" for t in timings)
+
+def test_rag_model_and_graph_are_built_on_first_use():
+    with patch('src.controllers.workflow_controller.WeatherModel'), \
+         patch('src.controllers.workflow_controller.RAGModel') as MockRAG, \
+         patch('src.controllers.workflow_controller.LLMService'), \
+         patch('src.controllers.main_controller.create_workflow') as mock_create:
+        controller = MainController()
+        workflow_controller = controller.workflow_controller
+
+        assert not workflow_controller.rag_model_loaded
+        assert workflow_controller.determine_intent({"query": "What's the weather in London?"})["intent"] == "weather"
+        MockRAG.assert_not_called()
+        mock_create.assert_not_called()
+
+        workflow_controller.rag_model.embed_query.return_value = [1.0, 0.0]
+        workflow_controller.rag_model.collection_version = 0
+        workflow_controller.handle_rag({"query": "Summarize the pdf"})
+        assert controller.graph is controller.graph
+
+    MockRAG.assert_called_once()
+    mock_create.assert_called_once()
+
+def test_concurrent_identical_rag_queries_are_coalesced(mock_controller):
+    async def slow_retrieve(query, embedding=None):
+        await asyncio.sleep(0.05)
+        return []
+
+    mock_controller.rag_model.aretrieve_context = AsyncMock(side_effect=slow_retrieve)
+    mock_controller.llm_service.arag_response = AsyncMock(return_value="Answer")
+
+    async def run():
+        return await asyncio.gather(
+            mock_controller.ahandle_rag({"query": "What is E42?"}),
+            mock_controller.ahandle_rag({"query": "what is  e42?"}),
+        )
+
+    first, second = asyncio.run(run())
+    assert first["response"] == second["response"] == "Answer"
+    mock_controller.rag_model.aretrieve_context.assert_awaited_once()
+    assert mock_controller.single_flight.stats()["kinds"]["rag"]["saved"] == 1
+
+def test_speculative_retrieval_overlaps_classification(mock_controller):
+    docs = [MagicMock(page_content="doc1")]
+
+    async def run():
+        analysis_started = asyncio.Event()
+        retrieval_started = asyncio.Event()
+
+        # Each side waits for the other to start, so this only completes if they overlap.
+        async def analysis(query):
+            analysis_started.set()
+            await asyncio.wait_for(retrieval_started.wait(), 1)
+            return {"intent": "document", "cities": [], "entities": {}}
+
+        async def retrieve(query, embedding=None):
+            retrieval_started.set()
+            await asyncio.wait_for(analysis_started.wait(), 1)
+            return docs
+
+        mock_controller.llm_service.aanalyze_query = AsyncMock(side_effect=analysis)
+        mock_controller.rag_model.aretrieve_context = AsyncMock(side_effect=retrieve)
+        mock_controller.llm_service.arag_response = AsyncMock(return_value="Answer")
+        update = await mock_controller.adetermine_intent({"query": "Tell me something"})
+        result = await mock_controller.ahandle_rag({"query": "Tell me something", **update})
+        return update, result
+
+    with patch('src.controllers.workflow_controller.Config.SPECULATION_ENABLED', True):
+        update, result = asyncio.run(run())
+
+    assert update["rag_context"] == docs
+    assert result["rag_context"] == docs
+    mock_controller.rag_model.aretrieve_context.assert_awaited_once()
+    assert mock_controller.speculator.stats() == {"retrieval": {"used": 1}}
+
+def test_speculative_retrieval_dropped_for_weather(mock_controller):
+    mock_controller.llm_service.analyze_query.return_value = {"intent": "weather", "cities": ["Oslo"], "entities": {}}
+    mock_controller.rag_model.retrieve_context.return_value = []
+
+    with patch('src.controllers.workflow_controller.Config.SPECULATION_ENABLED', True):
+        update = mock_controller.determine_intent({"query": "Tell me about Oslo"})
+
+    assert update["intent"] == "weather"
+    assert "rag_context" not in update
+    assert mock_controller.speculator.stats() == {"retrieval": {"wasted": 1}}
@@ -0,0 +1,284 @@
+"""
+HTTP API around MainController, served by uvicorn.
+
+    python -m views.api                      # API_HOST / API_PORT / API_WORKERS
+    uvicorn views.api:app --workers 4        # needs QDRANT_URL (shared Qdrant server)
+
+Endpoints:
+    GET  /health
+    GET  /metrics          Prometheus text format
+    POST /query            {"query": str} -> {"response": str, "state": {...}}
+    POST /query/stream     {"query": str} -> NDJSON events, as MainController.stream_query
+    POST /batch            {"queries": [str], "max_concurrency": int?} -> {"results": [...]}
+                           (one pool slot per batch; queries inside run concurrently)
+    POST /ingest           multipart PDF files -> {"message": str}
+"""
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from src.utils.config import Config
+from src.utils.metrics import METRICS
+
+
+class Overloaded(Exception):
+    """Raised when the request queue is full."""
+
+
+class RequestLimiter:
+    """
+    Bounded worker pool for query requests: at most `max_concurrency` run at
+    once and at most `max_queue` wait; further requests are rejected.
+    """
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.active = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def full(self) -> bool:
+        return self._semaphore.locked() and self.waiting >= self.max_queue
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self.full:
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Converts workflow state to JSON types; documents become
+    {"page_content", "metadata"} dicts.
+    """
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if hasattr(value, "page_content"):
+        return {"page_content": value.page_content, "metadata": to_jsonable(getattr(value, "metadata", {}))}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def create_app(
+    controller: Any = None,
+    max_concurrency: Optional[int] = None,
+    max_queue: Optional[int] = None,
+    request_timeout: Optional[float] = None,
+    ingest_timeout: Optional[float] = None,
+    ingest_workers: Optional[int] = None,
+) -> Starlette:
+    """
+    Builds the ASGI app. Without a `controller`, a MainController is created
+    at startup (lazily initialized, see LAZY_INIT).
+    """
+    request_timeout = request_timeout or Config.API_REQUEST_TIMEOUT
+    ingest_timeout = ingest_timeout or Config.API_INGEST_TIMEOUT
+    settings = {"max_concurrency": max_concurrency or Config.API_MAX_CONCURRENCY, "max_queue": max_queue if max_queue is not None else Config.API_MAX_QUEUE}
+    runtime: Dict[str, Any] = {"controller": controller}
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        if runtime["controller"] is None:
+            from src.controllers.main_controller import MainController
+            runtime["controller"] = MainController()
+            if Config.WARM_UP_ON_START:
+                threading.Thread(target=runtime["controller"].warm_up, daemon=True).start()
+        # Created here so the semaphore binds to the server's event loop.
+        runtime["limiter"] = RequestLimiter(settings["max_concurrency"], settings["max_queue"])
+        runtime["ingest_pool"] = ThreadPoolExecutor(max_workers=ingest_workers or Config.API_INGEST_WORKERS, thread_name_prefix="ingest")
+        try:
+            yield
+        finally:
+            runtime["ingest_pool"].shutdown(wait=False, cancel_futures=True)
+
+    def error(status: int, message: str) -> JSONResponse:
+        return JSONResponse({"error": message}, status_code=status)
+
+    async def read_query(request: Request) -> Optional[str]:
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        query = body.get("query") if isinstance(body, dict) else None
+        return query.strip() if isinstance(query, str) and query.strip() else None
+
+    async def health(request: Request) -> Response:
+        limiter = runtime["limiter"]
+        body = {"status": "ok", "active": limiter.active, "waiting": limiter.waiting}
+        workflow = getattr(runtime["controller"], "workflow_controller", None)
+        if workflow is not None:
+            body["coalescing"] = workflow.single_flight.stats()
+            body["speculation"] = workflow.speculator.stats()
+            body["scheduler"] = workflow.scheduler_stats()
+        return JSONResponse(body)
+
+    async def metrics(request: Request) -> Response:
+        return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+    async def query(request: Request) -> Response:
+        text = await read_query(request)
+        if text is None:
+            return error(400, "Body must be JSON with a non-empty 'query'.")
+
+        async def run():
+            async with runtime["limiter"].slot():
+                return await runtime["controller"].ahandle_query(text)
+
+        try:
+            response, state = await asyncio.wait_for(run(), request_timeout)
+        except Overloaded:
+            return error(503, "Server is busy, retry later.")
+        except asyncio.TimeoutError:
+            return error(504, f"Query did not finish within {request_timeout:g}s.")
+        except Exception as e:
+            return error(500, f"An error occurred: {e}")
+        return JSONResponse({"response": response, "state": to_jsonable(state)})
+
+    async def query_stream(request: Request) -> Response:
+        text = await read_query(request)
+        if text is None:
+            return error(400, "Body must be JSON with a non-empty 'query'.")
+        limiter = runtime["limiter"]
+        if limiter.full:
+            return error(503, "Server is busy, retry later.")
+
+        async def events() -> AsyncIterator[str]:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + request_timeout
+            try:
+                async with limiter.slot():
+                    stream = runtime["controller"].astream_query(text)
+                    try:
+                        while True:
+                            event = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - loop.time()))
+                            yield json.dumps(to_jsonable(event)) + "\n"
+                    except StopAsyncIteration:
+                        pass
+                    finally:
+                        await stream.aclose()
+            except Overloaded:
+                yield json.dumps({"error": "Server is busy, retry later."}) + "\n"
+            except asyncio.TimeoutError:
+                yield json.dumps({"error": f"Query did not finish within {request_timeout:g}s."}) + "\n"
+            except Exception as e:
+                yield json.dumps({"error": f"An error occurred: {e}"}) + "\n"
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    async def batch(request: Request) -> Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        queries = body.get("queries") if isinstance(body, dict) else None
+        if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+            return error(400, "Body must be JSON with a 'queries' list of strings.")
+        max_in_flight = min(int(body.get("max_concurrency") or settings["max_concurrency"]), settings["max_concurrency"])
+
+        async def run():
+            async with runtime["limiter"].slot():
+                return await runtime["controller"].ahandle_batch(queries, max_concurrency=max_in_flight)
+
+        try:
+            results = await asyncio.wait_for(run(), request_timeout)
+        except Overloaded:
+            return error(503, "Server is busy, retry later.")
+        except asyncio.TimeoutError:
+            return error(504, f"Batch did not finish within {request_timeout:g}s.")
+        except Exception as e:
+            return error(500, f"An error occurred: {e}")
+        return JSONResponse({"results": [{"response": response, "state": to_jsonable(state)} for response, state in results]})
+
+    async def ingest(request: Request) -> Response:
+        form = await request.form()
+        uploads = [item for item in form.getlist("files") if hasattr(item, "read")]
+        if not uploads:
+            return error(400, "Send one or more PDF files as multipart field 'files'.")
+
+        paths = []
+
+        def cleanup(*_):
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        try:
+            for upload in uploads:
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+                    tmp_file.write(await upload.read())
+                    paths.append(tmp_file.name)
+                await upload.close()
+        except Exception as e:
+            cleanup()
+            return error(500, f"Error processing PDF: {e}")
+
+        controller = runtime["controller"]
+        if len(paths) == 1:
+            work = lambda: controller.upload_pdf(paths[0])
+        else:
+            work = lambda: controller.upload_pdfs(paths)
+        # Ingestion is blocking and CPU-heavy, so it runs on its own small pool.
+        # The temp files are removed when it finishes, even after a timeout.
+        future = asyncio.get_running_loop().run_in_executor(runtime["ingest_pool"], work)
+        future.add_done_callback(cleanup)
+        try:
+            message = await asyncio.wait_for(asyncio.shield(future), ingest_timeout)
+        except asyncio.TimeoutError:
+            return error(504, f"Ingestion did not finish within {ingest_timeout:g}s; it continues in the background.")
+        except Exception as e:
+            return error(500, f"Error processing PDF: {e}")
+        return JSONResponse({"message": message})
+
+    routes = [
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/query", query, methods=["POST"]),
+        Route("/query/stream", query_stream, methods=["POST"]),
+        Route("/batch", batch, methods=["POST"]),
+        Route("/ingest", ingest, methods=["POST"]),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_app()
+
+
+def main() -> None:
+    import uvicorn
+
+    if Config.API_WORKERS > 1 and not Config.QDRANT_URL:
+        raise SystemExit(
+            "API_WORKERS > 1 needs QDRANT_URL: the local Qdrant store at QDRANT_PATH can only be opened by one process."
+        )
+    uvicorn.run("views.api:app", host=Config.API_HOST, port=Config.API_PORT, workers=Config.API_WORKERS)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,15 @@ import streamlit as st
 import tempfile
 import os
 import sys
+import threading
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.controllers.main_controller import MainController
+from src.controllers.remote_controller import RemoteController
+from src.utils.config import Config
+from src.utils.metrics import start_metrics_server
 
 st.set_page_config(page_title="Neura Dynamics Agent", page_icon="🤖", layout="wide")
 
@@ -30,10 +34,30 @@ st.markdown("""
 
 @st.cache_resource
 def get_controller():
-    return MainController()
+    if Config.API_URL:
+        # Thin client: queries and ingestion run in the API service (views/api.py).
+        # Uploads wait as long as the server lets ingestion run, plus a margin.
+        return RemoteController(Config.API_URL, timeout=Config.API_REQUEST_TIMEOUT, ingest_timeout=Config.API_INGEST_TIMEOUT + 30)
+    controller = MainController()
+    if Config.WARM_UP_ON_START:
+        # Pay the deferred startup cost off the request path.
+        threading.Thread(target=warm_up, args=(controller,), daemon=True).start()
+    return controller
+
+def warm_up(controller):
+    try:
+        controller.warm_up()
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
+@st.cache_resource
+def get_metrics_server():
+    # One Prometheus endpoint per process, not per Streamlit session.
+    return start_metrics_server(Config.METRICS_PORT) if Config.METRICS_PORT and not Config.API_URL else None
 
 try:
     controller = get_controller()
+    get_metrics_server()
 except Exception as e:
     st.error(f"Failed to initialize controller: {e}")
     st.stop()
@@ -44,21 +68,34 @@ st.markdown("ask me about the **Weather** or your **Documents**.")
 # Sidebar for PDF Upload
 with st.sidebar:
     st.header("📂 Knowledge Base")
-    uploaded_file = st.file_uploader("Upload PDF", type=["pdf"])
-    if uploaded_file:
+    uploaded_files = st.file_uploader("Upload PDF", type=["pdf"], accept_multiple_files=True)
+    if uploaded_files:
         if st.button("Process PDF"):
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_path = tmp_file.name
-            
-            with st.spinner("Processing PDF..."):
-                try:
-                    msg = controller.upload_pdf(tmp_path)
-                    st.success(msg)
-                except Exception as e:
-                    st.error(f"Error processing PDF: {e}")
-                finally:
-                    # Cleanup
+            tmp_paths = []
+            for uploaded_file in uploaded_files:
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+                    tmp_file.write(uploaded_file.getvalue())
+                    tmp_paths.append(tmp_file.name)
+
+            progress_bar = st.progress(0.0, text="Processing PDF...")
+
+            def on_progress(progress):
+                total = progress.get("total_pages")
+                fraction = min(progress["pages"] / total, 1.0) if total else 0.0
+                progress_bar.progress(fraction, text=f"{progress['pages']} pages, {progress['chunks']} chunks")
+
+            try:
+                if len(tmp_paths) == 1:
+                    msg = controller.upload_pdf(tmp_paths[0], on_progress=on_progress)
+                else:
+                    msg = controller.upload_pdfs(tmp_paths, on_progress=on_progress)
+                st.success(msg)
+            except Exception as e:
+                st.error(f"Error processing PDF: {e}")
+            finally:
+                progress_bar.empty()
+                # Cleanup
+                for tmp_path in tmp_paths:
                     if os.path.exists(tmp_path):
                         os.remove(tmp_path)
 
@@ -78,22 +115,36 @@ if prompt := st.chat_input("Ask something..."):
     st.session_state.messages.append({"role": "user", "content": prompt})
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                response, state = controller.handle_query(prompt)
-                st.markdown(response)
-                
-                # Debug Info
-                with st.expander("🛠️ Debug Info"):
-                    st.write(f"**Intent:** {state.get('intent', 'Unknown')}")
-                    if state.get('weather_data'):
-                        st.json(state['weather_data'])
-                    if state.get('rag_context'):
-                        st.write("Retrieved Chunks:")
-                        for doc in state['rag_context']:
-                            st.caption(doc.page_content[:200] + "...")
-            except Exception as e:
-                response = f"An error occurred: {e}"
-                st.error(response)
-            
+        try:
+            final = {}
+
+            def tokens():
+                for event in controller.stream_query(prompt):
+                    if "token" in event:
+                        yield event["token"]
+                    else:
+                        final.update(event)
+
+            response = st.write_stream(tokens())
+            state = final.get("state", {})
+
+            # Debug Info
+            with st.expander("🛠️ Debug Info"):
+                st.write(f"**Intent:** {state.get('intent', 'Unknown')}")
+                if state.get('weather_data'):
+                    st.json(state['weather_data'])
+                if state.get('rag_context'):
+                    st.write("Retrieved Chunks:")
+                    for doc in state['rag_context']:
+                        st.caption(doc.page_content[:200] + "...")
+                if state.get('timings'):
+                    st.write("Timings:")
+                    st.dataframe(
+                        [{"step": t["name"], "kind": t["kind"], "ms": t.get("ms"), "detail": t.get("result") or t.get("error") or ""} for t in state['timings']],
+                        hide_index=True,
+                    )
+        except Exception as e:
+            response = f"An error occurred: {e}"
+            st.error(response)
+
     st.session_state.messages.append({"role": "assistant", "content": response})